@@ -0,0 +1,348 @@
+# Copyright (c) 2016 RIPE NCC
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Generators for the result corpora we benchmark against.  Everything is made
+up on the spot from a seeded random number generator, so a given seed and
+count always produce exactly the same results and nothing has to be
+downloaded.
+"""
+
+import base64
+import datetime
+import json
+import random
+import struct
+
+
+TIMESTAMP = 1500000000
+
+
+def _common(rng, kind, index, firmware=4790):
+    return {
+        "fw": firmware,
+        "from": "192.0.2.{}".format(rng.randint(1, 254)),
+        "msm_id": 1000000 + index % 50,
+        "prb_id": 10000 + index,
+        "timestamp": TIMESTAMP + index * 240,
+        "lts": rng.randint(1, 300),
+        "type": kind,
+    }
+
+
+def _ipv4(rng):
+    return "198.51.100.{}".format(rng.randint(1, 254))
+
+
+def ping(rng, index):
+    result = _common(rng, "ping", index)
+    sent = rng.choice((3, 5, 10))
+    packets = []
+    rtts = []
+    for _ in range(sent):
+        if rng.random() < 0.1:
+            packets.append({"x": "*"})
+        else:
+            rtt = round(rng.uniform(1, 300), 6)
+            rtts.append(rtt)
+            packets.append({"rtt": rtt})
+    result.update({
+        "af": 4,
+        "dst_addr": _ipv4(rng),
+        "dst_name": "example.net",
+        "src_addr": "10.0.0.2",
+        "proto": "ICMP",
+        "ttl": rng.randint(30, 64),
+        "size": 48,
+        "sent": sent,
+        "rcvd": len(rtts),
+        "dup": 0,
+        "min": min(rtts) if rtts else -1,
+        "max": max(rtts) if rtts else -1,
+        "avg": sum(rtts) / len(rtts) if rtts else -1,
+        "step": 240,
+        "result": packets,
+    })
+    return result
+
+
+def traceroute(rng, index, hops=30):
+    result = _common(rng, "traceroute", index)
+    destination = _ipv4(rng)
+    raw_hops = []
+    for hop in range(1, hops + 1):
+        packets = []
+        origin = destination if hop == hops else "203.0.113.{}".format(hop)
+        for _ in range(3):
+            if rng.random() < 0.15:
+                packets.append({"x": "*"})
+            else:
+                packets.append({
+                    "from": origin,
+                    "rtt": round(rng.uniform(1, 300), 3),
+                    "size": 68,
+                    "ttl": 255 - hop,
+                })
+        raw_hops.append({"hop": hop, "result": packets})
+    result.update({
+        "af": 4,
+        "dst_addr": destination,
+        "dst_name": destination,
+        "src_addr": "10.0.0.2",
+        "proto": "UDP",
+        "paris_id": index % 16,
+        "size": 48,
+        "endtime": result["timestamp"] + 10,
+        "result": raw_hops,
+    })
+    return result
+
+
+def _dns_name(name):
+    encoded = b""
+    for label in name.split("."):
+        encoded += struct.pack("!B", len(label)) + label.encode("ascii")
+    return encoded + b"\x00"
+
+
+def _dns_rr(name, kind, ttl, rdata):
+    # Classes are always IN
+    return name + struct.pack("!HHIH", kind, 1, ttl, len(rdata)) + rdata
+
+
+def _abuf(rng, qname, answers):
+    """
+    Builds the wire format of a response to an A query for ``qname`` with
+    ``answers`` records of a mix of types.  Owner names point back to the
+    question, as they would in the wild.
+    """
+
+    pointer = b"\xc0\x0c"
+    records = []
+    for i in range(answers):
+        kind = i % 7
+        ttl = rng.randint(60, 86400)
+        if kind == 0:
+            records.append(_dns_rr(pointer, 1, ttl, struct.pack(
+                "!4B", 192, 0, 2, rng.randint(1, 254))))
+        elif kind == 1:
+            records.append(_dns_rr(pointer, 28, ttl, struct.pack(
+                "!8H", 0x2001, 0xdb8, 0, 0, 0, 0, 0, rng.randint(1, 65535))))
+        elif kind == 2:
+            records.append(_dns_rr(pointer, 15, ttl, struct.pack(
+                "!H", rng.randint(1, 50)) + _dns_name("mx{}.example.net".format(i))))
+        elif kind == 3:
+            text = "v=spf1 include:_spf{}.example.net ~all".format(i).encode("ascii")
+            records.append(_dns_rr(pointer, 16, ttl, struct.pack(
+                "!B", len(text)) + text))
+        elif kind == 4:
+            records.append(_dns_rr(pointer, 2, ttl, _dns_name(
+                "ns{}.example.net".format(i))))
+        elif kind == 5:
+            records.append(_dns_rr(pointer, 5, ttl, pointer))
+        else:
+            records.append(_dns_rr(pointer, 6, ttl, _dns_name(
+                "ns1.example.net") + _dns_name("hostmaster.example.net") +
+                struct.pack("!5I", 2017010101, 7200, 3600, 1209600, 300)))
+
+    # An EDNS0 OPT record with the DO bit set
+    opt = b"\x00" + struct.pack("!HHIH", 41, 4096, 0x8000, 0)
+
+    header = struct.pack(
+        "!6H", rng.randint(0, 65535), 0x8180, 1, answers, 0, 1)
+    question = _dns_name(qname) + struct.pack("!HH", 1, 1)
+    return header + question + b"".join(records) + opt
+
+
+def dns(rng, index, answers=40):
+    result = _common(rng, "dns", index)
+    abuf = _abuf(rng, "www{}.example.net".format(index % 100), answers)
+    result.update({
+        "af": 4,
+        "dst_addr": _ipv4(rng),
+        "src_addr": "10.0.0.2",
+        "proto": "UDP",
+        "result": {
+            "ANCOUNT": answers,
+            "ARCOUNT": 1,
+            "ID": struct.unpack("!H", abuf[:2])[0],
+            "NSCOUNT": 0,
+            "QDCOUNT": 1,
+            "abuf": base64.b64encode(abuf).decode("ascii"),
+            "rt": round(rng.uniform(1, 100), 3),
+            "size": len(abuf),
+        },
+    })
+    return result
+
+
+def _certificate_chains(count):
+    """
+    Returns ``count`` chains of PEM certificates (leaf, intermediate and
+    root).  Ed25519 signatures are deterministic, so with fixed keys and
+    dates the certificates come out the same every time.
+    """
+
+    from cryptography import x509
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ed25519
+    from cryptography.x509.oid import NameOID
+
+    def key(seed):
+        return ed25519.Ed25519PrivateKey.from_private_bytes(bytes([seed]) * 32)
+
+    def name(common_name):
+        return x509.Name([
+            x509.NameAttribute(NameOID.COMMON_NAME, common_name),
+            x509.NameAttribute(NameOID.ORGANIZATION_NAME, "Sagan Benchmarks"),
+            x509.NameAttribute(NameOID.COUNTRY_NAME, "NL"),
+        ])
+
+    def build(subject, subject_key, issuer, issuer_key, serial, ca, hosts=()):
+        builder = x509.CertificateBuilder().subject_name(
+            name(subject)
+        ).issuer_name(
+            name(issuer)
+        ).public_key(
+            subject_key.public_key()
+        ).serial_number(
+            serial
+        ).not_valid_before(
+            datetime.datetime(2017, 1, 1)
+        ).not_valid_after(
+            datetime.datetime(2027, 1, 1)
+        ).add_extension(
+            x509.BasicConstraints(ca=ca, path_length=None), critical=True
+        )
+        if hosts:
+            builder = builder.add_extension(x509.SubjectAlternativeName(
+                [x509.DNSName(host) for host in hosts]), critical=False)
+        certificate = builder.sign(issuer_key, None)
+        return certificate.public_bytes(
+            serialization.Encoding.PEM).decode("ascii")
+
+    root_key, intermediate_key, leaf_key = key(1), key(2), key(3)
+    root = build("Root CA", root_key, "Root CA", root_key, 1, True)
+    intermediate = build(
+        "Intermediate CA", intermediate_key, "Root CA", root_key, 2, True)
+
+    chains = []
+    for i in range(count):
+        host = "www{}.example.net".format(i)
+        leaf = build(
+            host, leaf_key, "Intermediate CA", intermediate_key, 1000 + i,
+            False, (host, "example.net"))
+        chains.append([leaf, intermediate, root])
+    return chains
+
+
+def sslcert(rng, index, chains):
+    result = _common(rng, "sslcert", index)
+    result.update({
+        "af": 4,
+        "dst_addr": _ipv4(rng),
+        "dst_name": "example.net",
+        "dst_port": "443",
+        "src_addr": "10.0.0.2",
+        "method": "TLS",
+        "ver": "1.2",
+        "rt": round(rng.uniform(10, 500), 3),
+        "ttc": round(rng.uniform(5, 250), 3),
+        "cert": chains[index % len(chains)],
+    })
+    return result
+
+
+def ntp(rng, index):
+    result = _common(rng, "ntp", index)
+    packets = []
+    for _ in range(3):
+        origin = 3709000000 + index + rng.random()
+        rtt = rng.uniform(0.001, 0.3)
+        offset = rng.uniform(-0.1, 0.1)
+        packets.append({
+            "origin-ts": origin,
+            "receive-ts": origin + rtt / 2 + offset,
+            "transmit-ts": origin + rtt / 2 + offset + 0.00001,
+            "final-ts": origin + rtt,
+            "rtt": round(rtt, 6),
+            "offset": round(offset, 6),
+        })
+    result.update({
+        "af": 4,
+        "dst_addr": _ipv4(rng),
+        "dst_name": "ntp.example.net",
+        "src_addr": "10.0.0.2",
+        "proto": "UDP",
+        "li": "no",
+        "mode": "server",
+        "poll": 64,
+        "precision": 2 ** -20,
+        "ref-id": "GPS",
+        "ref-ts": 3709000000 + index,
+        "root-delay": 0,
+        "root-dispersion": 0.0005,
+        "stratum": 1,
+        "version": 4,
+        "result": packets,
+    })
+    return result
+
+
+def http(rng, index):
+    result = _common(rng, "http", index)
+    result.update({
+        "uri": "http://example.net/{}".format(index % 10),
+        "result": [{
+            "af": 4,
+            "dst_addr": _ipv4(rng),
+            "src_addr": "10.0.0.2",
+            "method": "GET",
+            "res": rng.choice((200, 200, 200, 301, 404)),
+            "ver": "1.1",
+            "hsize": rng.randint(100, 400),
+            "bsize": rng.randint(100, 100000),
+            "rt": round(rng.uniform(10, 1000), 3),
+        }],
+    })
+    return result
+
+
+GENERATORS = {
+    "ping": ping,
+    "traceroute": traceroute,
+    "dns": dns,
+    "sslcert": sslcert,
+    "ntp": ntp,
+    "http": http,
+}
+
+
+def build(kind, count, seed=0):
+    """
+    Returns ``count`` results of the given kind as JSON strings.
+    """
+
+    rng = random.Random("{}:{}".format(kind, seed))
+    generator = GENERATORS[kind]
+
+    if kind == "sslcert":
+        chains = _certificate_chains(min(count, 32))
+        return [
+            json.dumps(generator(rng, i, chains), sort_keys=True)
+            for i in range(count)
+        ]
+
+    return [json.dumps(generator(rng, i), sort_keys=True) for i in range(count)]
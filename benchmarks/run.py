@@ -0,0 +1,203 @@
+# Copyright (c) 2016 RIPE NCC
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Measures how many results per second Sagan parses, and how much memory each
+parsed result takes, for every measurement type.  Run it from the root of
+the repository:
+
+    $ python benchmarks/run.py
+    $ python benchmarks/run.py --save baseline.json
+    $ python benchmarks/run.py --compare baseline.json --tolerance 0.1
+
+With --compare, the exit status is 1 if any benchmark got slower or bigger
+than the baseline by more than the tolerance.
+"""
+
+import argparse
+import base64
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import corpora  # NOQA
+from ripe.atlas.sagan import Result  # NOQA
+from ripe.atlas.sagan.helpers.abuf import AbufParser  # NOQA
+
+
+def parse(raw):
+    return Result.get(raw)
+
+
+def parse_dns(raw):
+    # The abufs are parsed lazily, so make sure they are
+    result = Result.get(raw)
+    for response in result.responses:
+        response.abuf
+    return result
+
+
+def decode_abuf(raw):
+    return AbufParser.parse(raw)
+
+
+def _get_abufs(results):
+    return [
+        base64.b64decode(json.loads(result)["result"]["abuf"])
+        for result in results
+    ]
+
+
+# name: (corpus, how many results relative to --count, function, prepare)
+BENCHMARKS = {
+    "ping": ("ping", 1, parse, None),
+    "traceroute": ("traceroute", 0.1, parse, None),
+    "dns": ("dns", 0.1, parse_dns, None),
+    "abuf": ("dns", 0.1, decode_abuf, _get_abufs),
+    "sslcert": ("sslcert", 0.1, parse, None),
+    "ntp": ("ntp", 1, parse, None),
+    "http": ("http", 1, parse, None),
+}
+
+
+def measure_speed(function, items, repeat):
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        for item in items:
+            function(item)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return len(items) / best
+
+
+def measure_memory(function, items):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        kept = [function(item) for item in items]
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del kept
+    return (after - before) / len(items)
+
+
+def run(names, count, repeat, seed):
+
+    report = {}
+    corpus_cache = {}
+
+    for name in names:
+
+        corpus, scale, function, prepare = BENCHMARKS[name]
+        size = max(1, int(count * scale))
+
+        key = (corpus, size)
+        if key not in corpus_cache:
+            corpus_cache[key] = corpora.build(corpus, size, seed)
+        items = corpus_cache[key]
+        if prepare:
+            items = prepare(items)
+
+        report[name] = {
+            "results": size,
+            "results_per_second": round(measure_speed(function, items, repeat), 1),
+            "bytes_per_result": round(measure_memory(function, items)),
+        }
+
+        print("{:<12} {:>8} results {:>12.1f} results/s {:>10} bytes/result".format(
+            name, size, report[name]["results_per_second"],
+            report[name]["bytes_per_result"]))
+        sys.stdout.flush()
+
+    return report
+
+
+def compare(report, baseline, tolerance):
+    """
+    Prints how each benchmark compares to the baseline and returns False if
+    any of them is outside the tolerance.
+    """
+
+    ok = True
+    for name, values in sorted(report.items()):
+        if name not in baseline:
+            continue
+        speed = values["results_per_second"] / baseline[name]["results_per_second"]
+        memory = values["bytes_per_result"] / max(baseline[name]["bytes_per_result"], 1)
+        failed = speed < 1 - tolerance or memory > 1 + tolerance
+        if failed:
+            ok = False
+        print("{:<12} speed {:>+7.1%}  memory {:>+7.1%}  {}".format(
+            name, speed - 1, memory - 1, "FAIL" if failed else "ok"))
+    return ok
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "benchmarks", nargs="*", metavar="BENCHMARK",
+        help="The benchmarks to run: {}.  All of them by default.".format(
+            ", ".join(sorted(BENCHMARKS))))
+    parser.add_argument(
+        "--count", type=int, default=10000,
+        help="The number of results in the simple corpora.  The big ones "
+             "(traceroute, dns and sslcert) get a tenth of that.")
+    parser.add_argument(
+        "--repeat", type=int, default=3,
+        help="How many times to time each benchmark.  The best run counts.")
+    parser.add_argument(
+        "--seed", type=int, default=0, help="Seed for the corpora.")
+    parser.add_argument(
+        "--save", metavar="FILE", help="Write the results to FILE as JSON.")
+    parser.add_argument(
+        "--compare", metavar="FILE",
+        help="Compare the results to those saved in FILE.")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.1,
+        help="How much slower or bigger than the baseline is acceptable.")
+    args = parser.parse_args()
+
+    for name in args.benchmarks:
+        if name not in BENCHMARKS:
+            parser.error("Unknown benchmark: {}".format(name))
+
+    report = run(
+        args.benchmarks or sorted(BENCHMARKS), args.count, args.repeat,
+        args.seed)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if not compare(report, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
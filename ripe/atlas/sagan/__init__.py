@@ -22,6 +22,7 @@ from .ping import PingResult
 from .ssl import SslResult
 from .traceroute import TracerouteResult
 from .ntp import NtpResult
+from .bulk import iter_results, parse_many
 
 from .version import __version__
 
@@ -33,4 +34,6 @@ __all__ = (
     "SslResult",
     "HttpResult",
     "NtpResult",
+    "iter_results",
+    "parse_many",
 )
@@ -15,22 +15,45 @@
 
 import logging
 import pytz
+import re
+import types
 
 from calendar import timegm
+from collections.abc import Sequence
 from datetime import datetime
 
 from .helpers.compatibility import string
 
-# Try to use ujson if it's available
-try:
-    import ujson as json
-except ImportError:
-    import json
-
+import json
 
 log = logging.getLogger(__name__)
 
 
+# What we'll accept as an undecoded JSON result
+ENCODED_TYPES = (string, bytes, bytearray, memoryview)
+
+# Used by Result.sniff() to find values without decoding the whole result.
+# Each key is also counted on its own so that we can tell when it appears
+# more than once and we can't be sure which one belongs to the result.
+SNIFF_PATTERNS = (
+    ("type", r'"type"\s*:', r'"type"\s*:\s*"([^"\\]*)"'),
+    ("msm_id", r'"msm_id"\s*:', r'"msm_id"\s*:\s*(\d+)\s*[,}]'),
+    ("prb_id", r'"prb_id"\s*:', r'"prb_id"\s*:\s*(\d+)\s*[,}]'),
+)
+SNIFF_KEYS = tuple(key for key, _, _ in SNIFF_PATTERNS)
+COMPILED_SNIFF_PATTERNS = {
+    str: dict(
+        (key, (re.compile(key_pattern), re.compile(value_pattern)))
+        for key, key_pattern, value_pattern in SNIFF_PATTERNS
+    ),
+    bytes: dict(
+        (key, (re.compile(key_pattern.encode()),
+               re.compile(value_pattern.encode())))
+        for key, key_pattern, value_pattern in SNIFF_PATTERNS
+    ),
+}
+
+
 class ResultParseError(Exception):
     pass
 
@@ -39,25 +62,193 @@ class ResultError(Exception):
     pass
 
 
+def _get_orjson():
+    import orjson
+    return orjson.loads
+
+
+def _get_simdjson():
+    import simdjson
+
+    def loads(data):
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        return simdjson.loads(data)
+
+    return loads
+
+
+def _get_ujson():
+    import ujson
+
+    def loads(data):
+        if isinstance(data, (bytearray, memoryview)):
+            data = bytes(data)
+        return ujson.loads(data)
+
+    return loads
+
+
+def _get_json():
+
+    def loads(data):
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        return json.loads(data, strict=False)
+
+    return loads
+
+
 class Json(object):
     """
-    ujson, while impressive, is not a drop-in replacement for json as it doesn't
-    respect the various keyword arguments permitted in the default json parser.
-    As a workaround for this, we have our own class that defines its own
-    .loads() method, so we can check for whichever we're using and adjust the
-    arguments accordingly.
+    Decodes JSON with the fastest library we can find.  Each backend is
+    registered under a name along with a function that imports it and returns
+    a .loads() that accepts strings as well as bytes, bytearrays and
+    memoryviews.  The first one in BACKENDS that can be imported is used,
+    unless you pick another with Json.use().
+
+    The faster libraries are stricter than the standard json module, which
+    we run with strict=False to allow for control characters in strings, so
+    whatever they reject is given to json before we give up on it.
     """
 
-    @staticmethod
-    def loads(*args, **kwargs):
+    BACKENDS = ["orjson", "simdjson", "ujson", "json"]
+
+    _registry = {
+        "orjson": _get_orjson,
+        "simdjson": _get_simdjson,
+        "ujson": _get_ujson,
+        "json": _get_json,
+    }
+
+    name = None
+    _loads = None
+    _fallback = None
+
+    @classmethod
+    def register(cls, name, factory, preferred=False):
+        """
+        Adds a backend.  ``factory`` is called without arguments when the
+        backend is picked and must return the decoding function, or raise
+        ImportError if the library isn't available.
+        """
+        cls._registry[name] = factory
+        if name not in cls.BACKENDS:
+            if preferred:
+                cls.BACKENDS.insert(0, name)
+            else:
+                cls.BACKENDS.insert(len(cls.BACKENDS) - 1, name)
+
+    @classmethod
+    def use(cls, name=None):
+        """
+        Switches to the named backend, or to the first available one in
+        BACKENDS if no name is given.  Returns the name of the backend in use.
+        """
+
+        for candidate in [name] if name else cls.BACKENDS:
+            try:
+                factory = cls._registry[candidate]
+            except KeyError:
+                raise ValueError(
+                    "Unknown JSON backend: {}".format(candidate))
+            try:
+                cls._loads = staticmethod(factory())
+            except ImportError:
+                if name:
+                    raise
+                continue
+            cls.name = candidate
+            return candidate
+
+    @classmethod
+    def loads(cls, data):
+
+        if cls._loads is None:
+            cls.use()
+
+        try:
+            return cls._loads(data)
+        except (ValueError, TypeError):
+            if cls.name == "json":
+                raise ResultParseError("The JSON result could not be parsed")
+
+        if cls._fallback is None:
+            cls._fallback = staticmethod(_get_json())
         try:
-            if json.__name__ == "ujson":
-                return json.loads(*args, **kwargs)
-            return json.loads(strict=False, *args, **kwargs)
-        except ValueError:
+            return cls._fallback(data)
+        except (ValueError, TypeError):
             raise ResultParseError("The JSON result could not be parsed")
 
 
+class LazySequence(Sequence):
+    """
+    A read-only list of ``length`` items, each of which is only made, by
+    calling ``loader(index)``, when it's first read.  It compares equal to a
+    list of the same items, and pickles as one.
+    """
+
+    __slots__ = ("_loader", "_items")
+
+    _NOT_LOADED = object()
+
+    def __init__(self, loader, length):
+        self._loader = loader
+        self._items = [self._NOT_LOADED] * length
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        item = self._items[index]
+        if item is self._NOT_LOADED:
+            if index < 0:
+                index += len(self._items)
+            item = self._items[index] = self._loader(index)
+        return item
+
+    def __eq__(self, other):
+        if isinstance(other, (list, LazySequence)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def __reduce__(self):
+        return list, (list(self),)
+
+
+def parsed_property(name, ensure):
+    """
+    A property for a value that's worked out by the method called ``ensure``
+    (which may happen lazily) and kept in ``_<name>``.  It can still be set
+    like a plain attribute: the value set replaces whatever was worked out.
+    """
+
+    attribute = "_" + name
+
+    def get(self):
+        getattr(self, ensure)()
+        return getattr(self, attribute)
+
+    def set(self, value):
+        getattr(self, ensure)()
+        setattr(self, attribute, value)
+
+    return property(get, set)
+
+
 class ParsingDict(object):
     """
     A handy container for methods we use for validation in the various result
@@ -67,6 +258,16 @@ class ParsingDict(object):
     differently.  If we write it this way, it works for both.
     """
 
+    # Subclasses that are created in great numbers (packets, hops, answers...)
+    # declare __slots__ as well, so they don't each carry a __dict__ around.
+    __slots__ = (
+        "_on_error",
+        "is_error",
+        "error_message",
+        "_on_malformation",
+        "is_malformed",
+    )
+
     ACTION_IGNORE = 1
     ACTION_WARN = 2
     ACTION_FAIL = 3
@@ -83,6 +284,14 @@ class ParsingDict(object):
         "T":    PROTOCOL_TCP,
     }
 
+    # Properties that only exist for backwards compatibility and that keys()
+    # and friends should therefore leave alone.
+    DEPRECATED_PROPERTIES = ()
+
+    # Properties that are a shortcut to values found elsewhere in the object,
+    # which keys() and to_dict() would otherwise list twice.
+    SHORTCUT_PROPERTIES = ()
+
     def __init__(self, **kwargs):
 
         self._on_error = kwargs.pop("on_error", self.ACTION_WARN)
@@ -97,6 +306,8 @@ class ParsingDict(object):
         # via __len__()  whenever we evaluate the object as a bool.
         return True
 
+    __bool__ = __nonzero__
+
     def __len__(self):
         return len(self.keys())
 
@@ -111,7 +322,61 @@ class ParsingDict(object):
         setattr(self, key, item)
 
     def keys(self):
-        return [p for p in dir(self) if self._is_property_name(p)]
+        class_keys, slot_keys = self._get_class_keys()
+        keys = set(class_keys)
+        keys.update(k for k in slot_keys if hasattr(self, k))
+        for key, value in getattr(self, "__dict__", {}).items():
+            if self._is_key_name(key) and not callable(value):
+                keys.add(key)
+        return sorted(keys)
+
+    def to_dict(self):
+        """
+        Returns everything in keys() except for raw_data as a plain dict,
+        converting any nested objects along the way.
+        """
+        return dict(
+            (key, self._to_dict_value(getattr(self, key)))
+            for key in self.keys() if key != "raw_data"
+        )
+
+    @classmethod
+    def _to_dict_value(cls, value):
+        if isinstance(value, ParsingDict):
+            return value.to_dict()
+        if isinstance(value, (list, LazySequence)):
+            return [cls._to_dict_value(v) for v in value]
+        return value
+
+    def drop_raw_data(self):
+        """
+        Throws away the source data (``raw_data``) of this object and all of
+        the objects parsed from it.  Everything Sagan parsed is kept, so this
+        is handy when you want to keep a lot of results in memory.
+        """
+        for child in self._get_children():
+            child.drop_raw_data()
+        if hasattr(self, "raw_data"):
+            self.raw_data = None
+
+    def _get_children(self):
+        """
+        Returns the ParsingDict instances hanging off of this one, either
+        directly or in a list.
+        """
+
+        values = list(getattr(self, "__dict__", {}).values())
+        for klass in type(self).__mro__:
+            for name in klass.__dict__.get("__slots__", ()):
+                values.append(getattr(self, name, None))
+
+        children = []
+        for value in values:
+            if isinstance(value, ParsingDict):
+                children.append(value)
+            elif isinstance(value, (list, LazySequence)):
+                children.extend(v for v in value if isinstance(v, ParsingDict))
+        return children
 
     def ensure(self, key, kind, default=None):
         try:
@@ -152,13 +417,46 @@ class ParsingDict(object):
         self.is_error = True
         self.error_message = message
 
-    def _is_property_name(self, p):
-        if not p.startswith("_"):
-            if p not in ("keys",):
-                if not p.upper() == p:
-                    if not callable(getattr(self, p)):
-                        return True
-        return False
+    @staticmethod
+    def _is_key_name(p):
+        return not p.startswith("_") and p != "keys" and p.upper() != p
+
+    @classmethod
+    def _get_class_keys(cls):
+        """
+        Works out which keys are defined by the class itself (properties and
+        plain class attributes) and which of its slots could hold a key.
+        Walking the class hierarchy is expensive, so we only do it once per
+        class.
+        """
+
+        if "_class_keys" in cls.__dict__:
+            return cls._class_keys
+
+        class_keys = []
+        slot_keys = []
+        seen = set()
+        for klass in cls.__mro__:
+            for name, value in klass.__dict__.items():
+                if name in seen:
+                    continue
+                seen.add(name)
+                if not cls._is_key_name(name):
+                    continue
+                if name in cls.DEPRECATED_PROPERTIES:
+                    continue
+                if name in cls.SHORTCUT_PROPERTIES:
+                    continue
+                if isinstance(value, types.MemberDescriptorType):
+                    slot_keys.append(name)
+                elif isinstance(value, property):
+                    class_keys.append(name)
+                elif not isinstance(value, (staticmethod, classmethod)):
+                    if not callable(value):
+                        class_keys.append(name)
+
+        cls._class_keys = (tuple(class_keys), tuple(slot_keys))
+        return cls._class_keys
 
 
 class Result(ParsingDict):
@@ -173,7 +471,7 @@ class Result(ParsingDict):
         ParsingDict.__init__(self, **kwargs)
 
         self.raw_data = data
-        if isinstance(data, string):
+        if isinstance(data, ENCODED_TYPES):
             self.raw_data = Json.loads(data)
 
         for key in ("timestamp", "msm_id", "prb_id", "fw", "type"):
@@ -222,47 +520,125 @@ class Result(ParsingDict):
         return timegm(self.created.timetuple())
 
     @classmethod
-    def get(cls, data, **kwargs):
+    def get(cls, data, keep_raw_data=True, **kwargs):
         """
         Call this when you have a JSON result and just want to turn it into the
-        appropriate Result subclass.  This is less performant than calling
-        PingResult(json_string) directly however, as the JSON has to be parsed
-        first to find the type.
+        appropriate Result subclass.  The type is sniffed out of JSON strings
+        (see .sniff()) so they're only decoded once, by the subclass.
+
+        Set `keep_raw_data=False` to have `.drop_raw_data()` called on the
+        result before it's returned.
         """
 
-        raw_data = data
-        if isinstance(data, string):
-            raw_data = Json.loads(data)
+        result = cls._get(data, **kwargs)
+        if not keep_raw_data:
+            result.drop_raw_data()
+        return result
 
-        try:
-            kind = raw_data["type"].lower()
-        except KeyError:
+    @classmethod
+    def _get(cls, data, **kwargs):
+
+        # Strings are decoded by the subclass, so we only decode them here if
+        # the type can't be sniffed out
+        sniffed, data = cls._sniff(data, ("type",))
+        if sniffed["type"] is None:
             raise ResultParseError("No type value was found in the JSON input")
 
+        return cls.get_class(sniffed["type"])(data, **kwargs)
+
+    @staticmethod
+    def get_class(kind):
+        """
+        Returns the Result subclass for the given measurement type.
+        """
+
+        kind = kind.lower()
+
         if kind == "ping":
             from .ping import PingResult
-            return PingResult(raw_data, **kwargs)
+            return PingResult
         elif kind == "traceroute":
             from .traceroute import TracerouteResult
-            return TracerouteResult(raw_data, **kwargs)
+            return TracerouteResult
         elif kind == "dns":
             from .dns import DnsResult
-            return DnsResult(raw_data, **kwargs)
+            return DnsResult
         elif kind == "sslcert":
             from .ssl import SslResult
-            return SslResult(raw_data, **kwargs)
+            return SslResult
         elif kind == "http":
             from .http import HttpResult
-            return HttpResult(raw_data, **kwargs)
+            return HttpResult
         elif kind == "ntp":
             from .ntp import NtpResult
-            return NtpResult(raw_data, **kwargs)
+            return NtpResult
         elif kind == "wifi":
             from .wifi import WiFiResult
-            return WiFiResult(raw_data, **kwargs)
+            return WiFiResult
 
         raise ResultParseError("Unknown type value was found in the JSON input")
 
+    @classmethod
+    def sniff(cls, data):
+        """
+        Returns a dictionary with the (lowercase) ``type``, ``msm_id`` and
+        ``prb_id`` of a result, or ``None`` for any of them that's missing.
+        For JSON strings these are picked out with a few regular expressions
+        rather than by decoding the whole thing, which is a lot cheaper when
+        all you want to know is whether a result is worth parsing.  If a key
+        can't be found that way, say because it appears more than once, the
+        string is decoded after all.
+        """
+        return cls._sniff(data, SNIFF_KEYS)[0]
+
+    @staticmethod
+    def _sniff(data, keys):
+        """
+        Does the work for .sniff() and also returns the data, decoded if that
+        turned out to be necessary.
+        """
+
+        if isinstance(data, ENCODED_TYPES):
+            patterns = COMPILED_SNIFF_PATTERNS[
+                str if isinstance(data, string) else bytes]
+            sniffed = {}
+            for key in keys:
+                key_pattern, value_pattern = patterns[key]
+                if len(key_pattern.findall(data)) != 1:
+                    break
+                match = value_pattern.search(data)
+                if not match:
+                    break
+                sniffed[key] = match.group(1)
+            else:
+                if "type" in sniffed:
+                    kind = sniffed["type"]
+                    if not isinstance(kind, string):
+                        kind = kind.decode("utf-8")
+                    sniffed["type"] = kind.lower()
+                for key in ("msm_id", "prb_id"):
+                    if key in sniffed:
+                        sniffed[key] = int(sniffed[key])
+                return sniffed, data
+            data = Json.loads(data)
+
+        kind = data.get("type")
+        if isinstance(kind, string):
+            kind = kind.lower()
+        else:
+            kind = None
+
+        sniffed = {"type": kind}
+        for key in keys:
+            if key == "type":
+                continue
+            try:
+                sniffed[key] = int(data[key])
+            except (KeyError, TypeError, ValueError):
+                sniffed[key] = None
+
+        return sniffed, data
+
     @staticmethod
     def calculate_median(given_list):
         """
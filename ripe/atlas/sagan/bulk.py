@@ -0,0 +1,373 @@
+# Copyright (c) 2016 RIPE NCC
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Helpers for working with many results at once, like the daily dumps or the
+output of ``/results/?format=txt``: one JSON result per line.
+"""
+
+import base64
+import bz2
+import gzip
+import io
+import lzma
+import os
+
+from collections import deque, namedtuple
+from concurrent.futures import (
+    FIRST_COMPLETED, ProcessPoolExecutor, wait as wait_for_futures)
+
+from .base import Result
+from .dns import Message
+from .helpers.abuf import AbufParser
+from .helpers.raw import decode, ensure
+
+
+# The first bytes of each of the compressed formats we understand
+MAGIC_NUMBERS = (
+    (b"\x1f\x8b", gzip),
+    (b"BZh", bz2),
+    (b"\xfd7zXZ\x00", lzma),
+)
+
+
+def _get_decompressor(head):
+    for magic, module in MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return module
+    return None
+
+
+def open_results(source):
+    """
+    Returns a file object for ``source``, which can be either a path or an
+    already opened file.  Paths are opened in binary mode and transparently
+    decompressed if they're gzip, bz2 or xz files.  File objects are used
+    as-is, unless they're binary, compressed and can be peeked at.
+    """
+
+    if isinstance(source, (str, bytes, os.PathLike)):
+        with io.open(source, "rb") as f:
+            module = _get_decompressor(f.read(6))
+        if module:
+            return module.open(source, "rb")
+        return io.open(source, "rb")
+
+    if hasattr(source, "peek"):
+        module = _get_decompressor(source.peek(6)[:6])
+        if module:
+            return module.open(source, "rb")
+
+    return source
+
+
+def iter_lines(source):
+    """
+    Lazily yields each result line found in ``source`` (see
+    ``open_results()``).  Lines from binary files, which includes any file
+    opened from a path, are yielded as bytes, since they can be decoded
+    without turning them into strings first.  Blank lines are skipped.  Only
+    the current line is held in memory, so this is safe to use on
+    multi-gigabyte files.
+    """
+
+    fileobj = open_results(source)
+    try:
+        for line in fileobj:
+            line = line.strip()
+            if line:
+                yield line
+    finally:
+        # Only close what we opened ourselves
+        if fileobj is not source:
+            fileobj.close()
+
+
+def select_results(iterable, types=None, measurement_ids=None,
+                   probe_ids=None):
+    """
+    Yields only those raw results (JSON strings, bytes or dicts) in
+    ``iterable`` that are of one of the given ``types`` and belong to one of
+    the given measurement and probe ids.  Leave a filter as ``None`` to let
+    everything through.  This only uses ``Result.sniff()``, so results that
+    don't make the cut are never fully decoded.
+    """
+
+    filters = []
+    for key, values in (("type", types), ("msm_id", measurement_ids),
+                        ("prb_id", probe_ids)):
+        if values is not None:
+            if key == "type":
+                values = [value.lower() for value in values]
+            filters.append((key, frozenset(values)))
+
+    for item in iterable:
+        if filters:
+            sniffed = Result.sniff(item)
+            if not all(sniffed[key] in values for key, values in filters):
+                continue
+        yield item
+
+
+def iter_results(source, types=None, measurement_ids=None, probe_ids=None,
+                 **kwargs):
+    """
+    Lazily yields a ``Result`` subclass instance for every line in
+    ``source``, optionally limited to the given ``types``,
+    ``measurement_ids`` and ``probe_ids`` (see ``select_results()``).  Any
+    other keyword arguments are passed on to ``Result.get()``.
+    """
+
+    lines = select_results(
+        iter_lines(source), types, measurement_ids, probe_ids)
+    for line in lines:
+        yield Result.get(line, **kwargs)
+
+
+def _chunk(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _parse_chunk(chunk, kwargs):
+    return [Result.get(item, **kwargs) for item in chunk]
+
+
+def _fan_out(function, chunks, workers, ordered, *args):
+    """
+    Runs ``function(chunk, *args)`` for every chunk over a pool of
+    ``workers`` processes and yields the returned values.  Only a couple of
+    chunks per worker are in flight at any time, so memory use stays bounded
+    even when ``chunks`` is an endless stream.
+    """
+
+    executor = ProcessPoolExecutor(max_workers=workers)
+    backlog = workers * 2
+    try:
+
+        if ordered:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(executor.submit(function, chunk, *args))
+                if len(pending) >= backlog:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+            return
+
+        pending = set()
+        for chunk in chunks:
+            pending.add(executor.submit(function, chunk, *args))
+            if len(pending) >= backlog:
+                done, pending = wait_for_futures(
+                    pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        while pending:
+            done, pending = wait_for_futures(
+                pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def parse_many(iterable, workers=None, ordered=True, chunk_size=500,
+               types=None, measurement_ids=None, probe_ids=None, **kwargs):
+    """
+    Parses every raw result (JSON string, bytes or dict) in ``iterable`` with
+    ``Result.get()``, spreading the work over ``workers`` processes (the
+    number of CPUs by default) in chunks of ``chunk_size`` results.  Parsed
+    results are pickled back to this process and yielded in input order,
+    or as soon as their chunk is done if ``ordered`` is ``False``.  Any
+    other keyword arguments are passed on to ``Result.get()``, so they must
+    be picklable.
+
+    ``types``, ``measurement_ids`` and ``probe_ids`` are applied in this
+    process before anything is sent to the workers (see
+    ``select_results()``).  With ``workers=1`` everything happens in this
+    process.
+    """
+
+    iterable = select_results(iterable, types, measurement_ids, probe_ids)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers <= 1:
+        for item in iterable:
+            yield Result.get(item, **kwargs)
+        return
+
+    chunks = _chunk(iterable, chunk_size)
+    for results in _fan_out(_parse_chunk, chunks, workers, ordered, kwargs):
+        for result in results:
+            yield result
+
+
+# One for every question and record in the buffers of a DNS result.  The
+# ``data`` is a tuple of the values that are particular to the record type,
+# like the address of an A record, in the order AbufParser finds them.
+DnsRecord = namedtuple("DnsRecord", (
+    "measurement_id",
+    "probe_id",
+    "created_timestamp",
+    "response",
+    "buffer",
+    "section",
+    "name",
+    "type",
+    "klass",
+    "ttl",
+    "data",
+))
+
+DNS_SECTION_KEYS = (
+    ("questions", "QuestionSection"),
+    ("answers", "AnswerSection"),
+    ("authorities", "AuthoritySection"),
+    ("additionals", "AdditionalSection"),
+)
+
+# The keys that every record has, and that aren't part of its data
+DNS_RECORD_KEYS = frozenset(("Name", "Type", "Class", "TTL", "RDlength"))
+
+
+def _get_dns_buffers(data, buffers):
+    """
+    Yields the index of the response and the kind and base64 string of each
+    of the requested buffers of a DNS result, whether it has a single
+    response or a set of them.  As DnsResult does, a single response gets the
+    qbuf that sits next to it.
+    """
+
+    responses = []
+    if isinstance(data.get("result"), dict):
+        response = data["result"]
+        if "qbuf" in data and "qbuf" not in response:
+            response = dict(response, qbuf=data["qbuf"])
+        responses.append(response)
+    responses.extend(ensure(data, "resultset", list, []))
+
+    for index, response in enumerate(responses):
+        for kind in buffers:
+            try:
+                buf = response["result"][kind]
+            except (KeyError, TypeError):
+                buf = response.get(kind)
+            if buf:
+                yield index, kind, buf
+
+
+def _get_record_data(record):
+    return tuple(
+        tuple(value) if isinstance(value, list) else value
+        for key, value in record.items() if key not in DNS_RECORD_KEYS
+    )
+
+
+def _get_dns_records(iterable, buffers, options):
+
+    records = []
+
+    for raw in iterable:
+
+        data = decode(raw, "dns")
+        if data is None:
+            continue
+
+        measurement_id = ensure(data, "msm_id", int)
+        probe_id = ensure(data, "prb_id", int)
+        created = ensure(data, "timestamp", int)
+
+        for index, kind, buf in _get_dns_buffers(data, buffers):
+
+            try:
+                parsed = AbufParser.parse(base64.b64decode(buf), options)
+            except Exception:
+                continue
+
+            for section, key in DNS_SECTION_KEYS:
+                for record in parsed.get(key, ()):
+                    if section == "questions":
+                        records.append(DnsRecord(
+                            measurement_id, probe_id, created, index, kind,
+                            section, record.get("Qname"),
+                            record.get("Qtype"), record.get("Qclass"), None,
+                            ()
+                        ))
+                    else:
+                        records.append(DnsRecord(
+                            measurement_id, probe_id, created, index, kind,
+                            section, record.get("Name"), record.get("Type"),
+                            record.get("Class"), record.get("TTL"),
+                            _get_record_data(record)
+                        ))
+
+    return records
+
+
+def iter_dns_records(iterable, buffers=("abuf",), sections=None, workers=1,
+                     ordered=True, chunk_size=500):
+    """
+    Decodes the buffers of every raw DNS result (JSON string, bytes or dict)
+    in ``iterable`` straight into ``DnsRecord`` tuples, without building any
+    of the objects a ``DnsResult`` would.  Results of other types are
+    skipped.
+
+    ``buffers`` says which of each response's ``abuf`` and ``qbuf`` to
+    decode, and ``sections`` can limit the records to those of some sections
+    (see ``DnsResult``).  The ``response`` of each record is the index of its
+    response within the result.  Buffers that can't be parsed at all are
+    skipped, and those that are only partly broken give the records found
+    before the problem.
+
+    With ``workers`` greater than 1, the results are decoded over a pool of
+    that many processes in chunks of ``chunk_size`` (see ``parse_many()``).
+    """
+
+    options = Message.get_parse_options(sections)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers <= 1:
+        for chunk in _chunk(iterable, chunk_size):
+            for record in _get_dns_records(chunk, buffers, options):
+                yield record
+        return
+
+    chunks = _chunk(iterable, chunk_size)
+    for records in _fan_out(
+            _get_dns_records, chunks, workers, ordered, buffers, options):
+        for record in records:
+            yield record
+
+
+__all__ = (
+    "open_results",
+    "iter_lines",
+    "select_results",
+    "iter_results",
+    "parse_many",
+    "iter_dns_records",
+)
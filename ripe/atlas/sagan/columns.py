@@ -0,0 +1,276 @@
+# Copyright (c) 2016 RIPE NCC
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Converters that turn a stream of raw results straight into columns of
+numbers, one array per value, without building a Result object for each of
+them.  The arrays are NumPy arrays if NumPy is installed and ``array.array``
+objects otherwise.
+
+Integers that are missing from a result are stored as ``-1`` and floats as
+``nan``.  String columns are dictionary encoded: the column itself holds
+indexes into a plain list of the distinct values, found under
+``<column>_values``, which is the layout Arrow uses for its dictionary arrays.
+"""
+
+from array import array
+
+from .base import Result, ResultParseError
+from .helpers.raw import decode, ensure
+
+# NumPy is optional
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+MISSING_INT = -1
+MISSING_FLOAT = float("nan")
+
+PING_COLUMNS = (
+    ("measurement_id", "q"),
+    ("probe_id", "q"),
+    ("created_timestamp", "q"),
+    ("af", "b"),
+    ("packets_sent", "l"),
+    ("packets_received", "l"),
+    ("duplicates", "l"),
+    ("rtt_min", "d"),
+    ("rtt_average", "d"),
+    ("rtt_median", "d"),
+    ("rtt_max", "d"),
+    # Every packet of result i is found at packet_offsets[i]:packet_offsets[i+1]
+    ("packet_offsets", "q"),
+    ("packet_rtt", "d"),
+    ("packet_dup", "b"),
+)
+
+# One row per packet, plus one for every hop that has no packets at all
+TRACEROUTE_COLUMNS = (
+    ("measurement_id", "q"),
+    ("probe_id", "q"),
+    ("created_timestamp", "q"),
+    ("hop", "l"),
+    ("origin", "l"),
+    ("rtt", "d"),
+    ("ttl", "l"),
+    ("error", "l"),
+    ("late", "l"),
+)
+
+
+def _get_columns(spec):
+    return dict((name, array(typecode)) for name, typecode in spec)
+
+
+class _Dictionary(object):
+    """
+    Hands out a stable index for every distinct value it's given.
+    """
+
+    def __init__(self):
+        self.values = []
+        self._indexes = {}
+
+    def index(self, value):
+        if value is None:
+            return MISSING_INT
+        try:
+            return self._indexes[value]
+        except KeyError:
+            self._indexes[value] = len(self.values)
+            self.values.append(value)
+            return self._indexes[value]
+
+
+def _finish(columns, as_numpy):
+    """
+    Hands the columns back as NumPy arrays, without copying them, if we've
+    been asked to or if NumPy is around and we haven't been asked not to.
+    """
+
+    if as_numpy is None:
+        as_numpy = numpy is not None
+    if not as_numpy:
+        return columns
+    if numpy is None:
+        raise ImportError("NumPy is required for as_numpy=True")
+    return dict(
+        (name, numpy.frombuffer(column, dtype=column.typecode))
+        if isinstance(column, array) else (name, column)
+        for name, column in columns.items()
+    )
+
+
+def _get_ping_rtts(data):
+    rtts = []
+    for packet in ensure(data, "result", list, []):
+        rtt = None
+        if "rtt" in packet:
+            try:
+                rtt = round(float(packet["rtt"]), 3)
+            except (ValueError, TypeError):
+                raise ResultParseError(
+                    'RTT "{rtt}" does not appear to be a float'.format(
+                        rtt=packet["rtt"]
+                    )
+                )
+        rtts.append((rtt, "dup" in packet))
+    return rtts
+
+
+def ping_columns(iterable, as_numpy=None):
+    """
+    Parses every raw ping result (JSON string or dict) in ``iterable`` into
+    the columns listed in ``PING_COLUMNS``, calculating the same values a
+    ``PingResult`` would.  Results of other types are skipped.
+
+    The RTTs of all of the packets go into the flat ``packet_rtt`` column
+    (``nan`` where no reply came back), and the packets of the ``i``th
+    result are those between ``packet_offsets[i]`` and
+    ``packet_offsets[i + 1]``.
+
+    Set ``as_numpy`` to ``False`` to always get ``array.array`` objects.
+    """
+
+    columns = _get_columns(PING_COLUMNS)
+    columns["packet_offsets"].append(0)
+
+    for raw in iterable:
+
+        data = decode(raw, "ping")
+        if data is None:
+            continue
+
+        firmware = ensure(data, "fw", int)
+        average = ensure(data, "avg", float)
+        minimum = ensure(data, "min", float)
+        maximum = ensure(data, "max", float)
+        if average is None or average < 0:
+            average = minimum = maximum = None
+        elif average:
+            average = round(average, 3)
+
+        af = ensure(data, "af", int)
+        destination_address = ensure(data, "dst_addr", str)
+        if 0 < firmware < 4460:
+            af = ensure(data, "pf", int)
+            destination_address = ensure(data, "addr", str)
+        if af is None and destination_address:
+            af = 6 if ":" in destination_address else 4
+
+        rtts = _get_ping_rtts(data)
+        median = Result.calculate_median(
+            [rtt for rtt, dup in rtts if rtt is not None and not dup])
+
+        for name, value in (
+                ("measurement_id", ensure(data, "msm_id", int)),
+                ("probe_id", ensure(data, "prb_id", int)),
+                ("created_timestamp", ensure(data, "timestamp", int)),
+                ("af", af),
+                ("packets_sent", ensure(data, "sent", int)),
+                ("packets_received", ensure(data, "rcvd", int)),
+                ("duplicates", ensure(data, "dup", int))):
+            columns[name].append(MISSING_INT if value is None else value)
+
+        for name, value in (
+                ("rtt_min", minimum),
+                ("rtt_average", average),
+                ("rtt_median", median),
+                ("rtt_max", maximum)):
+            columns[name].append(MISSING_FLOAT if value is None else value)
+
+        for rtt, dup in rtts:
+            columns["packet_rtt"].append(MISSING_FLOAT if rtt is None else rtt)
+            columns["packet_dup"].append(dup)
+        columns["packet_offsets"].append(len(columns["packet_rtt"]))
+
+    return _finish(columns, as_numpy)
+
+
+def traceroute_columns(iterable, as_numpy=None):
+    """
+    Parses every raw traceroute result (JSON string or dict) in ``iterable``
+    into a flat table of hops with the columns listed in
+    ``TRACEROUTE_COLUMNS``.  There's a row for every packet, carrying the
+    measurement, probe and timestamp of its result and the index of its hop,
+    and one for each hop that has no packets, like those that only have an
+    ``error``.  Results of other types, or in legacy formats, are skipped.
+
+    ``origin`` and ``error`` are dictionary encoded (see above); ``error``
+    holds the raw ``err`` code of the packet, or the ``error`` of the hop.
+    Packets that arrived late are included, with ``late`` set to the number
+    of packets they're late by, so you'll want to filter on ``late == 0`` to
+    get the packets a ``Hop`` would have.
+
+    Set ``as_numpy`` to ``False`` to always get ``array.array`` objects.
+    """
+
+    columns = _get_columns(TRACEROUTE_COLUMNS)
+    origins = _Dictionary()
+    errors = _Dictionary()
+
+    for raw in iterable:
+
+        data = decode(raw, "traceroute")
+        if data is None:
+            continue
+
+        hops = data.get("result")
+        if not isinstance(hops, list):
+            continue
+
+        measurement_id = ensure(data, "msm_id", int)
+        probe_id = ensure(data, "prb_id", int)
+        created = ensure(data, "timestamp", int)
+
+        for hop in hops:
+
+            index = ensure(hop, "hop", int, MISSING_INT)
+
+            packets = hop.get("result")
+            if not packets:
+                packets = [{"err": hop["error"]} if "error" in hop else {}]
+
+            for packet in packets:
+
+                rtt = ensure(packet, "rtt", float)
+                if rtt:
+                    rtt = round(rtt, 3)
+
+                columns["measurement_id"].append(measurement_id)
+                columns["probe_id"].append(probe_id)
+                columns["created_timestamp"].append(created)
+                columns["hop"].append(index)
+                columns["origin"].append(
+                    origins.index(ensure(packet, "from", str)))
+                columns["rtt"].append(MISSING_FLOAT if rtt is None else rtt)
+                columns["ttl"].append(ensure(packet, "ttl", int, MISSING_INT))
+                columns["error"].append(
+                    errors.index(ensure(packet, "err", str) or None))
+                columns["late"].append(ensure(packet, "late", int, 0))
+
+    columns = _finish(columns, as_numpy)
+    columns["origin_values"] = origins.values
+    columns["error_values"] = errors.values
+
+    return columns
+
+
+__all__ = (
+    "ping_columns",
+    "traceroute_columns",
+)
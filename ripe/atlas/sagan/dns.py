@@ -20,13 +20,32 @@ from collections import namedtuple
 from datetime import datetime
 from pytz import UTC
 
-from .base import Result, ParsingDict
+from .base import Result, ParsingDict, LazySequence
 from .helpers import abuf
 from .helpers import compatibility
 
 
 class Header(ParsingDict):
 
+    __slots__ = (
+        "raw_data",
+        "aa",
+        "qr",
+        "nscount",
+        "qdcount",
+        "ancount",
+        "tc",
+        "rd",
+        "arcount",
+        "return_code",
+        "opcode",
+        "ra",
+        "z",
+        "ad",
+        "cd",
+        "id",
+    )
+
     def __init__(self, data, **kwargs):
 
         ParsingDict.__init__(self, **kwargs)
@@ -121,6 +140,8 @@ class Header(ParsingDict):
 
 class Option(ParsingDict):
 
+    __slots__ = ("raw_data", "nsid", "code", "length", "name")
+
     def __init__(self, data, **kwargs):
 
         ParsingDict.__init__(self, **kwargs)
@@ -134,6 +155,18 @@ class Option(ParsingDict):
 
 class Edns0(ParsingDict):
 
+    __slots__ = (
+        "raw_data",
+        "extended_return_code",
+        "name",
+        "type",
+        "udp_size",
+        "version",
+        "z",
+        "do",
+        "options",
+    )
+
     def __init__(self, data, **kwargs):
 
         ParsingDict.__init__(self, **kwargs)
@@ -156,6 +189,8 @@ class Edns0(ParsingDict):
 
 class Question(ParsingDict):
 
+    __slots__ = ("raw_data", "klass", "type", "name")
+
     def __init__(self, data, **kwargs):
 
         ParsingDict.__init__(self, **kwargs)
@@ -171,6 +206,16 @@ class Question(ParsingDict):
 
 class Answer(ParsingDict):
 
+    __slots__ = (
+        "raw_data",
+        "name",
+        "ttl",
+        "type",
+        "klass",
+        "rd_length",
+        "rdata",
+    )
+
     def __init__(self, data, **kwargs):
 
         ParsingDict.__init__(self, **kwargs)
@@ -200,6 +245,8 @@ class Answer(ParsingDict):
 
 class AAnswer(Answer):
 
+    __slots__ = ("address",)
+
     def __init__(self, data, **kwargs):
         Answer.__init__(self, data, **kwargs)
         self.address = self.ensure("Address", str)
@@ -209,11 +256,13 @@ class AAnswer(Answer):
 
 
 class AaaaAnswer(AAnswer):
-    pass
+    __slots__ = ()
 
 
 class NsAnswer(Answer):
 
+    __slots__ = ("target",)
+
     def __init__(self, data, **kwargs):
         Answer.__init__(self, data, **kwargs)
         self.target = self.ensure("Target", str)
@@ -223,11 +272,13 @@ class NsAnswer(Answer):
 
 
 class CnameAnswer(NsAnswer):
-    pass
+    __slots__ = ()
 
 
 class MxAnswer(Answer):
 
+    __slots__ = ("preference", "mail_exchanger")
+
     def __init__(self, data, **kwargs):
         Answer.__init__(self, data, **kwargs)
         self.preference = self.ensure("Preference", int)
@@ -243,6 +294,16 @@ class MxAnswer(Answer):
 
 class SoaAnswer(Answer):
 
+    __slots__ = (
+        "mname",
+        "rname",
+        "serial",
+        "refresh",
+        "retry",
+        "expire",
+        "minimum",
+    )
+
     def __init__(self, data, **kwargs):
         Answer.__init__(self, data, **kwargs)
         self.mname = self.ensure("MasterServerName", str)
@@ -284,6 +345,8 @@ class SoaAnswer(Answer):
 
 class DsAnswer(Answer):
 
+    __slots__ = ("tag", "algorithm", "digest_type", "delegation_key")
+
     def __init__(self, data, **kwargs):
         Answer.__init__(self, data, **kwargs)
         self.tag = self.ensure("Tag", int)
@@ -303,6 +366,8 @@ class DsAnswer(Answer):
 
 class DnskeyAnswer(Answer):
 
+    __slots__ = ("flags", "algorithm", "protocol", "key")
+
     def __init__(self, data, **kwargs):
         Answer.__init__(self, data, **kwargs)
         self.flags = self.ensure("Flags", int)
@@ -322,6 +387,8 @@ class DnskeyAnswer(Answer):
 
 class TxtAnswer(Answer):
 
+    __slots__ = ("data",)
+
     def __init__(self, data, **kwargs):
 
         Answer.__init__(self, data, **kwargs)
@@ -344,6 +411,18 @@ class TxtAnswer(Answer):
 
 class RRSigAnswer(Answer):
 
+    __slots__ = (
+        "type_covered",
+        "algorithm",
+        "labels",
+        "original_ttl",
+        "signature_expiration",
+        "signature_inception",
+        "key_tag",
+        "signer_name",
+        "signature",
+    )
+
     def __init__(self, data, **kwargs):
         Answer.__init__(self, data, **kwargs)
         self.type_covered = self.ensure("TypeCovered", str)
@@ -386,12 +465,16 @@ class NotFullySupportedAnswer(Answer):
     Answer classes, so such classes will inherit from this one.
     """
 
+    __slots__ = ()
+
     def __str__(self):
         return "{0}  ---- Not fully supported ----".format(Answer.__str__(self))
 
 
 class NsecAnswer(NotFullySupportedAnswer):
 
+    __slots__ = ("next_domain_name", "types")
+
     def __init__(self, data, **kwargs):
         Answer.__init__(self, data, **kwargs)
         self.next_domain_name = self.ensure("NextDomainName", str)
@@ -400,6 +483,15 @@ class NsecAnswer(NotFullySupportedAnswer):
 
 class Nsec3Answer(NotFullySupportedAnswer):
 
+    __slots__ = (
+        "hash_algorithm",
+        "flags",
+        "iterations",
+        "salt",
+        "hash",
+        "types",
+    )
+
     def __init__(self, data, **kwargs):
         Answer.__init__(self, data, **kwargs)
         self.hash_algorithm = self.ensure("HashAlg", int)
@@ -412,6 +504,8 @@ class Nsec3Answer(NotFullySupportedAnswer):
 
 class Nsec3ParamAnswer(NotFullySupportedAnswer):
 
+    __slots__ = ("algorithm", "flags", "iterations", "salt")
+
     def __init__(self, data, **kwargs):
         Answer.__init__(self, data, **kwargs)
         self.algorithm = self.ensure("Algorithm", int)
@@ -422,6 +516,8 @@ class Nsec3ParamAnswer(NotFullySupportedAnswer):
 
 class PtrAnswer(NotFullySupportedAnswer):
 
+    __slots__ = ("target",)
+
     def __init__(self, data, **kwargs):
         Answer.__init__(self, data, **kwargs)
         self.target = self.ensure("Target", str)
@@ -429,6 +525,8 @@ class PtrAnswer(NotFullySupportedAnswer):
 
 class SrvAnswer(NotFullySupportedAnswer):
 
+    __slots__ = ("priority", "weight", "port", "target")
+
     def __init__(self, data, **kwargs):
         Answer.__init__(self, data, **kwargs)
         self.priority = self.ensure("Priority", int)
@@ -439,6 +537,8 @@ class SrvAnswer(NotFullySupportedAnswer):
 
 class SshfpAnswer(NotFullySupportedAnswer):
 
+    __slots__ = ("algorithm", "digest_type", "fingerprint")
+
     def __init__(self, data, **kwargs):
         Answer.__init__(self, data, **kwargs)
         self.algorithm = self.ensure("Algorithm", int)
@@ -448,6 +548,13 @@ class SshfpAnswer(NotFullySupportedAnswer):
 
 class TlsaAnswer(NotFullySupportedAnswer):
 
+    __slots__ = (
+        "certificate_usage",
+        "selector",
+        "matching_type",
+        "certificate_associated_data",
+    )
+
     def __init__(self, data, **kwargs):
         Answer.__init__(self, data, **kwargs)
         self.certificate_usage = self.ensure("CertUsage", int)
@@ -458,6 +565,8 @@ class TlsaAnswer(NotFullySupportedAnswer):
 
 class HinfoAnswer(NotFullySupportedAnswer):
 
+    __slots__ = ("cpu", "os")
+
     def __init__(self, data, **kwargs):
         Answer.__init__(self, data, **kwargs)
         self.cpu = self.ensure("Cpu", str)
@@ -487,7 +596,17 @@ class Message(ParsingDict):
         "HINFO": HinfoAnswer
     }
 
-    def __init__(self, message, response_data, parse_buf=True, **kwargs):
+    # The sections you can ask for, and the AbufParser option for each of them
+    SECTIONS = {
+        "questions": "DO_Question",
+        "answers": "DO_Answer",
+        "authorities": "DO_Authority",
+        "additionals": "DO_Additional",
+        "edns0": "DO_Options",
+    }
+
+    def __init__(self, message, response_data, parse_buf=True, sections=None,
+                 abuf_cache=None, lazy=False, **kwargs):
 
         ParsingDict.__init__(self, **kwargs)
 
@@ -495,7 +614,7 @@ class Message(ParsingDict):
         self.raw_data = {}
 
         if parse_buf:
-            self._parse_buf(message)
+            self._parse_buf(message, sections, abuf_cache, lazy)
         else:
             self._backfill_raw_data_from_result(response_data)
 
@@ -522,12 +641,16 @@ class Message(ParsingDict):
         for question in self.raw_data.get("QuestionSection", []):
             self.questions.append(Question(question, **kwargs))
 
-        for answer in self.raw_data.get("AnswerSection", []):
-            self._append_answer(answer, "answers", **kwargs)
-        for authority in self.raw_data.get("AuthoritySection", []):
-            self._append_answer(authority, "authorities", **kwargs)
-        for additional in self.raw_data.get("AdditionalSection", []):
-            self._append_answer(additional, "additionals", **kwargs)
+        for section, key in (("answers", "AnswerSection"),
+                             ("authorities", "AuthoritySection"),
+                             ("additionals", "AdditionalSection")):
+            records = self.raw_data.get(key, [])
+            if isinstance(records, LazySequence):
+                setattr(self, section, LazySequence(
+                    self._get_answer_loader(records, kwargs), len(records)))
+            else:
+                for record in records:
+                    self._append_answer(record, section, **kwargs)
 
     def __str__(self):
         return self._string_representation
@@ -536,6 +659,9 @@ class Message(ParsingDict):
         return str(self)
 
     def _append_answer(self, answer, section, **kwargs):
+        getattr(self, section).append(self._get_answer(answer, **kwargs))
+
+    def _get_answer(self, answer, **kwargs):
         answer_type = answer.get("Type")
         if answer_type is None:
             self._handle_malformation(
@@ -544,12 +670,79 @@ class Message(ParsingDict):
                 )
             )
         answer_class = self.ANSWER_CLASSES.get(answer_type, Answer)
-        getattr(self, section).append(answer_class(answer, **kwargs))
+        return answer_class(answer, **kwargs)
+
+    def _get_answer_loader(self, records, kwargs):
+        def load(index):
+            record = records[index]
+            # A record that can't be decoded is flagged on its own, as the
+            # rest of the message has long since been parsed
+            if "ERROR" in record:
+                answer = Answer(record, **kwargs)
+                answer._handle_error(record["ERROR"])
+                return answer
+            return self._get_answer(record, **kwargs)
+        return load
+
+    @staticmethod
+    def _get_record_loader(buf, offsets):
+        names = {}
+
+        def load(index):
+            try:
+                return abuf.AbufParser.parse_record(buf, offsets[index], names)
+            except Exception as e:
+                return {"ERROR": [str(e)]}
+        return load
+
+    @classmethod
+    def get_parse_options(cls, sections):
+        """
+        Turns a list of section names (see SECTIONS) into the options
+        AbufParser takes to skip the others.  The header is always parsed.
+        """
+
+        if sections is None:
+            return None
 
-    def _parse_buf(self, message):
+        sections = set(sections)
+        unknown = sections.difference(cls.SECTIONS)
+        if unknown:
+            raise ValueError("Unknown DNS section(s): {}".format(
+                ", ".join(sorted(unknown))))
+
+        return dict(
+            (option, name in sections)
+            for name, option in cls.SECTIONS.items()
+        )
+
+    def _parse_buf(self, message, sections=None, abuf_cache=None, lazy=False):
+
+        # Identical buffers parse to identical data, which we can share as
+        # long as nobody changes it
+        key = None
+        if abuf_cache is not None:
+            key = (
+                message,
+                None if sections is None else frozenset(sections),
+                lazy
+            )
+            raw_data = abuf_cache.get(key)
+            if raw_data is not None:
+                self.raw_data = raw_data
+                if "ERROR" in self.raw_data:
+                    self._handle_error(self.raw_data["ERROR"])
+                return
 
         try:
-            self.raw_data = abuf.AbufParser.parse(base64.b64decode(message))
+            if lazy:
+                self.raw_data = self._index_buf(
+                    base64.b64decode(message), sections)
+            else:
+                self.raw_data = abuf.AbufParser.parse(
+                    base64.b64decode(message),
+                    self.get_parse_options(sections)
+                )
         except Exception as e:
             self.raw_data = {}
             self._handle_malformation(
@@ -559,9 +752,26 @@ class Message(ParsingDict):
                 )
             )
         else:
+            if key is not None:
+                abuf_cache.set(key, self.raw_data)
             if "ERROR" in self.raw_data:
                 self._handle_error(self.raw_data["ERROR"])
 
+    @classmethod
+    def _index_buf(cls, buf, sections):
+        """
+        Parses the header and questions of the buffer, but leaves each of the
+        records of the other sections to be decoded when it's first read.
+        """
+
+        raw_data = abuf.AbufParser.index(buf, cls.get_parse_options(sections))
+        for key in ("AnswerSection", "AuthoritySection", "AdditionalSection"):
+            if key in raw_data:
+                offsets = raw_data[key]
+                raw_data[key] = LazySequence(
+                    cls._get_record_loader(buf, offsets), len(offsets))
+        return raw_data
+
     def _backfill_raw_data_from_result(self, response_data):
 
         # Header
@@ -607,8 +817,11 @@ class Message(ParsingDict):
 
 class Response(ParsingDict):
 
+    SHORTCUT_PROPERTIES = ("header_only",)
+
     def __init__(self, data, af=None, destination=None, source=None,
-                 protocol=None, part_of_set=True, parse_buf=True, **kwargs):
+                 protocol=None, part_of_set=True, parse_buf=True,
+                 sections=None, abuf_cache=None, lazy=False, **kwargs):
 
         ParsingDict.__init__(self, **kwargs)
 
@@ -624,7 +837,11 @@ class Response(ParsingDict):
         # Preparing for lazy stuff
         self._abuf = None
         self._qbuf = None
+        self._header = None
         self._parse_buf = parse_buf
+        self._sections = sections
+        self._abuf_cache = abuf_cache
+        self._lazy = lazy
 
         try:
             self.response_time = round(float(self.raw_data["result"]["rt"]), 3)
@@ -649,10 +866,50 @@ class Response(ParsingDict):
     def abuf(self):
         return self._get_buf("a")
 
+    def drop_raw_data(self):
+        # The buffers are parsed lazily from raw_data, so parse them now
+        self._get_buf("a")
+        self._get_buf("q")
+        ParsingDict.drop_raw_data(self)
+
     @property
     def qbuf(self):
         return self._get_buf("q")
 
+    @property
+    def header_only(self):
+        """
+        The Header of the abuf, decoded from its first 12 bytes alone.  None
+        of the rest of the abuf is parsed, so this is much cheaper than
+        `abuf.header` if the header is all you want.  The return code doesn't
+        account for any extended bits in the OPT record though.
+        """
+
+        if self._header or self.raw_data is None:
+            return self._header or (self._abuf and self._abuf.header)
+
+        buf_string = self._get_buf_string("abuf")
+        if buf_string:
+            try:
+                # 12 bytes are exactly 16 characters of base64
+                data = abuf.AbufParser.parse_header(
+                    base64.b64decode(buf_string[:16]))
+            except Exception:
+                data = None
+            if data is None:
+                self._handle_malformation(
+                    "Unable to parse buffer header: {buffer}".format(
+                        buffer=buf_string
+                    )
+                )
+            else:
+                self._header = Header(
+                    data,
+                    on_error=self._on_error,
+                    on_malformation=self._on_malformation
+                )
+        return self._header
+
     def _get_buf(self, prefix):
         """
         Lazy read-only accessor for the (a|q)buf.
@@ -663,18 +920,18 @@ class Response(ParsingDict):
         private_name = "_" + kind
         buf = getattr(self, private_name)
 
-        if buf:
+        if buf or self.raw_data is None:
             return buf
 
-        try:
-            buf_string = self.raw_data["result"][kind]
-        except KeyError:
-            buf_string = self.ensure(kind, str)
+        buf_string = self._get_buf_string(kind)
         if buf_string:
             message = Message(
                 buf_string,
                 self.raw_data,
                 parse_buf=self._parse_buf,
+                sections=self._sections,
+                abuf_cache=self._abuf_cache,
+                lazy=self._lazy,
                 on_error=self._on_error,
                 on_malformation=self._on_malformation
             )
@@ -683,18 +940,40 @@ class Response(ParsingDict):
             setattr(self, private_name, message)
         return getattr(self, private_name)
 
+    def _get_buf_string(self, kind):
+        try:
+            return self.raw_data["result"][kind]
+        except KeyError:
+            return self.ensure(kind, str)
+
 
 class DnsResult(Result):
 
-    def __init__(self, data, parse_buf=True, **kwargs):
+    def __init__(self, data, parse_buf=True, sections=None, abuf_cache=None,
+                 lazy=False, **kwargs):
         """
         Note that we're not setting `self.af` here, but rather we have it as a
         property of `Response` as it's possible that one result can contain
         multiple responses, each with either af=4 or af=6.
+
+        Pass a list of `sections` (any of "questions", "answers",
+        "authorities", "additionals" and "edns0") to have the abufs parsed
+        for just those, skipping over the records of the others.  The header
+        is always parsed.
+
+        Pass an `LRUCache` (from `ripe.atlas.sagan.helpers.cache`) as
+        `abuf_cache` to share the parsed abufs between all of the results
+        that have the very same one, so that each is only parsed once.
+
+        With `lazy=True`, the records of the answer, authority and additional
+        sections are only decoded as they're read.
         """
 
         Result.__init__(self, data, **kwargs)
 
+        # Complain about typos now rather than when the abuf is first read
+        Message.get_parse_options(sections)
+
         self.responses = []
         self.responses_total = None
 
@@ -717,6 +996,9 @@ class DnsResult(Result):
                 protocol=protocol,
                 part_of_set=part_of_set,
                 parse_buf=parse_buf,
+                sections=sections,
+                abuf_cache=abuf_cache,
+                lazy=lazy,
                 **kwargs
             ))
 
@@ -750,7 +1032,8 @@ class DnsResult(Result):
         responses, there's one qbuf for every response, but for single results,
         it's not stored in the result, but rather the outer result data.  Again,
         for the purposes of uniformity, we shoehorn the qbuf into the first (and
-        only) response in the latter case.
+        only) response in the latter case.  The shoehorning is done on a copy
+        of the response, as the data we were given isn't ours to change.
         """
 
         responses = []
@@ -758,10 +1041,10 @@ class DnsResult(Result):
 
         # Account for single results
         if "result" in self.raw_data:
-            if "qbuf" in self.raw_data:
-                if "qbuf" not in self.raw_data["result"]:
-                    self.raw_data["result"]["qbuf"] = self.raw_data.pop("qbuf")
-            responses.append(self.raw_data["result"])
+            response = self.raw_data["result"]
+            if "qbuf" in self.raw_data and "qbuf" not in response:
+                response = dict(response, qbuf=self.raw_data["qbuf"])
+            responses.append(response)
             part_of_set = False
 
         try:
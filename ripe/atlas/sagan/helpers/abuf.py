@@ -16,8 +16,9 @@
 from __future__ import absolute_import
 
 import base64
-import codecs
+import binascii
 import struct
+from sys import intern
 
 
 def base64_encodebytes(data):
@@ -26,6 +27,72 @@ def base64_encodebytes(data):
     return base64.encodestring(data)
 
 
+# Lookup tables for the numeric values found in a buffer
+
+OPCODES = {0: 'QUERY', 1: 'IQUERY', 2: 'STATUS', 4: 'NOTIFY', 5: 'UPDATE'}
+
+CLASSES = {0: 'RESERVED0', 1: 'IN', 3: 'CH', 4: 'HS', 254: 'NONE', 255: 'ANY'}
+
+RCODES = {
+    0: 'NOERROR', 1: 'FORMERR', 2: 'SERVFAIL', 3: 'NXDOMAIN', 4: 'NOTIMP',
+    5: 'REFUSED', 6: 'YXDOMAIN', 7: 'YXRRSET', 8: 'NXRRSET', 9: 'NOTAUTH',
+    10: 'NOTZONE', 16: 'BADVERS', 23: 'BADCOOKIE',
+}
+
+TYPES = {
+    0: 'NONE', 1: 'A', 2: 'NS', 3: 'MD', 4: 'MF', 5: 'CNAME', 6: 'SOA',
+    7: 'MB', 8: 'MG', 9: 'MR', 10: 'NULL', 11: 'WKS', 12: 'PTR', 13: 'HINFO',
+    14: 'MINFO', 15: 'MX', 16: 'TXT', 17: 'RP', 18: 'AFSDB', 19: 'X25',
+    20: 'ISDN', 21: 'RT', 22: 'NSAP', 23: 'NSAP_PTR', 24: 'SIG', 25: 'KEY',
+    26: 'PX', 27: 'GPOS', 28: 'AAAA', 29: 'LOC', 30: 'NXT', 33: 'SRV',
+    35: 'NAPTR', 36: 'KX', 37: 'CERT', 38: 'A6', 39: 'DNAME', 41: 'OPT',
+    42: 'APL', 43: 'DS', 44: 'SSHFP', 45: 'IPSECKEY', 46: 'RRSIG', 47: 'NSEC',
+    48: 'DNSKEY', 49: 'DHCID', 50: 'NSEC3', 51: 'NSEC3PARAM', 52: 'TLSA',
+    55: 'HIP', 99: 'SPF', 103: 'UNSPEC', 249: 'TKEY', 250: 'TSIG', 251: 'IXFR',
+    252: 'AXFR', 253: 'MAILB', 254: 'MAILA', 255: 'ANY', 32768: 'TA',
+    32769: 'DLV',
+}
+
+CLIENT_SUBNET_FAMILIES = {1: 'IPv4', 2: 'IPv6'}
+
+# NSEC3 hashes are in base32 with the extended hex alphabet, so we remap the
+# output of the standard base32 encoder
+NSEC3_HEXMAP = dict(zip(
+    'ABCDEFGHIJKLMNOPQRSTUVWXYZ234567', '0123456789abcdefghijklmnopqrstuv'))
+
+# Characters that label and string values escape as \ddd or \c
+PLAIN_CHARACTERS = bytes(
+    o for o in range(ord(' '), ord('~') + 1) if o not in b'"\\')
+ESCAPED_CHARACTERS = tuple(
+    "\\%03d" % o if o < ord(' ') or o > ord('~') else
+    "\\" + chr(o) if chr(o) in '"\\' else
+    chr(o)
+    for o in range(256)
+)
+
+OPT_TYPE = 41
+
+# Compiled once, rather than every time a field is read
+HEADER = struct.Struct("!HHHHHH")
+QUERY = struct.Struct("!HH")
+RR = struct.Struct("!HHIH")
+OPTION = struct.Struct("!HH")
+CLIENT_SUBNET = struct.Struct("!HBB")
+IPV4 = struct.Struct("!BBBB")
+IPV6 = struct.Struct("!HHHHHHHH")
+SHORT = struct.Struct("!H")
+DNSKEY = struct.Struct("!HBB")
+DS = struct.Struct("!HBB")
+NSEC3 = struct.Struct("!BBHB")
+NSEC3PARAM = struct.Struct("!BBHB")
+RRSIG = struct.Struct("!HBBIIIH")
+SOA = struct.Struct("!IIIII")
+SRV = struct.Struct("!HHH")
+SSHFP = struct.Struct("!BB")
+TLSA = struct.Struct("!BBB")
+BITMAP_BLOCK = struct.Struct("!BB")
+
+
 class AbufParser(object):
 
     DNS_CTYPE = "ASCII"
@@ -35,6 +102,37 @@ class AbufParser(object):
         """
         According to Philip, an abuf is like a TARDIS: it's bigger on the inside
         """
+        return cls._parse(buf, options, False)
+
+    @classmethod
+    def index(cls, buf, options=None):
+        """
+        Like parse(), but rather than decoding the records of the answer,
+        authority and additional sections, it lists the offset of each of
+        them, for parse_record() to decode when they're needed.  The header,
+        the questions and the OPT record are decoded as usual.
+        """
+        return cls._parse(buf, options, True)
+
+    @classmethod
+    def parse_record(cls, buf, offset, names=None):
+        """
+        Decodes the record at ``offset``, as found by index().  Returns the
+        record, or a dict with just an ``ERROR`` list if it can't be decoded.
+        ``names`` is a dict for the names decoded from the buffer, which is
+        worth keeping between calls for the same buffer.
+        """
+
+        error = []
+        # Only OPT records touch the header, for the extended return code,
+        # which index() has already taken care of
+        res = cls._do_rr(memoryview(buf), offset, error, {'ReturnCode': 0}, names)
+        if res is None:
+            return {'ERROR': error}
+        return res[1]
+
+    @classmethod
+    def _parse(cls, buf, options, index):
 
         error = []
         do_header = True
@@ -58,13 +156,22 @@ class AbufParser(object):
             if 'DO_Options' in options and not options['DO_Options']:
                 do_options = options['DO_Options']
 
+        # Slicing a memoryview doesn't copy anything
+        buf = memoryview(buf)
+
+        # Names already decoded from this buffer, by offset
+        names = {}
+
         dnsres = {}
         offset = 0
         offset, hdr = cls._parse_header(buf, offset, error)
         if do_header:
             dnsres['HEADER'] = hdr
         for i in range(hdr['QDCOUNT']):
-            res = cls._do_query(buf, offset, error)
+            if do_question:
+                res = cls._do_query(buf, offset, error, names)
+            else:
+                res = cls._skip_query(buf, offset, error)
             if res is None:
                 e = ('additional', offset, ('_do_query failed, additional record %d' % i))
                 error.append(e)
@@ -77,12 +184,17 @@ class AbufParser(object):
                 else:
                     dnsres['QuestionSection'].append(qry)
         for i in range(hdr['ANCOUNT']):
-            res = cls._do_rr(buf, offset, error, hdr)
+            if do_answer and not index:
+                res = cls._do_rr(buf, offset, error, hdr, names)
+            else:
+                res = cls._skip_rr(buf, offset, error)
             if res is None:
                 e = ('additional', offset, ('_do_rr failed, additional record %d' % i))
                 error.append(e)
                 dnsres['ERROR'] = error
                 return dnsres
+            if index:
+                res = (res[0], offset)
             offset, rr = res
             if do_answer:
                 if i == 0:
@@ -90,12 +202,17 @@ class AbufParser(object):
                 else:
                     dnsres['AnswerSection'].append(rr)
         for i in range(hdr['NSCOUNT']):
-            res = cls._do_rr(buf, offset, error, hdr)
+            if do_authority and not index:
+                res = cls._do_rr(buf, offset, error, hdr, names)
+            else:
+                res = cls._skip_rr(buf, offset, error)
             if res is None:
                 e = ('additional', offset, ('_do_rr failed, additional record %d' % i))
                 error.append(e)
                 dnsres['ERROR'] = error
                 return dnsres
+            if index:
+                res = (res[0], offset)
             offset, rr = res
             if do_authority:
                 if i == 0:
@@ -103,18 +220,30 @@ class AbufParser(object):
                 else:
                     dnsres['AuthoritySection'].append(rr)
         for i in range(hdr['ARCOUNT']):
-            res = cls._do_rr(buf, offset, error, hdr)
+            if do_additional and not index:
+                res = cls._do_rr(buf, offset, error, hdr, names)
+            else:
+                res = cls._skip_rr(buf, offset, error)
+                # The OPT record holds the EDNS0 options and the upper bits
+                # of the return code, so it's always decoded
+                if res and res[1] == OPT_TYPE:
+                    res = cls._do_rr(buf, offset, error, hdr, names)
             if res is None:
                 e = ('additional', offset, ('_do_rr failed, additional record %d' % i))
                 error.append(e)
                 dnsres['ERROR'] = error
                 return dnsres
+            rr_offset = offset
             offset, rr = res
-            if do_options:
-                if "EDNS0" in rr:
+            # The OPT record is never one of the additional records, whether
+            # or not we're keeping its options
+            if isinstance(rr, dict) and "EDNS0" in rr:
+                if do_options:
                     dnsres['EDNS0'] = rr['EDNS0']
-                    continue
+                continue
             if do_additional:
+                if index:
+                    rr = rr_offset
                 if 'AdditionalSection' in dnsres:
                     dnsres['AdditionalSection'].append(rr)
                 else:
@@ -129,76 +258,75 @@ class AbufParser(object):
 
         return dnsres
 
+    @classmethod
+    def parse_header(cls, buf):
+        """
+        Decodes the 12 byte header at the start of the buffer and nothing
+        else, or returns None if the buffer is too short.  The return code is
+        the 4 bit one from the header, as the rest of it lives in the OPT
+        record.
+        """
+
+        res = cls._parse_header(memoryview(buf), 0, [])
+        if res is None:
+            return None
+        hdr = res[1]
+        hdr['ReturnCode'] = cls._rcode_to_text(hdr['ReturnCode'])
+        return hdr
+
     @staticmethod
     def _opcode_to_text(opcode):
-        return { 0: 'QUERY', 1: 'IQUERY', 2: 'STATUS',
-                4: 'NOTIFY', 5: 'UPDATE'}.get(opcode, opcode)
+        return OPCODES.get(opcode, opcode)
 
     @staticmethod
     def _class_to_text(rdataclass):
-        return {0: 'RESERVED0', 1: 'IN', 3: 'CH', 4: 'HS',
-                254: 'NONE', 255: 'ANY'}.get(rdataclass, rdataclass)
+        return CLASSES.get(rdataclass, rdataclass)
 
     @staticmethod
     def _rcode_to_text(rcode):
-        return {0: 'NOERROR', 1: 'FORMERR', 2: 'SERVFAIL', 3: 'NXDOMAIN',
-                4: 'NOTIMP',  5: 'REFUSED', 6: 'YXDOMAIN', 7: 'YXRRSET',
-                8: 'NXRRSET', 9: 'NOTAUTH', 10: 'NOTZONE',
-                16: 'BADVERS', 23: 'BADCOOKIE'}.get(rcode, rcode)
+        return RCODES.get(rcode, rcode)
 
     @staticmethod
     def _type_to_text(rdatatype):
-        return {0: 'NONE', 1: 'A', 2: 'NS', 3: 'MD', 4: 'MF', 5: 'CNAME', 6: 'SOA',
-                7: 'MB', 8: 'MG', 9: 'MR', 10: 'NULL', 11: 'WKS', 12: 'PTR', 13: 'HINFO',
-                14: 'MINFO', 15: 'MX', 16: 'TXT', 17: 'RP', 18: 'AFSDB', 19: 'X25',
-                20: 'ISDN', 21: 'RT', 22: 'NSAP', 23: 'NSAP_PTR', 24: 'SIG', 25: 'KEY',
-                26: 'PX', 27: 'GPOS', 28: 'AAAA', 29: 'LOC', 30: 'NXT', 33: 'SRV',
-                35: 'NAPTR', 36: 'KX', 37: 'CERT', 38: 'A6', 39: 'DNAME', 41: 'OPT',
-                42: 'APL', 43: 'DS', 44: 'SSHFP', 45: 'IPSECKEY', 46: 'RRSIG', 47: 'NSEC',
-                48: 'DNSKEY', 49: 'DHCID', 50: 'NSEC3', 51: 'NSEC3PARAM', 52: 'TLSA',
-                55: 'HIP', 99: 'SPF', 103: 'UNSPEC', 249: 'TKEY', 250: 'TSIG', 251: 'IXFR',
-                252: 'AXFR', 253: 'MAILB', 254: 'MAILA', 255: 'ANY', 32768: 'TA',
-                32769: 'DLV'}.get(rdatatype, rdatatype)
+        return TYPES.get(rdatatype, rdatatype)
 
     @classmethod
     def _bytes_as_hex_str(cls, b):
-        b_as_hex = codecs.getencoder('hex_codec')(b)[0]
-        b_as_hex_str = b_as_hex.decode(cls.DNS_CTYPE)
-        return b_as_hex_str
+        return binascii.hexlify(b).decode(cls.DNS_CTYPE)
 
     @classmethod
     def _types_bitmap(cls, data, error):
         bits = []
         o = 0
-        while o < len(data):
-            fmt = "!BB"
-            fmtsz = struct.calcsize(fmt)
-            dat = data[o:o+fmtsz]
-            if len(dat) != fmtsz:
+        size = len(data)
+        while o < size:
+            if o + BITMAP_BLOCK.size > size:
                 e = ("_types_bitmap", o, 'offset out of range: data size = %d' % len(data))
                 error.append(e)
                 return None
-            block, bytes = struct.unpack(fmt, dat)
-            o += fmtsz
-            for i in range(bytes):
-                b = struct.unpack("!B", data[o+i:o+i+1])[0]
+            block, length = BITMAP_BLOCK.unpack_from(data, o)
+            o += BITMAP_BLOCK.size
+            for i in range(length):
+                # Raises IndexError on a truncated bitmap, like unpacking
+                # an empty slice used to
+                try:
+                    b = data[o + i]
+                except IndexError:
+                    raise struct.error("unpack requires a buffer of 1 bytes")
                 for j in range(8):
-                        if b & (1 << (7-j)):
-                                bits.append((block*32+i)*8+j)
-            o += bytes
+                    if b & (1 << (7 - j)):
+                        bits.append((block * 32 + i) * 8 + j)
+            o += length
         return bits
 
     @classmethod
     def _parse_header(cls, buf, offset, error):
 
-        fmt = "!HHHHHH"
-        reqlen = struct.calcsize(fmt)
-        strng = buf[offset:offset + reqlen]
-        if len(strng) != reqlen:
+        if offset + HEADER.size > len(buf):
             e = ("_parse_header", offset, 'offset out of range: buf size = %d' % len(buf))
             error.append(e)
             return None
-        res = struct.unpack(fmt, strng)
+        res = HEADER.unpack_from(buf, offset)
         hdr = {
             "ID": res[0]
         }
@@ -218,7 +346,7 @@ class AbufParser(object):
         rcode_shift = 0
 
         hdr['QR'] = bool(res[1] & qr)
-        hdr['OpCode'] = cls._opcode_to_text((res[1] & opcode_mask) >> opcode_shift)
+        hdr['OpCode'] = OPCODES.get((res[1] & opcode_mask) >> opcode_shift, (res[1] & opcode_mask) >> opcode_shift)
         hdr['AA'] = bool(res[1] & aa)
         hdr['TC'] = bool(res[1] & tc)
         hdr['RD'] = bool(res[1] & rd)
@@ -232,12 +360,12 @@ class AbufParser(object):
         hdr['NSCOUNT'] = res[4]
         hdr['ARCOUNT'] = res[5]
 
-        return offset + reqlen, hdr
+        return offset + HEADER.size, hdr
 
     @classmethod
-    def _do_query(cls, buf, offset, error):
+    def _do_query(cls, buf, offset, error, names=None):
         qry = {}
-        res = cls._do_name(buf, offset, 0, error)
+        res = cls._do_name(buf, offset, names, error)
         if res is None:
             e = ("_do_query", offset, "_do_name failed")
             error.append(e)
@@ -245,34 +373,86 @@ class AbufParser(object):
         offset, name = res
         qry['Qname'] = name
 
-        fmt = "!HH"
-        reqlen = struct.calcsize(fmt)
-        strng = buf[offset:offset + reqlen]
-        if len(strng) != reqlen:
+        if offset + QUERY.size > len(buf):
             e = ("_do_query", offset, 'offset out of range: buf size = %d' % len(buf))
             error.append(e)
             return None
-        res = struct.unpack(fmt, strng)
-        qry['Qtype'] = cls._type_to_text(res[0])
-        qry['Qclass'] = cls._class_to_text(res[1])
+        kind, rdataclass = QUERY.unpack_from(buf, offset)
+        qry['Qtype'] = TYPES.get(kind, kind)
+        qry['Qclass'] = CLASSES.get(rdataclass, rdataclass)
 
-        return offset + reqlen, qry
+        return offset + QUERY.size, qry
 
     @classmethod
-    def _clean_up_string(cls, strng):
-        result = ''
-        strng = bytearray(strng)
-        for o in strng:
-            if o < ord(' ') or o > ord('~'):
-                result += ("\\%03d" % o)
-            elif o == ord('"') or o == ord('\\'):
-                result += "\\" + chr(o)
+    def _skip_query(cls, buf, offset, error):
+        """
+        Like _do_query(), but only finds where the question ends.
+        """
+
+        offset = cls._skip_name(buf, offset, error)
+        if offset is None:
+            return None
+        if offset + QUERY.size > len(buf):
+            e = ("_skip_query", offset, 'offset out of range: buf size = %d' % len(buf))
+            error.append(e)
+            return None
+        return offset + QUERY.size, None
+
+    @classmethod
+    def _skip_rr(cls, buf, offset, error):
+        """
+        Like _do_rr(), but jumps straight over the RDATA without decoding
+        anything.  Returns the offset of the next record along with the type
+        of this one, as a number.
+        """
+
+        offset = cls._skip_name(buf, offset, error)
+        if offset is None:
+            return None
+        if offset + RR.size > len(buf):
+            e = ("_skip_rr", offset, 'offset out of range: buf size = %d' % len(buf))
+            error.append(e)
+            return None
+        kind, _, _, rdlength = RR.unpack_from(buf, offset)
+        offset += RR.size + rdlength
+        if offset > len(buf):
+            e = ("_skip_rr", offset, 'offset out of range: buf size = %d' % len(buf))
+            error.append(e)
+            return None
+        return offset, kind
+
+    @staticmethod
+    def _skip_name(buf, offset, error):
+        # A name ends with the root label or with its first pointer
+        size = len(buf)
+        while offset < size:
+            llen = buf[offset]
+            if llen == 0:
+                return offset + 1
+            elif llen <= 63:
+                offset += 1 + llen
+            elif llen >= 0xC0:
+                if offset + SHORT.size > size:
+                    break
+                return offset + SHORT.size
             else:
-                result += chr(o)
-        return result
+                e = ("_skip_name", offset, 'bad len 0x%x' % llen)
+                error.append(e)
+                return None
+        e = ("_skip_name", offset, 'offset out of range: buf size = %d' % len(buf))
+        error.append(e)
+        return None
+
+    @classmethod
+    def _clean_up_string(cls, strng):
+        strng = bytes(strng)
+        # Most labels need no escaping at all
+        if not strng.translate(None, PLAIN_CHARACTERS):
+            return strng.decode(cls.DNS_CTYPE)
+        return ''.join([ESCAPED_CHARACTERS[o] for o in strng])
 
     @classmethod
-    def _do_rr(cls, buf, offset, error, hdr):
+    def _do_rr(cls, buf, offset, error, hdr, names=None):
         edns0_opt_nsid = 3  # this is also hardcoded in dns.edns.py
         edns0_opt_client_subnet = 8
         edns0_opt_cookies = 10
@@ -280,34 +460,31 @@ class AbufParser(object):
         ServerCookieMinLength = 8
         ServerCookieMaxLength = 32
         rr = {}
-        res = cls._do_name(buf, offset, 0, error)
+        res = cls._do_name(buf, offset, names, error)
         if res is None:
             e = ("_do_rr", offset, "_do_name failed")
             error.append(e)
             return None
         offset, name = res
         rr['Name'] = name
-        fmt = "!HHIH"
-        reqlen = struct.calcsize(fmt)
-        dat = buf[offset:offset + reqlen]
-        if len(dat) != reqlen:
+        if offset + RR.size > len(buf):
             e = ("_do_rr", offset, 'offset out of range: buf size = %d' % len(buf))
             error.append(e)
             return None
-        res = struct.unpack(fmt, dat)
-        rr['Type'] = cls._type_to_text(res[0])
-        rr['Class'] = cls._class_to_text(res[1])
+        res = RR.unpack_from(buf, offset)
+        rr['Type'] = rr_type = TYPES.get(res[0], res[0])
+        rr['Class'] = rr_class = CLASSES.get(res[1], res[1])
         rr['TTL'] = res[2]
-        rr['RDlength'] = res[3]
+        rr['RDlength'] = rdlength = res[3]
 
-        offset += reqlen
+        offset += RR.size
 
-        rdata = buf[offset:offset + rr['RDlength']]
+        rdata = buf[offset:offset + rdlength]
         rdata_offset = offset
 
-        offset = offset + rr['RDlength']
+        offset = offset + rdlength
 
-        if rr['Type'] == 'OPT':      # this is per cls._type_to_text function
+        if rr_type == 'OPT':      # this is per the TYPES table
             edns0 = {
                 'UDPsize':            res[1],
                 'ExtendedReturnCode': res[2] >> 24,
@@ -327,40 +504,36 @@ class AbufParser(object):
                         edns0['ExtendedReturnCode'] << extended_rcode_shift
 
             o = 0
-            while o < len(rdata):
-                fmt = "!HH"
-                reqlen = struct.calcsize(fmt)
-                dat = rdata[o:o + reqlen]
-                if len(dat) != reqlen:
+            size = len(rdata)
+            while o < size:
+                if o + OPTION.size > size:
                     e = ("_do_rr", rdata_offset, 'offset out of range: rdata size = %d' % len(rdata))
                     error.append(e)
                     return None
-                res = struct.unpack(fmt, dat)
+                res = OPTION.unpack_from(rdata, o)
                 opt = {
                     'OptionCode': res[0],
                     'OptionLength': res[1],
                 }
-                o += reqlen
+                o += OPTION.size
                 if opt['OptionCode'] == edns0_opt_nsid:
                     opt['OptionName'] = 'NSID'
                     nsid = rdata[o:o + opt['OptionLength']]
-                    nsid_as_str = nsid.decode(cls.DNS_CTYPE)
+                    nsid_as_str = bytes(nsid).decode(cls.DNS_CTYPE)
                     opt[opt['OptionName']] = nsid_as_str
                 if opt['OptionCode'] == edns0_opt_client_subnet:
                     opt['OptionName'] = 'ClientSubnet'
-                    fmt = "!HBB"
-                    reqlen = struct.calcsize(fmt)
-                    dat = rdata[o:o + reqlen]
-                    if reqlen > len(dat):
+                    reqlen = CLIENT_SUBNET.size
+                    if o + reqlen > size:
                         e = ("_do_rr", rdata_offset, 'offset out of range: rdata size = %d' % len(rdata))
                         error.append(e)
                         return None
-                    res = struct.unpack(fmt, dat)
-                    opt['Family'] = {1: 'IPv4', 2: 'IPv6'}.get(res[0], res[0])
+                    res = CLIENT_SUBNET.unpack_from(rdata, o)
+                    opt['Family'] = CLIENT_SUBNET_FAMILIES.get(res[0], res[0])
                     opt['SourcePrefixLength'] = res[1]
                     opt['ScopePrefixLength'] = res[2]
                     prefixlen= (res[1]+7)/8
-                    prefix= rdata[o+reqlen:o+opt['OptionLength']]
+                    prefix= bytes(rdata[o+reqlen:o+opt['OptionLength']])
                     if len(prefix) != prefixlen:
                         e = ("_do_rr", rdata_offset, 'wrong prefix length: rdata size = %d, required %d' % (len(prefix), prefixlen))
                         error.append(e)
@@ -369,13 +542,12 @@ class AbufParser(object):
                         # IPv4
                         prefix += b'\0' * (4-prefixlen)
                         opt['Prefix'] = '.'.join(str(byte) \
-                            for byte in struct.unpack("BBBB", prefix))
+                            for byte in IPV4.unpack(prefix))
                     elif res[0] == 2:
                         # IPv6
                         prefix += b'\0' * (16-prefixlen)
-                        fmt = "!HHHHHHHH"
                         opt['Prefix'] = ':'.join(("%x" % quad) \
-                                for quad in struct.unpack(fmt, prefix))
+                                for quad in IPV6.unpack(prefix))
                 if opt['OptionCode'] == edns0_opt_cookies:
                     opt['OptionName'] = 'Cookies'
                     if opt['OptionLength'] >= ClientCookieLenght:
@@ -399,68 +571,54 @@ class AbufParser(object):
             rr['EDNS0'] = edns0
             return offset, rr
 
-        if rr['Class'] == "IN":
-            # this is per cls._type_to_text function
-            if rr['Type'] == 'A':
-                fmt = "!BBBB"
-                reqlen = struct.calcsize(fmt)
-                if reqlen > len(rdata):
+        if rr_class == "IN":
+            # this is per the TYPES table
+            if rr_type == 'A':
+                if IPV4.size > len(rdata):
                     e = ("_do_rr", rdata_offset, 'rdata too small: size = %d' % len(rdata))
                     error.append(e)
                     return None
-                rr['Address'] = '.'.join(str(byte) for byte in struct.unpack(fmt, rdata))
-            elif rr['Type'] == 'AAAA':
-                fmt = "!HHHHHHHH"
-                reqlen = struct.calcsize(fmt)
-                if reqlen > len(rdata):
+                rr['Address'] = intern('%d.%d.%d.%d' % IPV4.unpack(rdata))
+            elif rr_type == 'AAAA':
+                if IPV6.size > len(rdata):
                     e = ("_do_rr", rdata_offset, 'rdata too small: size = %d' % len(rdata))
                     error.append(e)
                     return None
-                addr = ':'.join(("%x" % quad) for quad in struct.unpack(fmt, rdata))
-                rr['Address'] = addr
-            elif rr['Type'] == 'CNAME':
-                doffset, name = cls._do_name(buf, rdata_offset, 0, error)
+                rr['Address'] = intern(
+                    '%x:%x:%x:%x:%x:%x:%x:%x' % IPV6.unpack(rdata))
+            elif rr_type == 'CNAME':
+                doffset, name = cls._do_name(buf, rdata_offset, names, error)
                 rr['Target'] = name
-            elif rr['Type'] == 'DNSKEY':
-                fmt = '!HBB'
-                fmtsz = struct.calcsize(fmt)
-                dat = rdata[:fmtsz]
-                if len(dat) != fmtsz:
+            elif rr_type == 'DNSKEY':
+                if DNSKEY.size > len(rdata):
                     e = ("_do_rr", rdata_offset, 'offset out of range: rdata size = %d' % len(rdata))
                     error.append(e)
                     return None
                 rr['Flags'], rr['Protocol'], rr['Algorithm'] =\
-                        struct.unpack(fmt, dat)
-                key = rdata[struct.calcsize(fmt):]
+                        DNSKEY.unpack_from(rdata)
+                key = rdata[DNSKEY.size:]
                 key_as_base64 = base64_encodebytes(key)
                 key_as_base64_str = key_as_base64.decode(cls.DNS_CTYPE)
                 rr['Key'] = ''.join(key_as_base64_str.split())
-            elif rr['Type'] == 'DS':
-
-                fmt = '!HBB'
-                fmtsz = struct.calcsize(fmt)
-                dat = rdata[:fmtsz]
-                if len(dat) != fmtsz:
+            elif rr_type == 'DS':
+                if DS.size > len(rdata):
                     e = ("_do_rr", rdata_offset, 'offset out of range: rdata size = %d' % len(rdata))
                     error.append(e)
                     return None
                 rr['Tag'], rr['Algorithm'], rr['DigestType'] = \
-                        struct.unpack(fmt, dat)
-                key = rdata[struct.calcsize(fmt):]
+                        DS.unpack_from(rdata)
+                key = rdata[DS.size:]
                 rr['DelegationKey'] = cls._bytes_as_hex_str(key)
-            elif rr['Type'] == 'HINFO':
-                fmt = "!B"
-                fmtsz = struct.calcsize(fmt)
+            elif rr_type == 'HINFO':
                 o = 0
                 for tag in ('Cpu', 'Os'):
-                    dat = rdata[o:o+fmtsz]
-                    if len(dat) != fmtsz:
+                    if o + 1 > len(rdata):
                         e = ("_do_rr", rdata_offset,
                              'offset out of range: rdata size = %d' % len(rdata))
                         error.append(e)
                         return None
-                    o += fmtsz
-                    slen = struct.unpack(fmt, dat)[0]
+                    slen = rdata[o]
+                    o += 1
                     strng = rdata[o:o+slen]
                     if len(strng) < slen:
                         e = ("_do_rr", rdata_offset,
@@ -469,98 +627,75 @@ class AbufParser(object):
                         return None
                     rr[tag] = cls._clean_up_string(strng)
                     o += slen
-            elif rr['Type'] == 'MX':
-                fmt = '!H'
-                fmtsz = struct.calcsize(fmt)
-                dat = rdata[:fmtsz]
-                if len(dat) != fmtsz:
+            elif rr_type == 'MX':
+                if SHORT.size > len(rdata):
                     e = ("_do_rr", rdata_offset, 'offset out of range: rdata size = %d' % len(rdata))
                     error.append(e)
                     return None
-                rr['Preference'] = struct.unpack(fmt, dat)[0]
-                rr_offset, rr['MailExchanger'] = cls._do_name(buf, rdata_offset + fmtsz, 0, error)
-            elif rr['Type'] == 'NS':
-                res = cls._do_name(buf, rdata_offset, 0, error)
+                rr['Preference'] = SHORT.unpack_from(rdata)[0]
+                rr_offset, rr['MailExchanger'] = cls._do_name(buf, rdata_offset + SHORT.size, names, error)
+            elif rr_type == 'NS':
+                res = cls._do_name(buf, rdata_offset, names, error)
                 if res is None:
                     e = ("_do_rr", offset, "_do_name failed")
                     error.append(e)
                     return None
                 doffset, name = res
                 rr['Target'] = name
-            elif rr['Type'] == 'NSEC':
-                doffset, name = cls._do_name(buf, rdata_offset, 0, error)
+            elif rr_type == 'NSEC':
+                doffset, name = cls._do_name(buf, rdata_offset, names, error)
                 rr['NextDomainName'] = name
                 o = doffset-rdata_offset
-                bits = cls._types_bitmap(rdata[o:rr['RDlength']], error)
+                bits = cls._types_bitmap(rdata[o:rdlength], error)
                 if bits is None:
                     e = ("_do_rr", 'failed to parse types bitmap')
                     error.append(e)
                     return None
                 rr['Types'] = bits
-            elif rr['Type'] == 'NSEC3':
-                fmt = '!BBHB'
-                fmtsz = struct.calcsize(fmt)
-                dat = rdata[:fmtsz]
-                if len(dat) != fmtsz:
+            elif rr_type == 'NSEC3':
+                if NSEC3.size > len(rdata):
                     e = ("_do_rr", rdata_offset, 'offset out of range: rdata size = %d' % len(rdata))
                     error.append(e)
                     return None
-                rr['HashAlg'], rr['Flags'], rr['Iterations'], SaltLength = struct.unpack(fmt, dat)
-                o = fmtsz
+                rr['HashAlg'], rr['Flags'], rr['Iterations'], SaltLength = NSEC3.unpack_from(rdata)
+                o = NSEC3.size
                 salt = rdata[o:o+SaltLength]
                 rr['Salt']= cls._bytes_as_hex_str(salt)
                 o += SaltLength
-                fmt = '!B'
-                fmtsz = struct.calcsize(fmt)
-                dat = rdata[o:o+fmtsz]
-                if len(dat) != fmtsz:
+                if o + 1 > len(rdata):
                     e = ("_do_rr", rdata_offset, 'offset out of range: rdata size = %d' % len(rdata))
                     error.append(e)
                     return None
-                HashLength = struct.unpack(fmt, dat)[0]
-                o += fmtsz
+                HashLength = rdata[o]
+                o += 1
                 hash = rdata[o:o+HashLength]
                 b32str = base64.b32encode(hash)
+                # Comparing bytes to a str, so this never strips anything and
+                # hashes that need padding fail with a KeyError below
                 while b32str[-1] == '=':
                         b32str = b32str[:-1]
-                # Note that we need extended hexadecimal instead of actual base32
-                # Just remap the input
-                hexmap = {
-                    'A': '0', 'B': '1', 'C': '2', 'D': '3',
-                    'E': '4', 'F': '5', 'G': '6', 'H': '7',
-                    'I': '8', 'J': '9', 'K': 'a', 'L': 'b',
-                    'M': 'c', 'N': 'd', 'O': 'e', 'P': 'f',
-                    'Q': 'g', 'R': 'h', 'S': 'i', 'T': 'j',
-                    'U': 'k', 'V': 'l', 'W': 'm', 'X': 'n',
-                    'Y': 'o', 'Z': 'p', '2': 'q', '3': 'r',
-                    '4': 's', '5': 't', '6': 'u', '7': 'v'
-                }
-                b32str = ''.join([hexmap[l] for l in b32str.decode(cls.DNS_CTYPE) ])
-                rr['Hash'] = b32str
+                rr['Hash'] = ''.join([NSEC3_HEXMAP[l] for l in b32str.decode(cls.DNS_CTYPE)])
                 o += HashLength
-                bits = cls._types_bitmap(rdata[o:rr['RDlength']], error)
+                bits = cls._types_bitmap(rdata[o:rdlength], error)
                 if bits is None:
                     e = ("_do_rr", 'failed to parse types bitmap')
                     error.append(e)
                     return None
                 rr['Types'] = bits
-            elif rr['Type'] == 'NSEC3PARAM':
-                fmt = '!BBHB'
-                fmtsz = struct.calcsize(fmt)
-                dat = rdata[:fmtsz]
-                if len(dat) != fmtsz:
+            elif rr_type == 'NSEC3PARAM':
+                if NSEC3PARAM.size > len(rdata):
                     e = ("_do_rr", rdata_offset, 'offset out of range: rdata size = %d' % len(rdata))
                     error.append(e)
                     return None
-                rr['Algorithm'], rr['Flags'], rr['Iterations'], SaltLength = struct.unpack(fmt, dat)
-                o = fmtsz
+                rr['Algorithm'], rr['Flags'], rr['Iterations'], SaltLength = NSEC3PARAM.unpack_from(rdata)
+                o = NSEC3PARAM.size
                 salt = rdata[o:o+SaltLength]
                 rr['Salt'] = cls._bytes_as_hex_str(salt)
                 o += SaltLength
-            elif rr['Type'] == 'PTR':
-                doffset, name = cls._do_name(buf, rdata_offset, 0, error)
+            elif rr_type == 'PTR':
+                doffset, name = cls._do_name(buf, rdata_offset, names, error)
                 rr['Target'] = name
-            elif rr['Type'] == 'RRSIG':
+            elif rr_type == 'RRSIG':
                 # https://tools.ietf.org/html/rfc4034#section-3.1
 
                 """ The RDATA for an RRSIG RR consists of a 2 octet Type
@@ -570,17 +705,15 @@ class AbufParser(object):
                 octet Key tag, the Signer's Name field, and the Signature
                 field. """
 
-                fmt = "!HBBIIIH"
-                fmtsz = struct.calcsize(fmt)
-                dat = rdata[:fmtsz]
-                if len(dat) != fmtsz:
+                fmtsz = RRSIG.size
+                if fmtsz > len(rdata):
                     e = ("_do_rr", rdata_offset, 'offset out of range: rdata size = %d' % len(rdata))
                     error.append(e)
                     return None
-                rr['TypeCovered'], rr['Algorithm'], rr['Labels'], rr['OriginalTTL'], rr['SignatureExpiration'], rr['SignatureInception'], rr['KeyTag'] = struct.unpack(fmt, dat)
-                rr['TypeCovered'] = cls._type_to_text( rr['TypeCovered'] )
+                rr['TypeCovered'], rr['Algorithm'], rr['Labels'], rr['OriginalTTL'], rr['SignatureExpiration'], rr['SignatureInception'], rr['KeyTag'] = RRSIG.unpack_from(rdata)
+                rr['TypeCovered'] = TYPES.get(rr['TypeCovered'], rr['TypeCovered'])
 
-                res = cls._do_name(rdata, fmtsz, 0, error)
+                res = cls._do_name(rdata, fmtsz, None, error)
                 if res is None:
                     e = ("_do_rr", offset, "_do_name failed")
                     error.append(e)
@@ -588,80 +721,58 @@ class AbufParser(object):
                 signature_offset, rr['SignerName'] = res
 
                 sig = rdata[signature_offset:]
-                #sig_as_base64 = base64.encodebytes(sig)
                 sig_as_base64 = base64_encodebytes(sig)
                 sig_as_base64_str = sig_as_base64.decode(cls.DNS_CTYPE)
                 rr['Signature'] = ''.join(sig_as_base64_str.split())
-            elif rr['Type'] == 'SOA':
-                offset_name = cls._do_name(buf, rdata_offset, 0, error)
+            elif rr_type == 'SOA':
+                offset_name = cls._do_name(buf, rdata_offset, names, error)
                 if offset_name is None:
                         e = ("do_rr", rdata_offset, '_do_name failed')
                         error.append(e)
                         return None
                 rr_offset, rr['MasterServerName'] = offset_name
-                offset_name = cls._do_name(buf, rr_offset, 0, error)
+                offset_name = cls._do_name(buf, rr_offset, names, error)
                 if offset_name is None:
                         e = ("do_rr", rr_offset, '_do_name failed')
                         error.append(e)
                         return None
                 rr_offset, rr['MaintainerName'] = offset_name
-                fmt = '!IIIII'
-                fmtsz = struct.calcsize(fmt)
-                dat = buf[rr_offset:rr_offset + fmtsz]
-                if len(dat) != fmtsz:
+                if rr_offset + SOA.size > len(buf):
                     e = ("_do_rr", rr_offset, 'offset out of range: rdata size = %d' % len(rdata))
                     error.append(e)
                     return None
-                rr['Serial'], rr['Refresh'], rr['Retry'], rr['Expire'], rr['NegativeTtl'] = struct.unpack(fmt, dat)
-            elif rr['Type'] == 'SRV':
-                fmt = '!HHH'
-                fmtsz = struct.calcsize(fmt)
-                dat = rdata[:fmtsz]
-                if len(dat) != fmtsz:
+                rr['Serial'], rr['Refresh'], rr['Retry'], rr['Expire'], rr['NegativeTtl'] = SOA.unpack_from(buf, rr_offset)
+            elif rr_type == 'SRV':
+                if SRV.size > len(rdata):
                     e = ("_do_rr", rdata_offset, 'offset out of range: rdata size = %d' % len(rdata))
                     error.append(e)
                     return None
-                (rr['Priority'], rr['Weight'], rr['Port']) = struct.unpack(fmt, dat)
-                rr_offset, rr['Target'] = cls._do_name(buf, rdata_offset+fmtsz, 0, error)
-            elif rr['Type'] == 'SSHFP':
-                fmt = '!BB'
-                fmtsz = struct.calcsize(fmt)
-                dat = rdata[:fmtsz]
-                if len(dat) != fmtsz:
+                (rr['Priority'], rr['Weight'], rr['Port']) = SRV.unpack_from(rdata)
+                rr_offset, rr['Target'] = cls._do_name(buf, rdata_offset+SRV.size, names, error)
+            elif rr_type == 'SSHFP':
+                if SSHFP.size > len(rdata):
                     e = ("_do_rr", rdata_offset, 'offset out of range: rdata size = %d' % len(rdata))
                     error.append(e)
                     return None
-                (rr['Algorithm'], rr['DigestType']) = struct.unpack(fmt, dat)
-                rr['Fingerprint'] = cls._bytes_as_hex_str(rdata[fmtsz:])
-            elif rr['Type'] == 'TLSA':
-                fmt = '!BBB'
-                fmtsz = struct.calcsize(fmt)
-                dat = rdata[:fmtsz]
-                if len(dat) != fmtsz:
+                (rr['Algorithm'], rr['DigestType']) = SSHFP.unpack_from(rdata)
+                rr['Fingerprint'] = cls._bytes_as_hex_str(rdata[SSHFP.size:])
+            elif rr_type == 'TLSA':
+                if TLSA.size > len(rdata):
                     e = ("_do_rr", rdata_offset, 'offset out of range: rdata size = %d' % len(rdata))
                     error.append(e)
                     return None
                 rr['CertUsage'], rr['Selector'], rr['MatchingType']= \
-                        struct.unpack(fmt, dat)
-                rr['CertAssData'] = cls._bytes_as_hex_str(rdata[fmtsz:])
+                        TLSA.unpack_from(rdata)
+                rr['CertAssData'] = cls._bytes_as_hex_str(rdata[TLSA.size:])
 
-        if rr['Type'] == 'TXT':
-            if rr['Class'] == "IN" or rr['Class'] == "CH":
-                fmt = "!B"
-                reqlen = struct.calcsize(fmt)
+        if rr_type == 'TXT':
+            if rr_class == "IN" or rr_class == "CH":
                 o = 0
+                size = len(rdata)
                 rr['Data'] = []
-                while o < len(rdata):
-                        strng = rdata[o:o+reqlen]
-                        if len(strng) != reqlen:
-                            e = ("_do_rr", rdata_offset,
-                                'offset out of range: rdata size = %d' %
-                                len(rdata))
-                            error.append(e)
-                            return None
-                        res = struct.unpack(fmt, strng)
-                        llen = res[0]
-                        o += reqlen
+                while o < size:
+                        llen = rdata[o]
+                        o += 1
                         strng = rdata[o:o+llen]
                         if len(strng) < llen:
                             e = ("_do_rr", rdata_offset,
@@ -673,67 +784,94 @@ class AbufParser(object):
                         rr['Data'].append(strng)
                         o += llen
 
-        if isinstance(rr["Class"], int) or isinstance(rr["Type"], int):
+        if isinstance(rr_class, int) or isinstance(rr_type, int):
             # Unknown class or type. Just add a RDATA field with hex data
             rr['Rdata'] = cls._bytes_as_hex_str(rdata)
 
         return offset, rr
 
     @classmethod
-    def _do_name(cls, buf, offset, recurs, error):
-        if recurs >= 256:
-            e = ("_do_name", offset, 'too much recursion')
-            error.append(e)
-            return None
+    def _do_name(cls, buf, offset, names, error):
+        """
+        Decodes the name at ``offset``, following compression pointers.
+        Every name decoded along the way is stored in ``names`` (by offset),
+        so pointers to the same suffix, usually the question name, are only
+        followed once per buffer.  Pointers that lead back to somewhere we've
+        already been are reported as a loop rather than followed.
+        """
 
-        name = ''
-        while True:
-            fmt = "!B"
-            reqlen = struct.calcsize(fmt)
-            strng = buf[offset:offset + reqlen]
-            if len(strng) != reqlen:
+        if names is None:
+            names = {}
+        if offset in names:
+            return names[offset]
+
+        size = len(buf)
+        start = offset
+        path = []        # The (offset, label) walked so far, None for pointers
+        visited = set()  # The same offsets, to spot loops
+        pointers = []    # The (target, offset) of every pointer followed
+
+        while offset not in names:
+            if offset >= size:
                 e = ("_do_name", offset, 'offset out of range: buf size = %d' % len(buf))
-                error.append(e)
-                return None
-            res = struct.unpack(fmt, strng)
-            llen = res[0]
-            if llen <= 63:
+                return cls._name_failed(e, pointers, error)
+            llen = buf[offset]
+            if llen == 0:
+                # Root
+                break
+            elif llen <= 63:
                 # Label
-                offset += 1
-                label = buf[offset:offset + llen]
-                offset = offset + llen
-                label_as_str = cls._clean_up_string(label)
-                if name == '' or label_as_str != '':
-                    name = name + label_as_str + '.'
-                if llen == 0:
-                    break
+                label = cls._clean_up_string(buf[offset+1:offset+1+llen])
+                path.append((offset, label))
+                visited.add(offset)
+                offset += 1 + llen
             elif llen >= 0xC0:
-                fmt = "!H"
-                reqlen = struct.calcsize(fmt)
-                strng = buf[offset:offset + reqlen]
-                if len(strng) != reqlen:
+                # Pointer
+                if offset + SHORT.size > size:
                     e = ("_do_name", offset, 'offset out of range: buf size = %d' % len(buf))
-                    error.append(e)
-                    return None
-                res = struct.unpack(fmt, strng)
-                poffset = res[0] & ~0xC000
-                n = cls._do_name(buf, poffset, recurs+1, error)
-                if n is None:
-                    e = ("_do_name", poffset,
-                         'bad offset %d at offset %d' % (poffset, offset))
-                    error.append(e)
-                    return None
-                poffset, pname = n
-                offset += reqlen
-                name = name + pname
-                break
+                    return cls._name_failed(e, pointers, error)
+                poffset = SHORT.unpack_from(buf, offset)[0] & ~0xC000
+                pointers.append((poffset, offset))
+                path.append((offset, None))
+                visited.add(offset)
+                if poffset in visited:
+                    e = ("_do_name", poffset, 'pointer loop at offset %d' % offset)
+                    return cls._name_failed(e, pointers, error)
+                offset = poffset
             else:
                 e = ("_do_name", offset, 'bad len 0x%x' % llen)
-                error.append(e)
-                return None
+                return cls._name_failed(e, pointers, error)
+
+        # Work backwards along the path to find the name, and where it ends
+        # in the buffer, for every offset on it
+        if offset in names:
+            end, name = names[offset]
+            suffix = name
+        else:
+            end, name, suffix = offset + 1, '.', ''
+        for offset, label in reversed(path):
+            if label is None:
+                end = offset + SHORT.size
+                suffix = name
+            else:
+                # Names are interned so the owner of every record, and the
+                # many copies of the same name across results, share one
+                # string
+                name = suffix = intern(label + '.' + suffix)
+            names[offset] = (end, name)
 
-        return offset, name
+        if start not in names:
+            # The name is just the root
+            return end, name
+        return names[start]
 
+    @staticmethod
+    def _name_failed(e, pointers, error):
+        error.append(e)
+        for poffset, offset in reversed(pointers):
+            error.append(("_do_name", poffset,
+                          'bad offset %d at offset %d' % (poffset, offset)))
+        return None
 
 __all__ = (
     "DnsResult",
@@ -0,0 +1,166 @@
+# Copyright (c) 2016 RIPE NCC
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Just enough of an ASN.1 DER decoder to get the names and validity out of an
+X.509 certificate without the cryptography module.  It doesn't check
+signatures, or anything else for that matter.
+"""
+
+from datetime import datetime
+
+
+SEQUENCE = 0x30
+SET = 0x31
+OID = 0x06
+UTC_TIME = 0x17
+GENERALIZED_TIME = 0x18
+EXPLICIT_0 = 0xa0
+
+# The encodings of the string types found in names
+STRING_ENCODINGS = {
+    0x0c: "utf-8",       # UTF8String
+    0x13: "ascii",       # PrintableString
+    0x14: "latin-1",     # TeletexString
+    0x16: "ascii",       # IA5String
+    0x1c: "utf-32-be",   # UniversalString
+    0x1e: "utf-16-be",   # BMPString
+}
+
+# The attributes of a name we care about, by their encoded OIDs
+NAME_ATTRIBUTES = {
+    b"\x55\x04\x03": "cn",  # 2.5.4.3
+    b"\x55\x04\x0a": "o",   # 2.5.4.10
+    b"\x55\x04\x06": "c",   # 2.5.4.6
+}
+
+
+def read(der, offset, tag=None):
+    """
+    Reads the element at ``offset`` and returns its tag, where its contents
+    start and where it ends.  If ``tag`` is given, the element has to be one.
+    """
+
+    try:
+        found = der[offset]
+        length = der[offset + 1]
+    except IndexError:
+        raise ValueError("DER truncated at offset {}".format(offset))
+    if tag is not None and found != tag:
+        raise ValueError("Expected tag 0x{:02x} at offset {}, found 0x{:02x}".format(
+            tag, offset, found))
+
+    start = offset + 2
+    if length & 0x80:
+        size = length & 0x7f
+        if not 0 < size <= 4:
+            raise ValueError("Bad length at offset {}".format(offset))
+        length = int.from_bytes(der[start:start + size], "big")
+        start += size
+
+    end = start + length
+    if end > len(der):
+        raise ValueError("DER truncated at offset {}".format(offset))
+    return found, start, end
+
+
+def parse_name(der, offset):
+    """
+    Returns the common name, organisation and country of the Name at
+    ``offset``, any of which may be None.  If there's more than one of
+    something, the last one wins.
+    """
+
+    values = {"cn": None, "o": None, "c": None}
+    _, position, end = read(der, offset, SEQUENCE)
+    while position < end:
+        _, attribute, position = read(der, position, SET)
+        while attribute < position:
+            _, start, attribute = read(der, attribute, SEQUENCE)
+            _, oid_start, oid_end = read(der, start, OID)
+            tag, value_start, value_end = read(der, oid_end)
+            key = NAME_ATTRIBUTES.get(bytes(der[oid_start:oid_end]))
+            if key is None:
+                continue
+            if tag not in STRING_ENCODINGS:
+                raise ValueError("Unknown string type 0x{:02x} at offset {}".format(
+                    tag, oid_end))
+            values[key] = bytes(der[value_start:value_end]).decode(
+                STRING_ENCODINGS[tag])
+    return values["cn"], values["o"], values["c"]
+
+
+def parse_time(der, offset):
+    """
+    Returns the UTCTime or GeneralizedTime at ``offset`` as a naive datetime
+    in UTC.
+    """
+
+    tag, start, end = read(der, offset)
+    value = bytes(der[start:end]).decode("ascii")
+    if tag == UTC_TIME and len(value) == 13 and value[-1] == "Z":
+        # RFC 5280 puts these between 1950 and 2049
+        year = int(value[:2])
+        year += 1900 if year >= 50 else 2000
+        value = value[2:]
+    elif tag == GENERALIZED_TIME and len(value) == 15 and value[-1] == "Z":
+        year = int(value[:4])
+        value = value[4:]
+    else:
+        raise ValueError("Expected a time at offset {}, found 0x{:02x}".format(
+            offset, tag))
+    return datetime(
+        year, int(value[0:2]), int(value[2:4]), int(value[4:6]),
+        int(value[6:8]), int(value[8:10]))
+
+
+def parse_certificate(der):
+    """
+    Returns a dict with the subject and issuer names (as ``subject_cn``,
+    ``issuer_o`` and so on) and the validity (``not_before`` and
+    ``not_after``) of the DER encoded certificate.
+    """
+
+    der = memoryview(der)
+
+    _, certificate, _ = read(der, 0, SEQUENCE)
+    _, position, _ = read(der, certificate, SEQUENCE)
+
+    # The version is optional, and the serial and signature algorithm are
+    # of no interest
+    tag, _, end = read(der, position)
+    if tag == EXPLICIT_0:
+        _, _, end = read(der, end)
+    _, _, position = read(der, end, SEQUENCE)
+
+    certificate = {}
+    certificate["issuer_cn"], certificate["issuer_o"], certificate["issuer_c"] = \
+        parse_name(der, position)
+    _, _, position = read(der, position, SEQUENCE)
+
+    _, validity, end = read(der, position, SEQUENCE)
+    certificate["not_before"] = parse_time(der, validity)
+    _, _, validity = read(der, validity)
+    certificate["not_after"] = parse_time(der, validity)
+
+    certificate["subject_cn"], certificate["subject_o"], certificate["subject_c"] = \
+        parse_name(der, end)
+
+    return certificate
+
+
+__all__ = (
+    "parse_certificate",
+)
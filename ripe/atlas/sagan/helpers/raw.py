@@ -0,0 +1,59 @@
+# Copyright (c) 2016 RIPE NCC
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Helpers for the code that reads raw results without building a Result
+object for each of them, like the column converters and the bulk readers.
+"""
+
+from ..base import ENCODED_TYPES, Json, Result, ResultParseError
+
+
+REQUIRED_KEYS = ("timestamp", "msm_id", "prb_id", "fw", "type")
+
+
+def ensure(data, key, kind, default=None):
+    # Mirrors ParsingDict.ensure() for raw dictionaries
+    try:
+        return kind(data[key])
+    except (TypeError, ValueError, KeyError):
+        return default
+
+
+def decode(raw, kind):
+    """
+    Returns the decoded result, or ``None`` if it's not of the given type,
+    which we can usually tell without decoding it.
+    """
+
+    sniffed, data = Result._sniff(raw, ("type",))
+    if sniffed["type"] != kind:
+        return None
+    if isinstance(data, ENCODED_TYPES):
+        data = Json.loads(data)
+    for key in REQUIRED_KEYS:
+        if key not in data:
+            raise ResultParseError(
+                "This doesn't look like a RIPE Atlas measurement: {}".format(
+                    data
+                )
+            )
+    return data
+
+
+__all__ = (
+    "decode",
+    "ensure",
+)
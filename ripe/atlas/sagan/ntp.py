@@ -17,7 +17,7 @@ from datetime import datetime
 from dateutil.relativedelta import relativedelta
 from pytz import UTC
 
-from .base import Result, ResultParseError, ParsingDict
+from .base import Result, ResultParseError, ParsingDict, parsed_property
 
 
 class Packet(ParsingDict):
@@ -93,19 +93,24 @@ class Packet(ParsingDict):
 
 class NtpResult(Result):
     """
-    Subclass to cover ntp type measurement results.
+    Subclass to cover ntp type measurement results.  Pass `lazy=True` to have
+    the packets (and the values calculated from them) parsed only when you
+    first ask for them.
     """
 
-    def __init__(self, data, **kwargs):
+    def __init__(self, data, lazy=False, **kwargs):
 
         Result.__init__(self, data, **kwargs)
 
-        self.rtt_median = None
-        self.rtt_min = None
-        self.rtt_max = None
-        self.offset_median = None
-        self.offset_min = None
-        self.offset_max = None
+        # Set by self._parse_packets(), which may happen lazily
+        self._packets = None
+        self._rtt_median = None
+        self._rtt_min = None
+        self._rtt_max = None
+        self._offset_median = None
+        self._offset_min = None
+        self._offset_max = None
+        self._packet_kwargs = kwargs
 
         self.af = self.ensure("af", int)
         self.protocol = self.ensure("proto", str)
@@ -124,15 +129,35 @@ class NtpResult(Result):
         self.stratum = self.ensure("stratum", int)
         self.version = self.ensure("version", int)
 
-        self.packets = []
-
         if "result" not in self.raw_data:
             self._handle_malformation("No result value found")
+            self._packets = []
             return
 
-        for response in self.raw_data["result"]:
-            self.packets.append(Packet(response, **kwargs))
-
+        if not lazy:
+            self._parse_packets(**kwargs)
+
+    packets = parsed_property("packets", "_ensure_packets")
+    rtt_median = parsed_property("rtt_median", "_ensure_packets")
+    rtt_min = parsed_property("rtt_min", "_ensure_packets")
+    rtt_max = parsed_property("rtt_max", "_ensure_packets")
+    offset_median = parsed_property("offset_median", "_ensure_packets")
+    offset_min = parsed_property("offset_min", "_ensure_packets")
+    offset_max = parsed_property("offset_max", "_ensure_packets")
+
+    def drop_raw_data(self):
+        # Packets may not have been parsed yet
+        self._ensure_packets()
+        Result.drop_raw_data(self)
+
+    def _ensure_packets(self):
+        if self._packets is None:
+            self._parse_packets(**self._packet_kwargs)
+
+    def _parse_packets(self, **kwargs):
+        self._packets = [
+            Packet(response, **kwargs) for response in self.raw_data["result"]
+        ]
         self._set_medians_and_extremes()
 
     def _set_medians_and_extremes(self):
@@ -140,19 +165,19 @@ class NtpResult(Result):
         Sets median values for rtt and the offset of result packets.
         """
 
-        rtts = sorted([p.rtt for p in self.packets if p.rtt is not None])
+        rtts = sorted([p.rtt for p in self._packets if p.rtt is not None])
         if rtts:
-            self.rtt_min = rtts[0]
-            self.rtt_max = rtts[-1]
-            self.rtt_median = self.calculate_median(rtts)
+            self._rtt_min = rtts[0]
+            self._rtt_max = rtts[-1]
+            self._rtt_median = self.calculate_median(rtts)
 
         offsets = sorted(
-            [p.offset for p in self.packets if p.offset is not None]
+            [p.offset for p in self._packets if p.offset is not None]
         )
         if offsets:
-            self.offset_min = offsets[0]
-            self.offset_max = offsets[-1]
-            self.offset_median = self.calculate_median(offsets)
+            self._offset_min = offsets[0]
+            self._offset_max = offsets[-1]
+            self._offset_median = self.calculate_median(offsets)
 
 
 __all__ = (
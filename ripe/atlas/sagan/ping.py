@@ -13,11 +13,13 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-from .base import Result, ResultParseError, ParsingDict
+from .base import Result, ResultParseError, ParsingDict, parsed_property
 
 
 class Packet(ParsingDict):
 
+    __slots__ = ("rtt", "dup", "ttl", "source_address")
+
     def __init__(self, data, default_ttl, default_source_address, **kwargs):
 
         ParsingDict.__init__(self, **kwargs)
@@ -64,10 +66,11 @@ class Packet(ParsingDict):
 
 class PingResult(Result):
     """
-    Ping measurement result class
+    Ping measurement result class.  Pass `lazy=True` to have the packets (and
+    the values calculated from them) parsed only when you first ask for them.
     """
 
-    def __init__(self, data, **kwargs):
+    def __init__(self, data, lazy=False, **kwargs):
 
         Result.__init__(self, data, **kwargs)
 
@@ -82,8 +85,11 @@ class PingResult(Result):
         self.destination_name = self.ensure("dst_name", str)
         self.destination_address = self.ensure("dst_addr", str)
         self.step = self.ensure("step", int)
-        self.rtt_median = None  # Redefined in self._set_rtt_median()
-        self.packets = []
+
+        # Set by self._parse_packets(), which may happen lazily
+        self._packets = None
+        self._rtt_median = None
+        self._packet_kwargs = kwargs
 
         if self.rtt_average is None or self.rtt_average < 0:
             self.rtt_average = self.rtt_min = self.rtt_max = None
@@ -108,16 +114,29 @@ class PingResult(Result):
         if self.rtt_average:
             self.rtt_average = round(self.rtt_average, 3)
 
-        self._parse_packets(**kwargs)
-        self._set_rtt_median()
+        if not lazy:
+            self._parse_packets(**kwargs)
+
+    packets = parsed_property("packets", "_ensure_packets")
+    rtt_median = parsed_property("rtt_median", "_ensure_packets")
+
+    def drop_raw_data(self):
+        # Packets may not have been parsed yet
+        self._ensure_packets()
+        Result.drop_raw_data(self)
+
+    def _ensure_packets(self):
+        if self._packets is None:
+            self._parse_packets(**self._packet_kwargs)
 
     def _parse_packets(self, **kwargs):
 
+        packets = []
         source_address = self.raw_data.get(
             "src_addr", self.raw_data.get("srcaddr")
         )
         for packet in self.ensure("result", list, []):
-            self.packets.append(
+            packets.append(
                 Packet(
                     packet,
                     self.ensure("ttl", int),
@@ -126,11 +145,14 @@ class PingResult(Result):
                 )
             )
 
+        self._packets = packets
+        self._set_rtt_median()
+
     def _set_rtt_median(self):
         packets = sorted([
-            p.rtt for p in self.packets if p.rtt is not None and p.dup is False
+            p.rtt for p in self._packets if p.rtt is not None and p.dup is False
         ])
-        self.rtt_median = self.calculate_median(packets)
+        self._rtt_median = self.calculate_median(packets)
 
 __all__ = (
     "PingResult",
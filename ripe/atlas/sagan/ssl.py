@@ -13,104 +13,308 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-import logging
+import base64
+import hashlib
 import pytz
-import codecs
 
+from collections import namedtuple
 from datetime import datetime
 
-try:
-    from cryptography import x509
-    from cryptography.x509.oid import NameOID
-    from cryptography.hazmat.backends import openssl
-    from cryptography.hazmat.primitives import hashes
-except ImportError:
-    logging.getLogger(__name__).warning(
-        "cryptography module is not installed, without it you cannot parse SSL "
-        "certificate measurement results"
-    )
-
 from .base import Result, ParsingDict
+from .helpers import der
+from .helpers.raw import decode
 from .helpers.compatibility import string
 
 
 EXT_SAN = "subjectAltName"
 
+PEM_HEADER = "-----BEGIN CERTIFICATE-----"
+PEM_FOOTER = "-----END CERTIFICATE-----"
+
+# Set by _import_cryptography()
+x509 = None
+NameOID = None
+openssl = None
+
+
+def _import_cryptography():
+    """
+    Imports cryptography the first time a certificate has to be loaded with
+    it, so that it's only needed if you don't use light=True, or want the
+    extensions of the certificates.
+    """
+    global x509, NameOID, openssl
+    if x509 is not None:
+        return
+    try:
+        from cryptography.hazmat.backends import openssl
+        from cryptography.x509.oid import NameOID
+        from cryptography import x509
+    except ImportError:
+        raise ImportError(
+            "The cryptography module is needed to load certificates: "
+            "pip install ripe.atlas.sagan[ssl]")
+
+
+def _certificate_field(name):
+    """
+    A read-only property for one of the values we get out of a certificate,
+    which is only worked out when it's first read.
+    """
+    return property(lambda self: self._get_field(name))
+
 
 class Certificate(ParsingDict):
+    """
+    Pass `lazy=True` to have nothing but the DER bytes of the certificate
+    kept around until one of its values is first asked for.  Each checksum
+    is then worked out on its own, straight from those bytes, and the rest
+    of the values are pulled out of the certificate together.
+
+    Pass `light=True` to get the names and validity by walking the DER bytes
+    ourselves rather than loading the certificate with cryptography, which
+    is then only needed for the extensions, if you ask for them.
+
+    `has_expired` is worked out when it's first read, against the
+    `reference_time` (a datetime or a Unix timestamp) if there is one, or
+    against the time at that point if there isn't.
+    """
+
+    # The checksums and the hashlib algorithms they're made with
+    CHECKSUMS = {
+        "checksum_md5": "md5",
+        "checksum_sha1": "sha1",
+        "checksum_sha256": "sha256",
+    }
 
-    def __init__(self, data, **kwargs):
+    # The values we can get out of the DER bytes without cryptography
+    DER_FIELDS = (
+        "subject_cn",
+        "subject_o",
+        "subject_c",
+        "issuer_cn",
+        "issuer_o",
+        "issuer_c",
+        "valid_from",
+        "valid_until",
+    )
+
+    # The values we need to load the certificate for
+    X509_FIELDS = (
+        "subject_cn",
+        "subject_o",
+        "subject_c",
+        "issuer_cn",
+        "issuer_o",
+        "issuer_c",
+        "valid_from",
+        "valid_until",
+        "extensions",
+    )
+
+    subject_cn = _certificate_field("subject_cn")
+    subject_o = _certificate_field("subject_o")
+    subject_c = _certificate_field("subject_c")
+    issuer_cn = _certificate_field("issuer_cn")
+    issuer_o = _certificate_field("issuer_o")
+    issuer_c = _certificate_field("issuer_c")
+    valid_from = _certificate_field("valid_from")
+    valid_until = _certificate_field("valid_until")
+    checksum_md5 = _certificate_field("checksum_md5")
+    checksum_sha1 = _certificate_field("checksum_sha1")
+    checksum_sha256 = _certificate_field("checksum_sha256")
+    extensions = _certificate_field("extensions")
+
+    def __init__(self, data, certificate_cache=None, lazy=False, light=False,
+                 reference_time=None, **kwargs):
 
         ParsingDict.__init__(self, **kwargs)
 
         self.raw_data = data
-        self.subject_cn = None
-        self.subject_o = None
-        self.subject_c = None
-        self.issuer_cn = None
-        self.issuer_o = None
-        self.issuer_c = None
 
-        self.valid_from = None
-        self.valid_until = None
+        # The values worked out so far.  With a cache, they're shared by all
+        # of the certificates made from the same PEM, so a dict that came out
+        # of it is never changed: it's copied before anything is added, and
+        # the copy only goes back in if nothing went wrong.
+        self._certificate_cache = certificate_cache
+        self._fields = None
+        if certificate_cache is not None:
+            self._fields = certificate_cache.get(data)
+        self._shared = self._fields is not None
+        if self._fields is None:
+            self._fields = {}
+        self._failed = False
+
+        self._lazy = lazy
+        self._light = light
+        self._reference_time = reference_time
+        self._expired = None
+
+        # Only kept until every value has been worked out
+        self._der = None
+        if len(self._fields) < len(self.CHECKSUMS) + len(self.X509_FIELDS):
+            self._der = self._get_der(data)
+
+        if not lazy:
+            for name in self.CHECKSUMS:
+                self._get_field(name)
+            if not light:
+                self._get_field("extensions")
+            self._get_field("valid_from")
+
+    @property
+    def has_expired(self):
+        if self._expired is None and self.valid_from is not None:
+            self._expired = self._has_expired(
+                self._get_moment(self._reference_time))
+        return self._expired
+
+    def check_expiry(self, moment):
+        """
+        Works out has_expired again, against ``moment``, a timezone aware
+        datetime.
+        """
+        self._reference_time = moment
+        self._expired = None
+        if self.valid_from is not None:
+            self._expired = self._has_expired(moment)
+
+    def _get_field(self, name):
+
+        try:
+            return self._fields[name]
+        except KeyError:
+            pass
+
+        if self._shared:
+            self._fields = dict(self._fields)
+            self._shared = False
+
+        if name in self.CHECKSUMS:
+            self._fields[name] = self._colonify(
+                hashlib.new(self.CHECKSUMS[name], self._der).digest())
+        elif self._light and name in self.DER_FIELDS:
+            self._add_fields(self._parse_der, self.DER_FIELDS)
+        else:
+            self._add_fields(self._parse_x509, self.X509_FIELDS)
+
+        if len(self._fields) == len(self.CHECKSUMS) + len(self.X509_FIELDS):
+            self._der = None
+
+        if self._certificate_cache is not None and not self._failed:
+            self._certificate_cache.set(self.raw_data, self._fields)
+            self._shared = True
+
+        return self._fields[name]
+
+    def _add_fields(self, parse, names):
+
+        try:
+            self._fields.update(parse(self._der))
+        except Exception as exc:
+            # Without lazy, it's up to SslResult to handle this
+            if not self._lazy:
+                raise
+            self._handle_error(str(exc))
+            self._failed = True
+            self._fields.update(dict.fromkeys(names))
+            if "extensions" in names:
+                self._fields["extensions"] = {}
+
+    @staticmethod
+    def _get_der(data):
+        """
+        Decodes the body of a PEM certificate.
+        """
+        start = data.find(PEM_HEADER)
+        end = data.find(PEM_FOOTER, start)
+        if start < 0 or end < 0:
+            raise ValueError("Unable to load PEM certificate: no PEM armour")
+        body = "".join(data[start + len(PEM_HEADER):end].split())
+        try:
+            return base64.b64decode(body, validate=True)
+        except (ValueError, TypeError) as exc:
+            raise ValueError(
+                "Unable to load PEM certificate: {}".format(exc))
+
+    @classmethod
+    def _parse_der(cls, data):
+        """
+        The cheap part: the values in DER_FIELDS, straight from the bytes.
+        """
 
-        self.checksum_md5 = None
-        self.checksum_sha1 = None
-        self.checksum_sha256 = None
+        fields = der.parse_certificate(data)
+        fields["valid_from"] = pytz.utc.localize(fields.pop("not_before"))
+        fields["valid_until"] = pytz.utc.localize(fields.pop("not_after"))
 
-        self.has_expired = None
+        return fields
 
-        self.extensions = {}
+    @classmethod
+    def _parse_x509(cls, data):
+        """
+        Does the expensive part: loads the certificate and pulls everything
+        in X509_FIELDS out of it into a dict.
+        """
 
-        cert = x509.load_pem_x509_certificate(data.encode("ascii"), openssl.backend)
+        _import_cryptography()
 
-        if cert:
-            self.checksum_md5 = self._colonify(cert.fingerprint(hashes.MD5()))
-            self.checksum_sha1 = self._colonify(cert.fingerprint(hashes.SHA1()))
-            self.checksum_sha256 = self._colonify(cert.fingerprint(hashes.SHA256()))
+        fields = dict.fromkeys(cls.X509_FIELDS)
+        fields["extensions"] = {}
 
-            self.valid_from = pytz.utc.localize(cert.not_valid_before)
-            self.valid_until = pytz.utc.localize(cert.not_valid_after)
+        cert = x509.load_der_x509_certificate(data, openssl.backend)
 
-            self.has_expired = self._has_expired()
+        if cert:
+            # The naive versions are deprecated since cryptography 42
+            if hasattr(cert, "not_valid_before_utc"):
+                fields["valid_from"] = cert.not_valid_before_utc
+                fields["valid_until"] = cert.not_valid_after_utc
+            else:
+                fields["valid_from"] = pytz.utc.localize(cert.not_valid_before)
+                fields["valid_until"] = pytz.utc.localize(cert.not_valid_after)
 
-            self._add_extensions(cert)
+            cls._add_extensions(cert, fields["extensions"])
 
         if cert and cert.subject:
-            self.subject_cn, self.subject_o, self.subject_c = \
-                self._parse_x509_name(cert.subject)
+            fields["subject_cn"], fields["subject_o"], fields["subject_c"] = \
+                cls._parse_x509_name(cert.subject)
 
         if cert and cert.issuer:
-            self.issuer_cn, self.issuer_o, self.issuer_c = \
-                self._parse_x509_name(cert.issuer)
+            fields["issuer_cn"], fields["issuer_o"], fields["issuer_c"] = \
+                cls._parse_x509_name(cert.issuer)
+
+        return fields
 
     # OID name lookup of the common abbreviations
     # In reality probably only CN will be used
+    # (by dotted string, so we don't need cryptography to import this)
     _oid_names = {
-        NameOID.COMMON_NAME: "CN",
-        NameOID.ORGANIZATION_NAME: "O",
-        NameOID.ORGANIZATIONAL_UNIT_NAME: "OU",
-        NameOID.COUNTRY_NAME: "C",
-        NameOID.STATE_OR_PROVINCE_NAME: "S",
-        NameOID.LOCALITY_NAME: "L",
+        "2.5.4.3": "CN",
+        "2.5.4.10": "O",
+        "2.5.4.11": "OU",
+        "2.5.4.6": "C",
+        "2.5.4.8": "S",
+        "2.5.4.7": "L",
     }
 
-    def _get_oid_name(self, oid):
-        return self._oid_names.get(oid, oid.dotted_string)
+    @classmethod
+    def _get_oid_name(cls, oid):
+        return cls._oid_names.get(oid.dotted_string, oid.dotted_string)
 
-    def _name_attribute_to_string(self, name):
+    @classmethod
+    def _name_attribute_to_string(cls, name):
         """
         Build a /-separated string from an x509.Name.
         """
         return "".join(
             "/{}={}".format(
-                self._get_oid_name(attr.oid),
+                cls._get_oid_name(attr.oid),
                 attr.value,
             )
             for attr in name
         )
 
-    def _get_subject_alternative_names(self, ext):
+    @classmethod
+    def _get_subject_alternative_names(cls, ext):
         """
         Return a list of Subject Alternative Name values for the given x509
         extension object.
@@ -123,19 +327,19 @@ class Certificate(ParsingDict):
             elif isinstance(san.value, x509.Name):
                 # In theory there there could be >1 RDN here...
                 values.extend(
-                    self._name_attribute_to_string(rdn) for rdn in san.value.rdns
+                    cls._name_attribute_to_string(rdn) for rdn in san.value.rdns
                 )
         return values
 
-    def _add_extensions(self, cert):
+    @classmethod
+    def _add_extensions(cls, cert, extensions):
         for ext in cert.extensions:
             if ext.oid._name == EXT_SAN:
-                self.extensions[EXT_SAN] = self._get_subject_alternative_names(ext)
+                extensions[EXT_SAN] = cls._get_subject_alternative_names(ext)
 
     @staticmethod
-    def _colonify(bytes):
-        hex = codecs.getencoder("hex_codec")(bytes)[0].decode("ascii").upper()
-        return ":".join(a+b for a, b in zip(hex[::2], hex[1::2]))
+    def _colonify(digest):
+        return digest.hex(":").upper()
 
     @staticmethod
     def _parse_x509_name(name):
@@ -151,9 +355,22 @@ class Certificate(ParsingDict):
                 cn = attr.value
         return cn, o, c
 
-    def _has_expired(self):
-        now = pytz.utc.localize(datetime.utcnow())
-        return self.valid_from <= now <= self.valid_until
+    def _has_expired(self, moment):
+        return self.valid_from <= moment <= self.valid_until
+
+    @staticmethod
+    def _get_moment(when):
+        """
+        Turns a reference time into a timezone aware datetime, reading the
+        clock if there isn't one.  Naive datetimes are taken to be in UTC.
+        """
+        if when is None:
+            return datetime.now(pytz.utc)
+        if isinstance(when, datetime):
+            if when.tzinfo is None:
+                return pytz.utc.localize(when)
+            return when
+        return datetime.fromtimestamp(when, pytz.utc)
 
     @property
     def cn(self):
@@ -233,7 +450,31 @@ class Alert(ParsingDict):
 
 class SslResult(Result):
 
-    def __init__(self, data, **kwargs):
+    # Pass this as a reference_time to use the time of the measurement
+    REFERENCE_CREATED = "created"
+
+    def __init__(self, data, certificate_cache=None, lazy=False, light=False,
+                 reference_time=None, **kwargs):
+        """
+        Pass an `LRUCache` (from `ripe.atlas.sagan.helpers.cache`) as
+        `certificate_cache` to share what's parsed out of each distinct
+        certificate between all of the results that carry it, so that each is
+        only parsed once.
+
+        Pass `lazy=True` to have the values of each certificate worked out
+        only when they're first asked for.  Problems with a certificate then
+        only come up at that point, and are reported by the certificate
+        rather than the result.
+
+        Pass `light=True` to get the names and validity of the certificates
+        without the cryptography module.  Their extensions are still only
+        available with it.
+
+        Pass a `reference_time` (a datetime or a Unix timestamp) to have the
+        `has_expired` of the certificates worked out against it rather than
+        the time they're read, or "created" for the time of the measurement.
+        See also check_expiry().
+        """
 
         Result.__init__(self, data, **kwargs)
 
@@ -256,7 +497,9 @@ class SslResult(Result):
 
         self.alert = None
         self.certificates = []
-        self.is_self_signed = False
+
+        if reference_time == self.REFERENCE_CREATED:
+            reference_time = self.created
 
         if "alert" in self.raw_data:
             self.alert = Alert(self.raw_data["alert"], **kwargs)
@@ -266,15 +509,42 @@ class SslResult(Result):
 
             for certificate in self.raw_data["cert"]:
                 try:
-                    self.certificates.append(Certificate(certificate, **kwargs))
+                    self.certificates.append(Certificate(
+                        certificate,
+                        certificate_cache=certificate_cache,
+                        lazy=lazy,
+                        light=light,
+                        reference_time=reference_time,
+                        **kwargs
+                    ))
                 except Exception as exc:
                     self._handle_error(str(exc))
                     continue
 
-            if len(self.certificates) == 1:
-                certificate = self.certificates[0]
-                if certificate.subject_cn == certificate.issuer_cn:
-                    self.is_self_signed = True
+    @classmethod
+    def check_expiry(cls, results, reference_time=None):
+        """
+        Works out the has_expired of every certificate of every result in
+        ``results`` against the same moment: ``reference_time`` (a datetime or
+        a Unix timestamp), or the time right now, which is only read once.
+        Pass "created" to check the certificates of each result against the
+        time of its measurement instead.
+        """
+
+        moment = None
+        if reference_time != cls.REFERENCE_CREATED:
+            moment = Certificate._get_moment(reference_time)
+
+        for result in results:
+            for certificate in result.certificates:
+                certificate.check_expiry(moment or result.created)
+
+    @property
+    def is_self_signed(self):
+        if len(self.certificates) != 1:
+            return False
+        certificate = self.certificates[0]
+        return certificate.subject_cn == certificate.issuer_cn
 
     @property
     def checksum_chain(self):
@@ -289,6 +559,100 @@ class SslResult(Result):
         return "::".join(checksums)
 
 
+# What ChainChangeDetector reports: the key of the result, the fingerprints of
+# the chain seen before (None if there wasn't one) and now, and the decoded
+# result itself
+ChainChange = namedtuple("ChainChange", ("key", "previous", "current", "data"))
+
+
+class ChainChangeDetector(object):
+    """
+    Keeps track of the certificate chain last seen for every probe and
+    target in a stream of raw SSL certificate results, and tells you when it
+    changes.  Chains are told apart by a fingerprint of their PEM strings,
+    so no certificate is ever loaded, and all that's kept per key is an int.
+
+    ``key`` is a function that takes a decoded result and returns its key,
+    which by default is its probe id, destination name and port.  First
+    sightings of a key are only reported with ``report_new=True``.  Results
+    that aren't SSL certificate results, or have no certificates (or none
+    that look like PEM strings), are ignored.
+    """
+
+    def __init__(self, key=None, report_new=False):
+        self.key = key or self.get_key
+        self.report_new = report_new
+        self._fingerprints = {}
+
+    def __len__(self):
+        return len(self._fingerprints)
+
+    def __contains__(self, key):
+        return key in self._fingerprints
+
+    @staticmethod
+    def get_key(data):
+        return data.get("prb_id"), data.get("dst_name"), data.get("dst_port")
+
+    @staticmethod
+    def get_fingerprint(certificates):
+        """
+        Returns a 64 bit fingerprint of a list of PEM strings, which ignores
+        any differences in whitespace, or None if any of them isn't an ASCII
+        string.
+        """
+        fingerprint = hashlib.blake2b(digest_size=8)
+        for certificate in certificates:
+            if not isinstance(certificate, str):
+                return None
+            try:
+                fingerprint.update("".join(certificate.split()).encode("ascii"))
+            except UnicodeEncodeError:
+                return None
+            fingerprint.update(b",")
+        return int.from_bytes(fingerprint.digest(), "big")
+
+    def update(self, raw):
+        """
+        Takes a raw result (JSON string, bytes or dict) and returns a
+        ChainChange if its chain isn't the one last seen for its key, or None
+        if it is.
+        """
+
+        data = decode(raw, "sslcert")
+        if data is None:
+            return None
+
+        certificates = data.get("cert")
+        if not certificates or not isinstance(certificates, list):
+            return None
+
+        current = self.get_fingerprint(certificates)
+        if current is None:
+            return None
+
+        key = self.key(data)
+        previous = self._fingerprints.get(key)
+        if current == previous:
+            return None
+
+        self._fingerprints[key] = current
+        if previous is None and not self.report_new:
+            return None
+        return ChainChange(key, previous, current, data)
+
+    def iter_changes(self, iterable):
+        """
+        Feeds every raw result in ``iterable`` to update() and lazily yields
+        the changes.
+        """
+        for raw in iterable:
+            change = self.update(raw)
+            if change is not None:
+                yield change
+
+
 __all__ = (
-    "SslResult"
+    "SslResult",
+    "ChainChangeDetector",
 )
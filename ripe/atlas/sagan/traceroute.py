@@ -17,7 +17,7 @@ import logging
 
 from calendar import timegm
 
-from .base import Result, ParsingDict
+from .base import Result, ParsingDict, parsed_property
 
 
 log = logging.getLogger(__name__)
@@ -35,6 +35,8 @@ class IcmpHeader(ParsingDict):
     this class can be found here: http://localhost:8000/docs/data_struct/
     """
 
+    __slots__ = ("raw_data", "version", "rfc4884", "objects")
+
     def __init__(self, data, **kwargs):
 
         ParsingDict.__init__(self, **kwargs)
@@ -56,6 +58,20 @@ class Packet(ParsingDict):
         "p": "Port unreachable",
     }
 
+    __slots__ = (
+        "raw_data",
+        "origin",
+        "rtt",
+        "size",
+        "ttl",
+        "mtu",
+        "destination_option_size",
+        "hop_by_hop_option_size",
+        "arrived_late_by",
+        "internal_ttl",
+        "icmp_header",
+    )
+
     def __init__(self, data, **kwargs):
 
         ParsingDict.__init__(self, **kwargs)
@@ -91,6 +107,8 @@ class Packet(ParsingDict):
 
 class Hop(ParsingDict):
 
+    __slots__ = ("raw_data", "index", "packets", "median_rtt")
+
     def __init__(self, data, **kwargs):
 
         ParsingDict.__init__(self, **kwargs)
@@ -119,8 +137,19 @@ class Hop(ParsingDict):
 
 
 class TracerouteResult(Result):
+    """
+    Traceroute measurement result class.  Pass `lazy=True` to have the hops
+    (and everything calculated from them) parsed only when you first ask for
+    any of them.
 
-    def __init__(self, data, **kwargs):
+    Pass `first_hops` and/or `last_hops` to keep only that many hops from the
+    start and the end of the path in `hops`.  The last hop is always kept,
+    and the `last_*` properties and `is_success` are the same either way.
+    """
+
+    DEPRECATED_PROPERTIES = ("last_rtt", "target_responded")
+
+    def __init__(self, data, lazy=False, **kwargs):
 
         Result.__init__(self, data, **kwargs)
 
@@ -137,17 +166,35 @@ class TracerouteResult(Result):
 
         self.protocol = self.clean_protocol(self.ensure("proto", str))
 
-        self.hops = []
         self.total_hops = 0
-        self.last_median_rtt = None
 
-        # Used by a few response tests below
-        self.destination_ip_responded = False
-        self.last_hop_responded = False
-        self.is_success = False
-        self.last_hop_errors = []
+        # Set by self._parse_hops(), which may happen lazily
+        self._hops = None
+        self._last_median_rtt = None
+        self._destination_ip_responded = False
+        self._last_hop_responded = False
+        self._is_success = False
+        self._last_hop_errors = []
+        self._hop_kwargs = kwargs
 
-        self._parse_hops(**kwargs)  # Sets hops, last_median_rtt, and total_hops
+        try:
+            hops = self.raw_data["result"]
+            assert(isinstance(hops, list))
+        except (KeyError, AssertionError):
+            self._handle_malformation("Legacy formats not supported")
+            self._hops = []
+        else:
+            self.total_hops = len(hops)
+            if not lazy:
+                self._parse_hops(**kwargs)
+
+    hops = parsed_property("hops", "_ensure_hops")
+    last_median_rtt = parsed_property("last_median_rtt", "_ensure_hops")
+    destination_ip_responded = parsed_property(
+        "destination_ip_responded", "_ensure_hops")
+    last_hop_responded = parsed_property("last_hop_responded", "_ensure_hops")
+    is_success = parsed_property("is_success", "_ensure_hops")
+    last_hop_errors = parsed_property("last_hop_errors", "_ensure_hops")
 
     @property
     def last_rtt(self):
@@ -172,21 +219,21 @@ class TracerouteResult(Result):
         for packet in last_hop.packets:
             if packet.origin and \
                     self.destination_address == packet.origin:
-                self.destination_ip_responded = True
+                self._destination_ip_responded = True
                 break
 
     def set_last_hop_responded(self, last_hop):
         """Sets the flag if last hop responded."""
         for packet in last_hop.packets:
             if packet.rtt:
-                self.last_hop_responded = True
+                self._last_hop_responded = True
                 break
 
     def set_is_success(self, last_hop):
         """Sets the flag if traceroute result is successful or not."""
         for packet in last_hop.packets:
             if packet.rtt and not packet.is_error:
-                self.is_success = True
+                self._is_success = True
                 break
         else:
             self.set_last_hop_errors(last_hop)
@@ -194,12 +241,12 @@ class TracerouteResult(Result):
     def set_last_hop_errors(self, last_hop):
         """Sets the last hop's errors."""
         if last_hop.is_error:
-            self.last_hop_errors.append(last_hop.error_message)
+            self._last_hop_errors.append(last_hop.error_message)
             return
 
         for packet in last_hop.packets:
             if packet.is_error:
-                self.last_hop_errors.append(packet.error_message)
+                self._last_hop_errors.append(packet.error_message)
 
     @property
     def end_time_timestamp(self):
@@ -215,39 +262,62 @@ class TracerouteResult(Result):
             r.append([packet.origin for packet in hop.packets])
         return r
 
-    def _parse_hops(self, parse_all_hops=True, **kwargs):
+    def drop_raw_data(self):
+        # Hops may not have been parsed yet
+        self._ensure_hops()
+        Result.drop_raw_data(self)
 
-        try:
-            hops = self.raw_data["result"]
-            assert(isinstance(hops, list))
-        except (KeyError, AssertionError):
-            self._handle_malformation("Legacy formats not supported")
-            return
+    def _ensure_hops(self):
+        if self._hops is None:
+            self._parse_hops(**self._hop_kwargs)
+
+    def _parse_hops(self, parse_all_hops=True, first_hops=None,
+                    last_hops=None, **kwargs):
 
+        hops = self.raw_data["result"]
         num_hops = len(hops)
-        # Go through the hops in reverse so that if
-        # parse_all_hops is False we can stop processing as
-        # soon as possible.
-        for index, raw_hop in reversed(list(enumerate(hops))):
 
-            hop = Hop(raw_hop, **kwargs)
+        # We keep the first `head` hops and everything from `tail` on, which
+        # always includes the last hop
+        if first_hops is None and last_hops is None:
+            head = 0
+            tail = 0 if parse_all_hops else num_hops - 1
+        else:
+            head = min(max(first_hops or 0, 0), num_hops)
+            tail = max(num_hops - max(last_hops or 0, 1), head)
+
+        # Go through the hops in reverse so that we can stop processing as
+        # soon as we have everything we're keeping from the end and the last
+        # RTT.  The hops we go through for that but don't keep from the end
+        # are held on to if they're among the first ones.
+        kept = []
+        skipped = {}
+        for index in range(num_hops - 1, -1, -1):
+
+            if index < tail and self._last_median_rtt:
+                break
+
+            hop = Hop(hops[index], **kwargs)
 
             # If last hop set several useful attributes
             if index + 1 == num_hops:
                 self.set_destination_ip_responded(hop)
                 self.set_last_hop_responded(hop)
                 self.set_is_success(hop)
-                # We always store the last hop
-                self.hops.insert(0, hop)
-            elif parse_all_hops:
-                self.hops.insert(0, hop)
-
-            if hop.median_rtt and not self.last_median_rtt:
-                self.last_median_rtt = hop.median_rtt
-                if not parse_all_hops:
-                    # Now that we have the last RTT we can stop
-                    break
-        self.total_hops = num_hops
+
+            if index >= tail:
+                kept.append(hop)
+            elif index < head:
+                skipped[index] = hop
+
+            if hop.median_rtt and not self._last_median_rtt:
+                self._last_median_rtt = hop.median_rtt
+
+        kept.reverse()
+        self._hops = [
+            skipped[index] if index in skipped else Hop(hops[index], **kwargs)
+            for index in range(head)
+        ] + kept
 
 
 __all__ = (
@@ -9,7 +9,6 @@ name = "ripe.atlas.sagan"
 install_requires = [
     "python-dateutil",
     "pytz",
-    "cryptography",
 ]
 
 # Allow setup.py to be run from any path
@@ -38,7 +37,9 @@ setup(
     maintainer_email="atlas@ripe.net",
     install_requires=install_requires,
     extras_require={
-        "fast": ["ujson"],
+        "fast": ["ujson", "orjson"],
+        "ssl": ["cryptography"],
+        "numpy": ["numpy"],
         "doc": ["sphinx"]
     },
     classifiers=[
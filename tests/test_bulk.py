@@ -0,0 +1,207 @@
+# Copyright (c) 2016 RIPE NCC
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import bz2
+import gzip
+import io
+import json
+import lzma
+import os
+import tempfile
+
+from ripe.atlas.sagan import iter_results, parse_many, Result, PingResult, HttpResult
+from ripe.atlas.sagan.base import Json, ResultParseError
+from ripe.atlas.sagan.bulk import iter_lines, select_results, iter_dns_records, DnsRecord
+
+PING = '{"af":4,"avg":48.388333333333328,"dst_addr":"62.2.16.12","dst_name":"hsi.cablecom.ch","dup":0,"from":"188.194.234.136","fw":4460,"max":56.948999999999998,"min":43.869999999999997,"msm_id":1000192,"name":"hsi.cablecom.ch","prb_id":270,"proto":"ICMP","rcvd":3,"result":[{"rtt":43.869999999999997},{"rtt":56.948999999999998},{"rtt":44.345999999999997}],"sent":3,"size":20,"src_addr":"192.168.1.229","step":360,"timestamp":1340524626,"ttl":52,"type":"ping"}'
+HTTP = '{"fw":4610,"msm_id":1003932,"prb_id":2184,"result":[{"addr":"2a01:9e00::1","af":6,"bsize":1406,"hsize":131,"method":"GET","res":200,"rt":28.437,"src_addr":"2001:470:1f0b:1d8::2","ver":"1.1"}],"timestamp":1398184661,"type":"http","uri":"http://www.ripe.net/"}'
+DNS = '{"af":6,"dst_addr":"2001:67c:e0::5","from":"2a02:2860:3:1::a","fw":4720,"group_id":2927179,"lts":30,"msm_id":2927179,"msm_name":"Tdig","prb_id":18279,"proto":"UDP","qbuf":"CcsAAAABAAAAAAABBHJpcGUDbmV0AAAcAAEAACkCAAAAgAAAAAAAAAA=","result":{"ANCOUNT":2,"ARCOUNT":1,"ID":2507,"NSCOUNT":0,"QDCOUNT":1,"abuf":"CcuEAAABAAIAAAABBHJpcGUDbmV0AAAcAAHADAAcAAEAAAEsABAgAQZ8AugAIgAAAADBAAaLwAwALgABAAABLACcABwFAgAAASxWap83VkMEJ4yCBHJpcGUDbmV0ADyhc2zuMQhsu3nU8h2qGCjw/uQM3bzqsrfbaFfSCDH3qG3pPuYJtyzkyFpI8jsUpzYjJJoy29XPeAdqXWoSsHQAD4AhVqmg0/YBctjZuIMKPs7kI3ZWjkkpVqn9kl2OT0r+Moh+gL1W/a1uIkldil0mNCi1xp/V6bRqZfCS+bL0AAApEAAAAIAAAAA=","rt":21.768,"size":233},"src_addr":"2a02:2860:3:1::a","timestamp":1447251248,"type":"dns"}'
+LINES = (PING + "\n\n" + HTTP + "\n").encode("utf-8")
+
+
+def _check(results):
+    results = list(results)
+    assert(len(results) == 2)
+    assert(isinstance(results[0], PingResult))
+    assert(isinstance(results[1], HttpResult))
+    assert(results[0].rtt_median == 44.346)
+    assert(results[1].responses[0].code == 200)
+
+
+def test_iter_results_from_file_objects():
+    _check(iter_results(io.StringIO(LINES.decode("utf-8"))))
+    _check(iter_results(io.BytesIO(LINES)))
+    _check(iter_results(io.BufferedReader(io.BytesIO(gzip.compress(LINES)))))
+
+
+def test_iter_results_from_paths():
+    for suffix, compress in (("", bytes), (".gz", gzip.compress), (".bz2", bz2.compress), (".xz", lzma.compress)):
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(compress(LINES))
+            _check(iter_results(path))
+        finally:
+            os.unlink(path)
+
+
+def test_iter_results_is_lazy():
+    results = iter_results(io.StringIO(PING + "\n" + "this is not json\n"))
+    assert(isinstance(next(results), PingResult))
+
+
+def test_iter_results_passes_kwargs():
+    result = next(iter_results(io.StringIO(HTTP), on_error=HttpResult.ACTION_IGNORE))
+    assert(result._on_error == HttpResult.ACTION_IGNORE)
+
+
+def test_iter_lines_yields_bytes_from_binary_files():
+    assert(list(iter_lines(io.BytesIO(LINES))) == [PING.encode("utf-8"), HTTP.encode("utf-8")])
+
+
+def test_iter_lines_leaves_file_objects_open():
+    source = io.StringIO(PING)
+    assert(list(iter_lines(source)) == [PING])
+    assert(not source.closed)
+
+
+def test_parse_many():
+    raw = [PING, HTTP] * 10
+    serial = list(parse_many(raw, workers=1))
+    assert(len(serial) == 20)
+    for result in parse_many(raw, workers=2, chunk_size=3):
+        expected = serial.pop(0)
+        assert(type(result) is type(expected))
+        assert(result.probe_id == expected.probe_id)
+        assert(result.created == expected.created)
+    assert(serial == [])
+
+
+def test_parse_many_unordered():
+    raw = [PING, HTTP] * 10
+    results = list(parse_many(raw, workers=2, ordered=False, chunk_size=3))
+    assert(len(results) == 20)
+    assert(len([r for r in results if isinstance(r, PingResult)]) == 10)
+    assert(sorted(r.rtt_median for r in results if isinstance(r, PingResult)) == [44.346] * 10)
+
+
+def test_parse_many_passes_kwargs():
+    for result in parse_many([HTTP] * 3, workers=2, on_error=HttpResult.ACTION_IGNORE):
+        assert(result._on_error == HttpResult.ACTION_IGNORE)
+
+
+def test_sniff():
+    assert(Result.sniff(PING) == {"type": "ping", "msm_id": 1000192, "prb_id": 270})
+    assert(Result.sniff(json.loads(HTTP)) == {"type": "http", "msm_id": 1003932, "prb_id": 2184})
+    assert(Result.sniff('{"type": "PING" , "msm_id" : 1,"prb_id":2}') == {"type": "ping", "msm_id": 1, "prb_id": 2})
+    # Nested keys mean we have to decode the whole thing to be sure
+    nested = '{"result":[{"type":"A","msm_id":3}],"type":"dns","msm_id":1,"prb_id":2}'
+    assert(Result.sniff(nested) == {"type": "dns", "msm_id": 1, "prb_id": 2})
+    assert(Result.sniff('{"type":"ping"}') == {"type": "ping", "msm_id": None, "prb_id": None})
+
+
+def test_select_results():
+    raw = [PING, HTTP, json.loads(PING)]
+    assert(list(select_results(raw)) == raw)
+    assert(list(select_results(raw, types=["PING"])) == [raw[0], raw[2]])
+    assert(list(select_results(raw, measurement_ids=[1003932])) == [HTTP])
+    assert(list(select_results(raw, types=["ping"], probe_ids=[2184])) == [])
+    # Results we skip are never decoded
+    broken = '{"type":"dns","msm_id":1,"prb_id":2,"result":{"abuf":'
+    assert(list(select_results([broken, PING], types=["ping"], probe_ids=[270])) == [PING])
+
+
+def test_iter_results_filters():
+    results = list(iter_results(io.BytesIO(LINES), types=["http"]))
+    assert(len(results) == 1)
+    assert(isinstance(results[0], HttpResult))
+    for workers in (1, 2):
+        results = list(parse_many([PING, HTTP] * 3, workers=workers, probe_ids=[270]))
+        assert(len(results) == 3)
+        assert(isinstance(results[0], PingResult))
+
+
+def test_bytes_input():
+    raw = PING.encode("utf-8")
+    for data in (raw, bytearray(raw), memoryview(raw)):
+        assert(Result.sniff(data) == Result.sniff(PING))
+        result = Result.get(data)
+        assert(isinstance(result, PingResult))
+        assert(result.rtt_median == 44.346)
+        assert(PingResult(data).rtt_median == 44.346)
+
+
+def test_json_backends():
+    try:
+        for backend in Json.BACKENDS:
+            try:
+                assert(Json.use(backend) == backend)
+            except ImportError:
+                continue
+            for data in (HTTP, HTTP.encode("utf-8"), memoryview(HTTP.encode("utf-8"))):
+                assert(Json.loads(data) == json.loads(HTTP))
+            # Control characters are rejected by the faster libraries
+            assert(Json.loads('{"a": "b\x01c"}') == {"a": "b\x01c"})
+            try:
+                Json.loads("{broken")
+            except ResultParseError:
+                pass
+            else:
+                assert(False)
+    finally:
+        Json.use()
+
+
+def test_json_register():
+    try:
+        Json.register("test", lambda: lambda data: {"decoded": True})
+        assert(Json.BACKENDS[-2:] == ["test", "json"])
+        assert(Json.use("test") == "test")
+        assert(Json.loads("{}") == {"decoded": True})
+    finally:
+        Json.BACKENDS.remove("test")
+        del Json._registry["test"]
+        Json.use()
+
+
+def test_iter_dns_records():
+    records = list(iter_dns_records([PING, DNS, json.loads(DNS)]))
+    assert(len(records) == 6)
+    assert(records[:3] == records[3:])
+    assert(records[0] == DnsRecord(
+        2927179, 18279, 1447251248, 0, "abuf", "questions", "ripe.net.",
+        "AAAA", "IN", None, ()))
+    assert(records[1].section == "answers")
+    assert(records[1].ttl == 300)
+    assert(records[1].data == ("2001:67c:2e8:22:0:0:c100:68b",))
+    assert(records[2].type == "RRSIG")
+    assert(records[2].data[:3] == ("AAAA", 5, 2))
+
+
+def test_iter_dns_records_buffers_and_sections():
+    records = list(iter_dns_records([DNS], buffers=("abuf", "qbuf"), sections=["questions"]))
+    assert([(r.buffer, r.section, r.name) for r in records] == [
+        ("abuf", "questions", "ripe.net."),
+        ("qbuf", "questions", "ripe.net."),
+    ])
+    # The abuf has nothing in its additional section but an OPT record
+    assert(list(iter_dns_records([DNS], sections=("additionals",))) == [])
+    records = list(iter_dns_records([DNS], sections=("answers", "additionals")))
+    assert([r.section for r in records] == ["answers", "answers"])
+
+
+def test_iter_dns_records_over_processes():
+    serial = list(iter_dns_records([DNS, PING] * 5, workers=1))
+    assert(list(iter_dns_records([DNS, PING] * 5, workers=2, chunk_size=3)) == serial)
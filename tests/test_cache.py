@@ -0,0 +1,60 @@
+# Copyright (c) 2016 RIPE NCC
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import pickle
+
+from ripe.atlas.sagan.helpers.cache import LRUCache
+
+
+def test_lru_cache():
+    cache = LRUCache(2)
+    assert(cache.hit_ratio is None)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert(cache.get("a") == 1)
+    cache.set("c", 3)  # b is the least recently used
+    assert("b" not in cache)
+    assert(cache.get("b") is None)
+    assert(cache.get("b", 0) == 0)
+    assert(cache.get("a") == 1)
+    assert(cache.get("c") == 3)
+    assert(len(cache) == 2)
+    assert(cache.hits == 3)
+    assert(cache.misses == 2)
+    assert(cache.hit_ratio == 0.6)
+    cache.clear()
+    assert(len(cache) == 0)
+    assert(cache.hits == cache.misses == 0)
+
+
+def test_lru_cache_pickles_empty():
+    cache = LRUCache(10)
+    cache.set("a", 1)
+    cache.get("a")
+    copy = pickle.loads(pickle.dumps(cache))
+    assert(copy.maxsize == 10)
+    assert(len(copy) == 0)
+    assert(copy.hits == 0)
+    copy.set("a", 1)
+    assert(copy.get("a") == 1)
+
+
+def test_lru_cache_size():
+    try:
+        LRUCache(0)
+    except ValueError:
+        pass
+    else:
+        assert(False)
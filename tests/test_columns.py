@@ -0,0 +1,84 @@
+# Copyright (c) 2016 RIPE NCC
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import math
+
+from array import array
+
+from ripe.atlas.sagan import PingResult
+from ripe.atlas.sagan.columns import ping_columns, traceroute_columns, numpy
+
+PING = '{"af":4,"avg":57.140666666666668,"dst_addr":"62.2.16.24","dst_name":"hsi.cablecom.ch","dup":0,"from":"188.195.181.120","fw":4610,"group_id":1000192,"lts":93,"max":63.213000000000001,"min":47.941000000000003,"msm_id":1000192,"msm_name":"Ping","prb_id":270,"proto":"ICMP","rcvd":3,"result":[{"rtt":63.213000000000001},{"rtt":47.941000000000003,"ttl":51},{"rtt":60.268000000000001,"ttl":50}],"sent":3,"size":12,"src_addr":"192.168.178.21","step":360,"timestamp":1395416383,"ttl":50,"type":"ping"}'
+PING_TIMEOUTS = '{"addr":"62.2.16.12","af":4,"avg":-1,"dst_addr":"62.2.16.12","dst_name":"hsi.cablecom.ch","dup":2,"from":"84.132.219.105","fw":4400,"max":-1,"min":-1,"msm_id":1000192,"name":"hsi.cablecom.ch","prb_id":165,"proto":"ICMP","rcvd":0,"result":[{"x":"*"},{"rtt":12.5,"dup":1},{"x":"*"}],"sent":3,"size":20,"src_addr":"192.168.1.105","timestamp":1340524626,"ttl":54,"type":"ping"}'
+TRACEROUTE = '{"af":4,"dst_addr":"193.0.0.1","dst_name":"193.0.0.1","endtime":1340524627,"from":"84.132.219.105","fw":4610,"msm_id":5004,"paris_id":1,"prb_id":165,"proto":"ICMP","result":[{"hop":1,"result":[{"from":"192.168.1.1","rtt":1.2344,"size":68,"ttl":64},{"x":"*"},{"from":"192.168.1.1","late":1,"size":68,"ttl":64}]},{"hop":2,"error":"connect failed: Network is unreachable"},{"hop":3,"result":[{"err":"H","from":"193.0.0.1","rtt":20.0,"size":28,"ttl":60},{"from":"193.0.0.1","rtt":21.5,"size":28,"ttl":60}]}],"size":40,"src_addr":"192.168.1.105","timestamp":1340524626,"type":"traceroute"}'
+HTTP = '{"fw":4610,"msm_id":1003932,"prb_id":2184,"result":[{"addr":"2a01:9e00::1","af":6,"bsize":1406,"hsize":131,"method":"GET","res":200,"rt":28.437,"src_addr":"2001:470:1f0b:1d8::2","ver":"1.1"}],"timestamp":1398184661,"type":"http","uri":"http://www.ripe.net/"}'
+
+
+def test_ping_columns():
+    columns = ping_columns([PING, HTTP, PING_TIMEOUTS], as_numpy=False)
+    assert(isinstance(columns["rtt_median"], array))
+    assert(list(columns["probe_id"]) == [270, 165])
+    assert(list(columns["created_timestamp"]) == [1395416383, 1340524626])
+    assert(list(columns["af"]) == [4, 4])
+    assert(list(columns["duplicates"]) == [0, 2])
+    assert(columns["rtt_average"][0] == 57.141)
+    assert(columns["rtt_median"][0] == PingResult(PING).rtt_median)
+    assert(math.isnan(columns["rtt_average"][1]))
+    assert(math.isnan(columns["rtt_median"][1]))
+    assert(list(columns["packet_offsets"]) == [0, 3, 6])
+    assert(list(columns["packet_rtt"])[:3] == [63.213, 47.941, 60.268])
+    assert(math.isnan(columns["packet_rtt"][3]))
+    assert(columns["packet_rtt"][4] == 12.5)
+    assert(list(columns["packet_dup"]) == [0, 0, 0, 0, 1, 0])
+
+
+def test_ping_columns_empty():
+    columns = ping_columns([], as_numpy=False)
+    assert(list(columns["packet_offsets"]) == [0])
+    assert(len(columns["probe_id"]) == 0)
+
+
+def test_ping_columns_numpy():
+    if numpy is None:
+        return
+    columns = ping_columns([PING, PING_TIMEOUTS])
+    assert(isinstance(columns["rtt_median"], numpy.ndarray))
+    assert(columns["probe_id"].tolist() == [270, 165])
+    assert(numpy.nanmax(columns["packet_rtt"]) == 63.213)
+
+
+def test_traceroute_columns():
+    columns = traceroute_columns([TRACEROUTE, HTTP, TRACEROUTE], as_numpy=False)
+    assert(isinstance(columns["rtt"], array))
+    assert(len(columns["hop"]) == 12)
+    assert(list(columns["hop"])[:6] == [1, 1, 1, 2, 3, 3])
+    assert(list(columns["measurement_id"])[:6] == [5004] * 6)
+    assert(list(columns["late"])[:6] == [0, 0, 1, 0, 0, 0])
+    assert(columns["origin_values"] == ["192.168.1.1", "193.0.0.1"])
+    assert(list(columns["origin"])[:6] == [0, -1, 0, -1, 1, 1])
+    assert(columns["rtt"][0] == 1.234)
+    assert(math.isnan(columns["rtt"][1]))
+    assert(list(columns["ttl"])[:6] == [64, -1, 64, -1, 60, 60])
+    assert(columns["error_values"] == ["connect failed: Network is unreachable", "H"])
+    assert(list(columns["error"])[:6] == [-1, -1, -1, 0, 1, -1])
+    assert(list(columns["hop"])[6:] == list(columns["hop"])[:6])
+
+
+def test_traceroute_columns_numpy():
+    if numpy is None:
+        return
+    columns = traceroute_columns([TRACEROUTE])
+    assert(isinstance(columns["rtt"], numpy.ndarray))
+    assert(numpy.nanmax(columns["rtt"][columns["hop"] == 3]) == 21.5)
@@ -131,3 +131,54 @@ def test_ntp_error():
     assert(getattr(result.packets[0], "received_time", None) is None)
     assert(result.packets[0].offset is None)
     assert(result.packets[0].rtt is None)
+
+
+def test_ntp_lazy():
+    data = (
+        '{"af":4,"dst_addr":"193.0.0.229","dst_name":"atlas","from":"193.0.0.78","fw":4670,'
+        '"group_id":1020237,"li":"no","lts":-1,"mode":"server","msm_id":1020237,"msm_name":"Ntp",'
+        '"poll":1,"prb_id":71,"precision":0.0000019074,"proto":"UDP","ref-id":"GPS",'
+        '"ref-ts":3627199357.7446351051,"result":['
+            '{"final-ts":3627199379.8182010651,"offset":-8.363271,"origin-ts":3627199379.7962741852,'
+            '"receive-ts":3627199388.1704945564,"rtt":0.021899,"transmit-ts":3627199388.170522213},'
+            '{"final-ts":3627199379.831638813,"offset":-8.36871,"origin-ts":3627199379.8214530945,'
+            '"receive-ts":3627199388.1952428818,"rtt":0.01016,"transmit-ts":3627199388.195268631}'
+        '],'
+        '"root-delay":0,"root-dispersion":0.00140381,"src_addr":"10.0.2.12","stratum":1,'
+        '"timestamp":1418210579,"type":"ntp","version":4}'
+    )
+    result = Result.get(data, lazy=True)
+    assert(result.stratum == 1)
+    assert(result._packets is None)
+    assert(result.rtt_median == 0.016)
+    assert(len(result._packets) == 2)
+    assert(result.offset_min == -8.36871)
+    assert(result.to_dict() == Result.get(data).to_dict())
+
+    result = Result.get(data.replace('"result"', '"nothing"'), lazy=True)
+    assert(result.is_malformed is True)
+    assert(result.packets == [])
+
+
+def test_ntp_assign_packets():
+    data = (
+        '{"af":4,"dst_addr":"193.0.0.229","dst_name":"atlas","from":"193.0.0.78","fw":4670,'
+        '"group_id":1020237,"li":"no","lts":-1,"mode":"server","msm_id":1020237,"msm_name":"Ntp",'
+        '"poll":1,"prb_id":71,"precision":0.0000019074,"proto":"UDP","ref-id":"GPS",'
+        '"ref-ts":3627199357.7446351051,"result":['
+            '{"final-ts":3627199379.8182010651,"offset":-8.363271,"origin-ts":3627199379.7962741852,'
+            '"receive-ts":3627199388.1704945564,"rtt":0.021899,"transmit-ts":3627199388.170522213},'
+            '{"final-ts":3627199379.831638813,"offset":-8.36871,"origin-ts":3627199379.8214530945,'
+            '"receive-ts":3627199388.1952428818,"rtt":0.01016,"transmit-ts":3627199388.195268631}'
+        '],'
+        '"root-delay":0,"root-dispersion":0.00140381,"src_addr":"10.0.2.12","stratum":1,'
+        '"timestamp":1418210579,"type":"ntp","version":4}'
+    )
+    # These were plain attributes before they could be parsed lazily
+    for lazy in (False, True):
+        result = Result.get(data, lazy=lazy)
+        result.packets = []
+        for name in ("rtt_median", "rtt_min", "rtt_max", "offset_median", "offset_min", "offset_max"):
+            setattr(result, name, 1.5)
+            assert(getattr(result, name) == 1.5)
+        assert(result.packets == [])
@@ -499,3 +499,69 @@ def test_ping_buggy():
 def test_ping_lts():
     result = Result.get('{"af":4,"prb_id":270,"result":[{"rtt":70.265},{"rtt":54.584,"ttl":51},{"rtt":52.875}],"ttl":51,"avg":59.2413333333,"size":12,"from":"188.193.157.75","proto":"ICMP","timestamp":1406561624,"dup":0,"type":"ping","sent":3,"msm_id":1000192,"fw":4650,"max":70.265,"step":360,"src_addr":"192.168.178.21","rcvd":3,"msm_name":"Ping","lts":76,"dst_name":"hsi.cablecom.ch","min":52.875,"group_id":1000192,"dst_addr":"62.2.16.24"}')
     assert(result.seconds_since_sync == 76)
+
+
+def test_ping_to_dict():
+    result = Result.get('{"af":4,"avg":57.140666666666668,"dst_addr":"62.2.16.24","dst_name":"hsi.cablecom.ch","dup":0,"from":"188.195.181.120","fw":4610,"group_id":1000192,"lts":93,"max":63.213000000000001,"min":47.941000000000003,"msm_id":1000192,"msm_name":"Ping","prb_id":270,"proto":"ICMP","rcvd":3,"result":[{"rtt":63.213000000000001},{"rtt":47.941000000000003,"ttl":51},{"rtt":60.268000000000001,"ttl":50}],"sent":3,"size":12,"src_addr":"192.168.178.21","step":360,"timestamp":1395416383,"ttl":50,"type":"ping"}')
+    assert("raw_data" in result.keys())
+    assert("created_timestamp" in result.keys())
+    assert(len(result) == len(result.keys()))
+    assert(bool(result))
+    d = result.to_dict()
+    assert("raw_data" not in d)
+    assert(d["rtt_median"] == 60.268)
+    assert(d["created_timestamp"] == 1395416383)
+    assert(d["packets"][1] == {
+        "dup": False,
+        "error_message": None,
+        "is_error": False,
+        "is_malformed": False,
+        "rtt": 47.941,
+        "source_address": "192.168.178.21",
+        "ttl": 51,
+    })
+
+
+def test_ping_lazy():
+    data = '{"af":4,"avg":57.140666666666668,"dst_addr":"62.2.16.24","dst_name":"hsi.cablecom.ch","dup":0,"from":"188.195.181.120","fw":4610,"group_id":1000192,"lts":93,"max":63.213000000000001,"min":47.941000000000003,"msm_id":1000192,"msm_name":"Ping","prb_id":270,"proto":"ICMP","rcvd":3,"result":[{"rtt":63.213000000000001},{"rtt":47.941000000000003,"ttl":51},{"rtt":60.268000000000001,"ttl":50}],"sent":3,"size":12,"src_addr":"192.168.178.21","step":360,"timestamp":1395416383,"ttl":50,"type":"ping"}'
+    result = Result.get(data, lazy=True)
+    assert(result.rtt_average == 57.141)
+    assert(result._packets is None)
+    assert(result.rtt_median == 60.268)
+    assert(len(result._packets) == 3)
+    assert(result.to_dict() == Result.get(data).to_dict())
+
+    result = PingResult(data, lazy=True, keep_raw_data=False)
+    result.drop_raw_data()
+    assert(result.raw_data is None)
+    assert(result.packets[2].rtt == 60.268)
+
+
+def test_ping_assign_packets():
+    data = '{"af":4,"avg":57.140666666666668,"dst_addr":"62.2.16.24","dst_name":"hsi.cablecom.ch","dup":0,"from":"188.195.181.120","fw":4610,"group_id":1000192,"lts":93,"max":63.213000000000001,"min":47.941000000000003,"msm_id":1000192,"msm_name":"Ping","prb_id":270,"proto":"ICMP","rcvd":3,"result":[{"rtt":63.213000000000001},{"rtt":47.941000000000003,"ttl":51},{"rtt":60.268000000000001,"ttl":50}],"sent":3,"size":12,"src_addr":"192.168.178.21","step":360,"timestamp":1395416383,"ttl":50,"type":"ping"}'
+    # These were plain attributes before they could be parsed lazily
+    for lazy in (False, True):
+        result = Result.get(data, lazy=lazy)
+        result.packets = result.packets[:1]
+        result.rtt_median = 1.5
+        assert(len(result.packets) == 1)
+        assert(result.rtt_median == 1.5)
+
+
+def test_ping_packets_are_slotted():
+    # Packets (like hops and DNS answers) have __slots__ and no __dict__, so
+    # only the attributes they define can be set.  Results are unaffected.
+    result = Result.get('{"af":4,"avg":57.140666666666668,"dst_addr":"62.2.16.24","dst_name":"hsi.cablecom.ch","dup":0,"from":"188.195.181.120","fw":4610,"group_id":1000192,"lts":93,"max":63.213000000000001,"min":47.941000000000003,"msm_id":1000192,"msm_name":"Ping","prb_id":270,"proto":"ICMP","rcvd":3,"result":[{"rtt":63.213000000000001},{"rtt":47.941000000000003,"ttl":51},{"rtt":60.268000000000001,"ttl":50}],"sent":3,"size":12,"src_addr":"192.168.178.21","step":360,"timestamp":1395416383,"ttl":50,"type":"ping"}')
+    packet = result.packets[0]
+    assert(not hasattr(packet, "__dict__"))
+    packet.rtt = 1.5
+    assert(packet.rtt == 1.5)
+    try:
+        packet.note = "something of our own"
+    except AttributeError:
+        pass
+    else:
+        assert(False)
+    assert(packet.to_dict()["rtt"] == 1.5)
+    result.note = "something of our own"
+    assert(vars(result)["note"] == "something of our own")
@@ -13,8 +13,17 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import json
+import os
+import subprocess
+import sys
+
+from datetime import datetime
+
 from ripe.atlas.sagan import Result, ResultError
-from ripe.atlas.sagan.ssl import SslResult
+from ripe.atlas.sagan.ssl import SslResult, Certificate, ChainChangeDetector
+from ripe.atlas.sagan.helpers import der
+from ripe.atlas.sagan.helpers.cache import LRUCache
 
 
 def test_ssl_4480():
@@ -407,3 +416,176 @@ def test_ssl_x509_san():
         {},
     ]
     assert extensions == should_be
+
+
+def test_certificate_cache():
+    raw = '{"lts":45,"rt":67.073945,"msm_id":8844155,"from":"185.116.201.100","dst_name":"tinkoff.ru","af":4,"timestamp":1497464532,"fw":4780,"cert":["-----BEGIN CERTIFICATE-----\nMIIEsTCCA5mgAwIBAgIQV1CAInv97wvzUjqHD0BbyzANBgkqhkiG9w0BAQsFADBB\nMQswCQYDVQQGEwJVUzEVMBMGA1UEChMMdGhhd3RlLCBJbmMuMRswGQYDVQQDExJ0\naGF3dGUgU1NMIENBIC0gRzIwHhcNMTUxMDIwMDAwMDAwWhcNMTcxMjE4MjM1OTU5\nWjBqMQswCQYDVQQGEwJSVTEPMA0GA1UECBMGTW9zY293MQ8wDQYDVQQHFAZNb3Nj\nb3cxFTATBgNVBAoUDFRpbmtvZmYgQmFuazELMAkGA1UECxQCSVQxFTATBgNVBAMU\nDCoudGlua29mZi5ydTCCASIwDQYJKoZIhvcNAQEBBQADggEPADCCAQoCggEBAN4W\ncKDTHE470BZWvUBpgce4nMWH9lNa2KWCbrcFMUcqtMaFVh4tp53gKvlvaJyecQ9y\noQBrJycdp7Du8R7HFUwgALBMxjVsrSdai3wS6txCpXJCuT+92spwyuVOT3ZGjXip\n5EwVxXuXNMbi3+alSuX1ocM3m9FWas\/fvhreQZYxpx6CH0+eqpinbTOwYc\/7gvh0\nMJdl+ESN9j9FE87aCTC\/VMakxOIRHsyApG0XNegUj3Fs2HO0XrIxMSqSrCuZqs0q\nUXINGTIoVJVgU4fzuJad2jLrzePDkliKZDZ6JZaeSKQsGgB7mNbCFwCW1oUyepHn\nASHG7BrAiP6tBbiwLHMCAwEAAaOCAXowggF2MCMGA1UdEQQcMBqCDCoudGlua29m\nZi5ydYIKdGlua29mZi5ydTAJBgNVHRMEAjAAMG4GA1UdIARnMGUwYwYGZ4EMAQIC\nMFkwJgYIKwYBBQUHAgEWGmh0dHBzOi8vd3d3LnRoYXd0ZS5jb20vY3BzMC8GCCsG\nAQUFBwICMCMMIWh0dHBzOi8vd3d3LnRoYXd0ZS5jb20vcmVwb3NpdG9yeTAOBgNV\nHQ8BAf8EBAMCBaAwHwYDVR0jBBgwFoAUwk9IV\/zRT5rAXTh9DgXb2S61UmAwKwYD\nVR0fBCQwIjAgoB6gHIYaaHR0cDovL3RqLnN5bWNiLmNvbS90ai5jcmwwHQYDVR0l\nBBYwFAYIKwYBBQUHAwEGCCsGAQUFBwMCMFcGCCsGAQUFBwEBBEswSTAfBggrBgEF\nBQcwAYYTaHR0cDovL3RqLnN5bWNkLmNvbTAmBggrBgEFBQcwAoYaaHR0cDovL3Rq\nLnN5bWNiLmNvbS90ai5jcnQwDQYJKoZIhvcNAQELBQADggEBAK1I1sCTFQn86Bhu\n78+TPM\/DNjTP1LhFOfHIYlN4askbNur1KI5i52Sqpq539Q43LWQbWZzIx1YsCsfb\nLevVZPmVGxPMgdaqs70rhAp0B1zsWBZd0ImObPTNxNYlQQwmH5S4IWa\/cxKZ9qj0\n\/vm5Wkd6eTuAfSEzOAmzDWwnTnv+aI0j3CNL4iccICMDoS0RJqoYtIzH+PGY7S21\n7xNHUlADsHa\/AeBEX6\/Ru12GMGtfSkMeYamEcrjUc\/VdX\/tIOFAMQh3iiZtpPvEQ\not8o4U20tZ7bjsRKGw2uKNfZyv9hi6flNMRHk9eS2Hi0KpOU+r462ttY8JXxUetp\nDaymEBk=\n-----END CERTIFICATE-----","-----BEGIN CERTIFICATE-----\nMIIEsjCCA5qgAwIBAgIQFofWiG3iMAaFIz2\/Eb9llzANBgkqhkiG9w0BAQsFADCB\nqTELMAkGA1UEBhMCVVMxFTATBgNVBAoTDHRoYXd0ZSwgSW5jLjEoMCYGA1UECxMf\nQ2VydGlmaWNhdGlvbiBTZXJ2aWNlcyBEaXZpc2lvbjE4MDYGA1UECxMvKGMpIDIw\nMDYgdGhhd3RlLCBJbmMuIC0gRm9yIGF1dGhvcml6ZWQgdXNlIG9ubHkxHzAdBgNV\nBAMTFnRoYXd0ZSBQcmltYXJ5IFJvb3QgQ0EwHhcNMTMxMDMxMDAwMDAwWhcNMjMx\nMDMwMjM1OTU5WjBBMQswCQYDVQQGEwJVUzEVMBMGA1UEChMMdGhhd3RlLCBJbmMu\nMRswGQYDVQQDExJ0aGF3dGUgU1NMIENBIC0gRzIwggEiMA0GCSqGSIb3DQEBAQUA\nA4IBDwAwggEKAoIBAQCy\/Ab7BJPS6lkgO0SFl1I55xDweuCwlEDaRvgMKLu5zmA4\nP9LYEUIbka1J7o\/H3mzeN2\/9iyA8bed009zVJIhBgInuNr7E1b6NUxOq5KW4kwq+\n7NrNPNQyVu\/QTqC4l7s5UB5uZcP9ss7gWalICcb+vq78PjuBIJeLj0bfYGQHdbsb\nhjifR3s0zqHRl6122J+3Jtt5gDZI8sU3+NkyrnykU4HHmaFUOC9PdaC7WqW7zawC\nWxkC1RMYp86sdFUSBYubopVGZHI4zVobOhanvnGZjFQDuJZsAdM+Bpg\/IYE7An4A\nR1MBHg5GQ\/tLLdwLGugvmPh+0ZmrE2ykF95v9hX1AgMBAAGjggE7MIIBNzASBgNV\nHRMBAf8ECDAGAQH\/AgEAMA4GA1UdDwEB\/wQEAwIBBjAyBgNVHR8EKzApMCegJaAj\nhiFodHRwOi8vdDEuc3ltY2IuY29tL1RoYXd0ZVBDQS5jcmwwLwYIKwYBBQUHAQEE\nIzAhMB8GCCsGAQUFBzABhhNodHRwOi8vdDIuc3ltY2IuY29tMEEGA1UdIAQ6MDgw\nNgYKYIZIAYb4RQEHNjAoMCYGCCsGAQUFBwIBFhpodHRwczovL3d3dy50aGF3dGUu\nY29tL2NwczApBgNVHREEIjAgpB4wHDEaMBgGA1UEAxMRU3ltYW50ZWNQS0ktMS01\nMzcwHQYDVR0OBBYEFMJPSFf80U+awF04fQ4F29kutVJgMB8GA1UdIwQYMBaAFHtb\nRc+vzst6\/TGSGmq280brV0hQMA0GCSqGSIb3DQEBCwUAA4IBAQCNBt5DyXYCytkj\nl17zY9d9RMIPawr1B+WLuPrgo\/prgJK1AyzFN+DC5ZW1knAYKEKU7kt3agEPiyPs\nVk30AGnlhMji6t5bPvY8BzqUymwnscyDGmBxJ9K\/AvUeRNNI1abTdiEAnPqYZOsX\nNj\/rGzw+prHZWAYOctlovvGnINdS5KR3H3FwnVU1hTfhHU2UwnB\/lUBuS32ytCkq\nA3nIuUxnYQSgiyf\/WQDrVX\/GtzM1LV5OrLjqEsXo97mrvnSSLLfZTcqELxzC8HJ8\nsjFuz4DliAc2UXu6Ya9tjSNbNKOVvKIxf\/L157fo78S1JzLp955pxyvovrsMqufq\nYBLqJop4\n-----END CERTIFICATE-----","-----BEGIN CERTIFICATE-----\nMIIEIDCCAwigAwIBAgIQNE7VVyDV7exJ9C\/ON9srbTANBgkqhkiG9w0BAQUFADCB\nqTELMAkGA1UEBhMCVVMxFTATBgNVBAoTDHRoYXd0ZSwgSW5jLjEoMCYGA1UECxMf\nQ2VydGlmaWNhdGlvbiBTZXJ2aWNlcyBEaXZpc2lvbjE4MDYGA1UECxMvKGMpIDIw\nMDYgdGhhd3RlLCBJbmMuIC0gRm9yIGF1dGhvcml6ZWQgdXNlIG9ubHkxHzAdBgNV\nBAMTFnRoYXd0ZSBQcmltYXJ5IFJvb3QgQ0EwHhcNMDYxMTE3MDAwMDAwWhcNMzYw\nNzE2MjM1OTU5WjCBqTELMAkGA1UEBhMCVVMxFTATBgNVBAoTDHRoYXd0ZSwgSW5j\nLjEoMCYGA1UECxMfQ2VydGlmaWNhdGlvbiBTZXJ2aWNlcyBEaXZpc2lvbjE4MDYG\nA1UECxMvKGMpIDIwMDYgdGhhd3RlLCBJbmMuIC0gRm9yIGF1dGhvcml6ZWQgdXNl\nIG9ubHkxHzAdBgNVBAMTFnRoYXd0ZSBQcmltYXJ5IFJvb3QgQ0EwggEiMA0GCSqG\nSIb3DQEBAQUAA4IBDwAwggEKAoIBAQCsoPD7gFnUnMekz52hWXMJEEUMDSxuaPFs\nW0hoSVk3\/AszGcJ3f8wQLZU0HObrTQmnHNK4yZc2AreJ1CRfBsDMRJSUjQJib+ta\n3RGNKJpchJAQeg29dGYvajig4tVUROsdB58Hum\/u6f1OCyn1PoSgAfGcq\/gcfomk\n6KHYcWUNo1F77rzSImANuVud37r8UVsLr5iy6S7pBOhih94ryNdOwUxkHt3Ph1i6\nSk\/KaAcdHJ1KxtUvkcx8cXIcxcBn6zL9yZJclNqFwJu\/U30rCfSMnZEfl2pSy94J\nNqR32HuHUETVPm4pafs5SSYeCaWAe0At6+gnhcn+Yf1+5nyXHdWdAgMBAAGjQjBA\nMA8GA1UdEwEB\/wQFMAMBAf8wDgYDVR0PAQH\/BAQDAgEGMB0GA1UdDgQWBBR7W0XP\nr87Lev0xkhpqtvNG61dIUDANBgkqhkiG9w0BAQUFAAOCAQEAeRHAS7ORtvzw6WfU\nDW5FvlXok9LOAz\/t2iWwHVfLHjp2oEzsUHboZHIMpKnxuIvW1oeEuzLlQRHAd9mz\nYJ3rG9XRbkREqaYB7FViHXe4XI5ISXycO1cRrK1zN44veFyQaEfZYGDm\/Ac9IiAX\nxPcW6cTYcvnIc3zfFi8VqT79aie2oetaupgf1eNNZAqdE8hhuvU5HIe6uL17In\/2\n\/qxAeeWsEG89jxt5dovEN7MhGITlNgDrYyCZuen+MwS7QcjBAvlEYyCegc5C09Y\/\nLHbTY5xZ3Y+m4Q6gLkH3LpVHz7z9M\/P2C2F+fpErgUfCJzDupxBdN49cOSvkBPB7\njVaMaA==\n-----END CERTIFICATE-----"],"method":"TLS","prb_id":10096,"dst_port":"443","dst_addr":"178.248.236.31","ttc":33.09869,"src_addr":"185.116.201.100","group_id":8844155,"type":"sslcert","msm_name":"SSLCert","ver":"1.2"}'
+    cache = LRUCache()
+    expected = Result.get(raw)
+    for _ in range(3):
+        result = Result.get(raw, certificate_cache=cache)
+        for certificate, other in zip(result.certificates, expected.certificates):
+            assert(certificate is not other)
+            assert(certificate.checksum == other.checksum)
+            assert(certificate.subject_cn == other.subject_cn)
+            assert(certificate.issuer_cn == other.issuer_cn)
+            assert(certificate.valid_until == other.valid_until)
+            assert(certificate.extensions == other.extensions)
+            assert(certificate.has_expired == other.has_expired)
+    assert(len(cache) == 3)
+    assert((cache.hits, cache.misses) == (6, 3))
+
+
+def test_lazy_certificates():
+    raw = '{"lts":45,"rt":67.073945,"msm_id":8844155,"from":"185.116.201.100","dst_name":"tinkoff.ru","af":4,"timestamp":1497464532,"fw":4780,"cert":["-----BEGIN CERTIFICATE-----\nMIIEsTCCA5mgAwIBAgIQV1CAInv97wvzUjqHD0BbyzANBgkqhkiG9w0BAQsFADBB\nMQswCQYDVQQGEwJVUzEVMBMGA1UEChMMdGhhd3RlLCBJbmMuMRswGQYDVQQDExJ0\naGF3dGUgU1NMIENBIC0gRzIwHhcNMTUxMDIwMDAwMDAwWhcNMTcxMjE4MjM1OTU5\nWjBqMQswCQYDVQQGEwJSVTEPMA0GA1UECBMGTW9zY293MQ8wDQYDVQQHFAZNb3Nj\nb3cxFTATBgNVBAoUDFRpbmtvZmYgQmFuazELMAkGA1UECxQCSVQxFTATBgNVBAMU\nDCoudGlua29mZi5ydTCCASIwDQYJKoZIhvcNAQEBBQADggEPADCCAQoCggEBAN4W\ncKDTHE470BZWvUBpgce4nMWH9lNa2KWCbrcFMUcqtMaFVh4tp53gKvlvaJyecQ9y\noQBrJycdp7Du8R7HFUwgALBMxjVsrSdai3wS6txCpXJCuT+92spwyuVOT3ZGjXip\n5EwVxXuXNMbi3+alSuX1ocM3m9FWas\/fvhreQZYxpx6CH0+eqpinbTOwYc\/7gvh0\nMJdl+ESN9j9FE87aCTC\/VMakxOIRHsyApG0XNegUj3Fs2HO0XrIxMSqSrCuZqs0q\nUXINGTIoVJVgU4fzuJad2jLrzePDkliKZDZ6JZaeSKQsGgB7mNbCFwCW1oUyepHn\nASHG7BrAiP6tBbiwLHMCAwEAAaOCAXowggF2MCMGA1UdEQQcMBqCDCoudGlua29m\nZi5ydYIKdGlua29mZi5ydTAJBgNVHRMEAjAAMG4GA1UdIARnMGUwYwYGZ4EMAQIC\nMFkwJgYIKwYBBQUHAgEWGmh0dHBzOi8vd3d3LnRoYXd0ZS5jb20vY3BzMC8GCCsG\nAQUFBwICMCMMIWh0dHBzOi8vd3d3LnRoYXd0ZS5jb20vcmVwb3NpdG9yeTAOBgNV\nHQ8BAf8EBAMCBaAwHwYDVR0jBBgwFoAUwk9IV\/zRT5rAXTh9DgXb2S61UmAwKwYD\nVR0fBCQwIjAgoB6gHIYaaHR0cDovL3RqLnN5bWNiLmNvbS90ai5jcmwwHQYDVR0l\nBBYwFAYIKwYBBQUHAwEGCCsGAQUFBwMCMFcGCCsGAQUFBwEBBEswSTAfBggrBgEF\nBQcwAYYTaHR0cDovL3RqLnN5bWNkLmNvbTAmBggrBgEFBQcwAoYaaHR0cDovL3Rq\nLnN5bWNiLmNvbS90ai5jcnQwDQYJKoZIhvcNAQELBQADggEBAK1I1sCTFQn86Bhu\n78+TPM\/DNjTP1LhFOfHIYlN4askbNur1KI5i52Sqpq539Q43LWQbWZzIx1YsCsfb\nLevVZPmVGxPMgdaqs70rhAp0B1zsWBZd0ImObPTNxNYlQQwmH5S4IWa\/cxKZ9qj0\n\/vm5Wkd6eTuAfSEzOAmzDWwnTnv+aI0j3CNL4iccICMDoS0RJqoYtIzH+PGY7S21\n7xNHUlADsHa\/AeBEX6\/Ru12GMGtfSkMeYamEcrjUc\/VdX\/tIOFAMQh3iiZtpPvEQ\not8o4U20tZ7bjsRKGw2uKNfZyv9hi6flNMRHk9eS2Hi0KpOU+r462ttY8JXxUetp\nDaymEBk=\n-----END CERTIFICATE-----","-----BEGIN CERTIFICATE-----\nMIIEsjCCA5qgAwIBAgIQFofWiG3iMAaFIz2\/Eb9llzANBgkqhkiG9w0BAQsFADCB\nqTELMAkGA1UEBhMCVVMxFTATBgNVBAoTDHRoYXd0ZSwgSW5jLjEoMCYGA1UECxMf\nQ2VydGlmaWNhdGlvbiBTZXJ2aWNlcyBEaXZpc2lvbjE4MDYGA1UECxMvKGMpIDIw\nMDYgdGhhd3RlLCBJbmMuIC0gRm9yIGF1dGhvcml6ZWQgdXNlIG9ubHkxHzAdBgNV\nBAMTFnRoYXd0ZSBQcmltYXJ5IFJvb3QgQ0EwHhcNMTMxMDMxMDAwMDAwWhcNMjMx\nMDMwMjM1OTU5WjBBMQswCQYDVQQGEwJVUzEVMBMGA1UEChMMdGhhd3RlLCBJbmMu\nMRswGQYDVQQDExJ0aGF3dGUgU1NMIENBIC0gRzIwggEiMA0GCSqGSIb3DQEBAQUA\nA4IBDwAwggEKAoIBAQCy\/Ab7BJPS6lkgO0SFl1I55xDweuCwlEDaRvgMKLu5zmA4\nP9LYEUIbka1J7o\/H3mzeN2\/9iyA8bed009zVJIhBgInuNr7E1b6NUxOq5KW4kwq+\n7NrNPNQyVu\/QTqC4l7s5UB5uZcP9ss7gWalICcb+vq78PjuBIJeLj0bfYGQHdbsb\nhjifR3s0zqHRl6122J+3Jtt5gDZI8sU3+NkyrnykU4HHmaFUOC9PdaC7WqW7zawC\nWxkC1RMYp86sdFUSBYubopVGZHI4zVobOhanvnGZjFQDuJZsAdM+Bpg\/IYE7An4A\nR1MBHg5GQ\/tLLdwLGugvmPh+0ZmrE2ykF95v9hX1AgMBAAGjggE7MIIBNzASBgNV\nHRMBAf8ECDAGAQH\/AgEAMA4GA1UdDwEB\/wQEAwIBBjAyBgNVHR8EKzApMCegJaAj\nhiFodHRwOi8vdDEuc3ltY2IuY29tL1RoYXd0ZVBDQS5jcmwwLwYIKwYBBQUHAQEE\nIzAhMB8GCCsGAQUFBzABhhNodHRwOi8vdDIuc3ltY2IuY29tMEEGA1UdIAQ6MDgw\nNgYKYIZIAYb4RQEHNjAoMCYGCCsGAQUFBwIBFhpodHRwczovL3d3dy50aGF3dGUu\nY29tL2NwczApBgNVHREEIjAgpB4wHDEaMBgGA1UEAxMRU3ltYW50ZWNQS0ktMS01\nMzcwHQYDVR0OBBYEFMJPSFf80U+awF04fQ4F29kutVJgMB8GA1UdIwQYMBaAFHtb\nRc+vzst6\/TGSGmq280brV0hQMA0GCSqGSIb3DQEBCwUAA4IBAQCNBt5DyXYCytkj\nl17zY9d9RMIPawr1B+WLuPrgo\/prgJK1AyzFN+DC5ZW1knAYKEKU7kt3agEPiyPs\nVk30AGnlhMji6t5bPvY8BzqUymwnscyDGmBxJ9K\/AvUeRNNI1abTdiEAnPqYZOsX\nNj\/rGzw+prHZWAYOctlovvGnINdS5KR3H3FwnVU1hTfhHU2UwnB\/lUBuS32ytCkq\nA3nIuUxnYQSgiyf\/WQDrVX\/GtzM1LV5OrLjqEsXo97mrvnSSLLfZTcqELxzC8HJ8\nsjFuz4DliAc2UXu6Ya9tjSNbNKOVvKIxf\/L157fo78S1JzLp955pxyvovrsMqufq\nYBLqJop4\n-----END CERTIFICATE-----","-----BEGIN CERTIFICATE-----\nMIIEIDCCAwigAwIBAgIQNE7VVyDV7exJ9C\/ON9srbTANBgkqhkiG9w0BAQUFADCB\nqTELMAkGA1UEBhMCVVMxFTATBgNVBAoTDHRoYXd0ZSwgSW5jLjEoMCYGA1UECxMf\nQ2VydGlmaWNhdGlvbiBTZXJ2aWNlcyBEaXZpc2lvbjE4MDYGA1UECxMvKGMpIDIw\nMDYgdGhhd3RlLCBJbmMuIC0gRm9yIGF1dGhvcml6ZWQgdXNlIG9ubHkxHzAdBgNV\nBAMTFnRoYXd0ZSBQcmltYXJ5IFJvb3QgQ0EwHhcNMDYxMTE3MDAwMDAwWhcNMzYw\nNzE2MjM1OTU5WjCBqTELMAkGA1UEBhMCVVMxFTATBgNVBAoTDHRoYXd0ZSwgSW5j\nLjEoMCYGA1UECxMfQ2VydGlmaWNhdGlvbiBTZXJ2aWNlcyBEaXZpc2lvbjE4MDYG\nA1UECxMvKGMpIDIwMDYgdGhhd3RlLCBJbmMuIC0gRm9yIGF1dGhvcml6ZWQgdXNl\nIG9ubHkxHzAdBgNVBAMTFnRoYXd0ZSBQcmltYXJ5IFJvb3QgQ0EwggEiMA0GCSqG\nSIb3DQEBAQUAA4IBDwAwggEKAoIBAQCsoPD7gFnUnMekz52hWXMJEEUMDSxuaPFs\nW0hoSVk3\/AszGcJ3f8wQLZU0HObrTQmnHNK4yZc2AreJ1CRfBsDMRJSUjQJib+ta\n3RGNKJpchJAQeg29dGYvajig4tVUROsdB58Hum\/u6f1OCyn1PoSgAfGcq\/gcfomk\n6KHYcWUNo1F77rzSImANuVud37r8UVsLr5iy6S7pBOhih94ryNdOwUxkHt3Ph1i6\nSk\/KaAcdHJ1KxtUvkcx8cXIcxcBn6zL9yZJclNqFwJu\/U30rCfSMnZEfl2pSy94J\nNqR32HuHUETVPm4pafs5SSYeCaWAe0At6+gnhcn+Yf1+5nyXHdWdAgMBAAGjQjBA\nMA8GA1UdEwEB\/wQFMAMBAf8wDgYDVR0PAQH\/BAQDAgEGMB0GA1UdDgQWBBR7W0XP\nr87Lev0xkhpqtvNG61dIUDANBgkqhkiG9w0BAQUFAAOCAQEAeRHAS7ORtvzw6WfU\nDW5FvlXok9LOAz\/t2iWwHVfLHjp2oEzsUHboZHIMpKnxuIvW1oeEuzLlQRHAd9mz\nYJ3rG9XRbkREqaYB7FViHXe4XI5ISXycO1cRrK1zN44veFyQaEfZYGDm\/Ac9IiAX\nxPcW6cTYcvnIc3zfFi8VqT79aie2oetaupgf1eNNZAqdE8hhuvU5HIe6uL17In\/2\n\/qxAeeWsEG89jxt5dovEN7MhGITlNgDrYyCZuen+MwS7QcjBAvlEYyCegc5C09Y\/\nLHbTY5xZ3Y+m4Q6gLkH3LpVHz7z9M\/P2C2F+fpErgUfCJzDupxBdN49cOSvkBPB7\njVaMaA==\n-----END CERTIFICATE-----"],"method":"TLS","prb_id":10096,"dst_port":"443","dst_addr":"178.248.236.31","ttc":33.09869,"src_addr":"185.116.201.100","group_id":8844155,"type":"sslcert","msm_name":"SSLCert","ver":"1.2"}'
+    expected = Result.get(raw)
+    result = Result.get(raw, lazy=True)
+    certificate = result.certificates[0]
+    assert(certificate._fields == {})
+    assert(result.checksum_chain == expected.checksum_chain)
+    assert(sorted(certificate._fields) == ["checksum_sha256"])
+    result.drop_raw_data()
+    assert(certificate.subject_cn == "*.tinkoff.ru")
+    assert(result.to_dict() == expected.to_dict())
+    assert(certificate._der is None)
+
+
+def test_lazy_certificate_errors():
+    raw = '{"af":4,"cert":["-----BEGIN CERTIFICATE-----\\nAAAA\\n-----END CERTIFICATE-----"],"dst_addr":"80.79.115.54","dst_name":"pretical.ee","dst_port":"https","from":"77.95.64.18","fw":4480,"msm_id":1006864,"prb_id":517,"src_addr":"77.95.64.18","timestamp":1362454627,"type":"sslcert","ver":"3.0"}'
+    assert(Result.get(raw, on_error=Result.ACTION_IGNORE).certificates == [])
+    result = Result.get(raw, lazy=True, on_error=Result.ACTION_IGNORE)
+    certificate = result.certificates[0]
+    assert(certificate.checksum_sha1 == "29:E2:DC:FB:B1:6F:63:BB:02:54:DF:75:85:A1:5B:B6:FB:5E:92:7D")
+    assert(certificate.subject_cn is None)
+    assert(certificate.is_error)
+    assert(not result.is_error)
+
+
+def test_bad_pem_certificates():
+    raw = '{"af":4,"cert":["-----BEGIN CERTIFICATE-----\\nMAMC$QA=\\n-----END CERTIFICATE-----"],"dst_addr":"80.79.115.54","dst_name":"pretical.ee","dst_port":"https","from":"77.95.64.18","fw":4480,"msm_id":1006864,"prb_id":517,"src_addr":"77.95.64.18","timestamp":1362454627,"type":"sslcert","ver":"3.0"}'
+    for kwargs in ({}, {"lazy": True}, {"light": True}, {"lazy": True, "light": True}):
+        result = Result.get(raw, on_error=Result.ACTION_IGNORE, **kwargs)
+        assert(result.certificates == [])
+        assert(result.is_error)
+        assert(result.error_message.startswith("Unable to load PEM certificate"))
+
+
+def test_certificate_cache_errors():
+    # A DER SEQUENCE holding nothing but an INTEGER
+    raw = '{"af":4,"cert":["-----BEGIN CERTIFICATE-----\\nMAMCAQA=\\n-----END CERTIFICATE-----"],"dst_addr":"80.79.115.54","dst_name":"pretical.ee","dst_port":"https","from":"77.95.64.18","fw":4480,"msm_id":1006864,"prb_id":517,"src_addr":"77.95.64.18","timestamp":1362454627,"type":"sslcert","ver":"3.0"}'
+    cache = LRUCache()
+    for _ in range(2):
+        result = Result.get(raw, certificate_cache=cache, lazy=True, on_error=Result.ACTION_IGNORE)
+        certificate = result.certificates[0]
+        assert(certificate.checksum_sha1 is not None)
+        assert(certificate.subject_cn is None)
+        assert(certificate.is_error)
+    for _ in range(2):
+        result = Result.get(raw, certificate_cache=cache, on_error=Result.ACTION_IGNORE)
+        assert(result.certificates == [])
+        assert(result.is_error)
+
+
+def test_light_certificates():
+    raw = '{"lts":45,"rt":67.073945,"msm_id":8844155,"from":"185.116.201.100","dst_name":"tinkoff.ru","af":4,"timestamp":1497464532,"fw":4780,"cert":["-----BEGIN CERTIFICATE-----\nMIIEsTCCA5mgAwIBAgIQV1CAInv97wvzUjqHD0BbyzANBgkqhkiG9w0BAQsFADBB\nMQswCQYDVQQGEwJVUzEVMBMGA1UEChMMdGhhd3RlLCBJbmMuMRswGQYDVQQDExJ0\naGF3dGUgU1NMIENBIC0gRzIwHhcNMTUxMDIwMDAwMDAwWhcNMTcxMjE4MjM1OTU5\nWjBqMQswCQYDVQQGEwJSVTEPMA0GA1UECBMGTW9zY293MQ8wDQYDVQQHFAZNb3Nj\nb3cxFTATBgNVBAoUDFRpbmtvZmYgQmFuazELMAkGA1UECxQCSVQxFTATBgNVBAMU\nDCoudGlua29mZi5ydTCCASIwDQYJKoZIhvcNAQEBBQADggEPADCCAQoCggEBAN4W\ncKDTHE470BZWvUBpgce4nMWH9lNa2KWCbrcFMUcqtMaFVh4tp53gKvlvaJyecQ9y\noQBrJycdp7Du8R7HFUwgALBMxjVsrSdai3wS6txCpXJCuT+92spwyuVOT3ZGjXip\n5EwVxXuXNMbi3+alSuX1ocM3m9FWas\/fvhreQZYxpx6CH0+eqpinbTOwYc\/7gvh0\nMJdl+ESN9j9FE87aCTC\/VMakxOIRHsyApG0XNegUj3Fs2HO0XrIxMSqSrCuZqs0q\nUXINGTIoVJVgU4fzuJad2jLrzePDkliKZDZ6JZaeSKQsGgB7mNbCFwCW1oUyepHn\nASHG7BrAiP6tBbiwLHMCAwEAAaOCAXowggF2MCMGA1UdEQQcMBqCDCoudGlua29m\nZi5ydYIKdGlua29mZi5ydTAJBgNVHRMEAjAAMG4GA1UdIARnMGUwYwYGZ4EMAQIC\nMFkwJgYIKwYBBQUHAgEWGmh0dHBzOi8vd3d3LnRoYXd0ZS5jb20vY3BzMC8GCCsG\nAQUFBwICMCMMIWh0dHBzOi8vd3d3LnRoYXd0ZS5jb20vcmVwb3NpdG9yeTAOBgNV\nHQ8BAf8EBAMCBaAwHwYDVR0jBBgwFoAUwk9IV\/zRT5rAXTh9DgXb2S61UmAwKwYD\nVR0fBCQwIjAgoB6gHIYaaHR0cDovL3RqLnN5bWNiLmNvbS90ai5jcmwwHQYDVR0l\nBBYwFAYIKwYBBQUHAwEGCCsGAQUFBwMCMFcGCCsGAQUFBwEBBEswSTAfBggrBgEF\nBQcwAYYTaHR0cDovL3RqLnN5bWNkLmNvbTAmBggrBgEFBQcwAoYaaHR0cDovL3Rq\nLnN5bWNiLmNvbS90ai5jcnQwDQYJKoZIhvcNAQELBQADggEBAK1I1sCTFQn86Bhu\n78+TPM\/DNjTP1LhFOfHIYlN4askbNur1KI5i52Sqpq539Q43LWQbWZzIx1YsCsfb\nLevVZPmVGxPMgdaqs70rhAp0B1zsWBZd0ImObPTNxNYlQQwmH5S4IWa\/cxKZ9qj0\n\/vm5Wkd6eTuAfSEzOAmzDWwnTnv+aI0j3CNL4iccICMDoS0RJqoYtIzH+PGY7S21\n7xNHUlADsHa\/AeBEX6\/Ru12GMGtfSkMeYamEcrjUc\/VdX\/tIOFAMQh3iiZtpPvEQ\not8o4U20tZ7bjsRKGw2uKNfZyv9hi6flNMRHk9eS2Hi0KpOU+r462ttY8JXxUetp\nDaymEBk=\n-----END CERTIFICATE-----","-----BEGIN CERTIFICATE-----\nMIIEsjCCA5qgAwIBAgIQFofWiG3iMAaFIz2\/Eb9llzANBgkqhkiG9w0BAQsFADCB\nqTELMAkGA1UEBhMCVVMxFTATBgNVBAoTDHRoYXd0ZSwgSW5jLjEoMCYGA1UECxMf\nQ2VydGlmaWNhdGlvbiBTZXJ2aWNlcyBEaXZpc2lvbjE4MDYGA1UECxMvKGMpIDIw\nMDYgdGhhd3RlLCBJbmMuIC0gRm9yIGF1dGhvcml6ZWQgdXNlIG9ubHkxHzAdBgNV\nBAMTFnRoYXd0ZSBQcmltYXJ5IFJvb3QgQ0EwHhcNMTMxMDMxMDAwMDAwWhcNMjMx\nMDMwMjM1OTU5WjBBMQswCQYDVQQGEwJVUzEVMBMGA1UEChMMdGhhd3RlLCBJbmMu\nMRswGQYDVQQDExJ0aGF3dGUgU1NMIENBIC0gRzIwggEiMA0GCSqGSIb3DQEBAQUA\nA4IBDwAwggEKAoIBAQCy\/Ab7BJPS6lkgO0SFl1I55xDweuCwlEDaRvgMKLu5zmA4\nP9LYEUIbka1J7o\/H3mzeN2\/9iyA8bed009zVJIhBgInuNr7E1b6NUxOq5KW4kwq+\n7NrNPNQyVu\/QTqC4l7s5UB5uZcP9ss7gWalICcb+vq78PjuBIJeLj0bfYGQHdbsb\nhjifR3s0zqHRl6122J+3Jtt5gDZI8sU3+NkyrnykU4HHmaFUOC9PdaC7WqW7zawC\nWxkC1RMYp86sdFUSBYubopVGZHI4zVobOhanvnGZjFQDuJZsAdM+Bpg\/IYE7An4A\nR1MBHg5GQ\/tLLdwLGugvmPh+0ZmrE2ykF95v9hX1AgMBAAGjggE7MIIBNzASBgNV\nHRMBAf8ECDAGAQH\/AgEAMA4GA1UdDwEB\/wQEAwIBBjAyBgNVHR8EKzApMCegJaAj\nhiFodHRwOi8vdDEuc3ltY2IuY29tL1RoYXd0ZVBDQS5jcmwwLwYIKwYBBQUHAQEE\nIzAhMB8GCCsGAQUFBzABhhNodHRwOi8vdDIuc3ltY2IuY29tMEEGA1UdIAQ6MDgw\nNgYKYIZIAYb4RQEHNjAoMCYGCCsGAQUFBwIBFhpodHRwczovL3d3dy50aGF3dGUu\nY29tL2NwczApBgNVHREEIjAgpB4wHDEaMBgGA1UEAxMRU3ltYW50ZWNQS0ktMS01\nMzcwHQYDVR0OBBYEFMJPSFf80U+awF04fQ4F29kutVJgMB8GA1UdIwQYMBaAFHtb\nRc+vzst6\/TGSGmq280brV0hQMA0GCSqGSIb3DQEBCwUAA4IBAQCNBt5DyXYCytkj\nl17zY9d9RMIPawr1B+WLuPrgo\/prgJK1AyzFN+DC5ZW1knAYKEKU7kt3agEPiyPs\nVk30AGnlhMji6t5bPvY8BzqUymwnscyDGmBxJ9K\/AvUeRNNI1abTdiEAnPqYZOsX\nNj\/rGzw+prHZWAYOctlovvGnINdS5KR3H3FwnVU1hTfhHU2UwnB\/lUBuS32ytCkq\nA3nIuUxnYQSgiyf\/WQDrVX\/GtzM1LV5OrLjqEsXo97mrvnSSLLfZTcqELxzC8HJ8\nsjFuz4DliAc2UXu6Ya9tjSNbNKOVvKIxf\/L157fo78S1JzLp955pxyvovrsMqufq\nYBLqJop4\n-----END CERTIFICATE-----","-----BEGIN CERTIFICATE-----\nMIIEIDCCAwigAwIBAgIQNE7VVyDV7exJ9C\/ON9srbTANBgkqhkiG9w0BAQUFADCB\nqTELMAkGA1UEBhMCVVMxFTATBgNVBAoTDHRoYXd0ZSwgSW5jLjEoMCYGA1UECxMf\nQ2VydGlmaWNhdGlvbiBTZXJ2aWNlcyBEaXZpc2lvbjE4MDYGA1UECxMvKGMpIDIw\nMDYgdGhhd3RlLCBJbmMuIC0gRm9yIGF1dGhvcml6ZWQgdXNlIG9ubHkxHzAdBgNV\nBAMTFnRoYXd0ZSBQcmltYXJ5IFJvb3QgQ0EwHhcNMDYxMTE3MDAwMDAwWhcNMzYw\nNzE2MjM1OTU5WjCBqTELMAkGA1UEBhMCVVMxFTATBgNVBAoTDHRoYXd0ZSwgSW5j\nLjEoMCYGA1UECxMfQ2VydGlmaWNhdGlvbiBTZXJ2aWNlcyBEaXZpc2lvbjE4MDYG\nA1UECxMvKGMpIDIwMDYgdGhhd3RlLCBJbmMuIC0gRm9yIGF1dGhvcml6ZWQgdXNl\nIG9ubHkxHzAdBgNVBAMTFnRoYXd0ZSBQcmltYXJ5IFJvb3QgQ0EwggEiMA0GCSqG\nSIb3DQEBAQUAA4IBDwAwggEKAoIBAQCsoPD7gFnUnMekz52hWXMJEEUMDSxuaPFs\nW0hoSVk3\/AszGcJ3f8wQLZU0HObrTQmnHNK4yZc2AreJ1CRfBsDMRJSUjQJib+ta\n3RGNKJpchJAQeg29dGYvajig4tVUROsdB58Hum\/u6f1OCyn1PoSgAfGcq\/gcfomk\n6KHYcWUNo1F77rzSImANuVud37r8UVsLr5iy6S7pBOhih94ryNdOwUxkHt3Ph1i6\nSk\/KaAcdHJ1KxtUvkcx8cXIcxcBn6zL9yZJclNqFwJu\/U30rCfSMnZEfl2pSy94J\nNqR32HuHUETVPm4pafs5SSYeCaWAe0At6+gnhcn+Yf1+5nyXHdWdAgMBAAGjQjBA\nMA8GA1UdEwEB\/wQFMAMBAf8wDgYDVR0PAQH\/BAQDAgEGMB0GA1UdDgQWBBR7W0XP\nr87Lev0xkhpqtvNG61dIUDANBgkqhkiG9w0BAQUFAAOCAQEAeRHAS7ORtvzw6WfU\nDW5FvlXok9LOAz\/t2iWwHVfLHjp2oEzsUHboZHIMpKnxuIvW1oeEuzLlQRHAd9mz\nYJ3rG9XRbkREqaYB7FViHXe4XI5ISXycO1cRrK1zN44veFyQaEfZYGDm\/Ac9IiAX\nxPcW6cTYcvnIc3zfFi8VqT79aie2oetaupgf1eNNZAqdE8hhuvU5HIe6uL17In\/2\n\/qxAeeWsEG89jxt5dovEN7MhGITlNgDrYyCZuen+MwS7QcjBAvlEYyCegc5C09Y\/\nLHbTY5xZ3Y+m4Q6gLkH3LpVHz7z9M\/P2C2F+fpErgUfCJzDupxBdN49cOSvkBPB7\njVaMaA==\n-----END CERTIFICATE-----"],"method":"TLS","prb_id":10096,"dst_port":"443","dst_addr":"178.248.236.31","ttc":33.09869,"src_addr":"185.116.201.100","group_id":8844155,"type":"sslcert","msm_name":"SSLCert","ver":"1.2"}'
+    expected = Result.get(raw)
+    for result in (Result.get(raw, light=True), Result.get(raw, light=True, lazy=True)):
+        for certificate, other in zip(result.certificates, expected.certificates):
+            for name in Certificate.DER_FIELDS + tuple(Certificate.CHECKSUMS):
+                assert(getattr(certificate, name) == getattr(other, name))
+            assert("extensions" not in certificate._fields)
+            assert(certificate.has_expired == other.has_expired)
+        assert(result.to_dict() == expected.to_dict())
+
+
+def test_light_certificates_without_cryptography():
+    raw = '{"lts":45,"rt":67.073945,"msm_id":8844155,"from":"185.116.201.100","dst_name":"tinkoff.ru","af":4,"timestamp":1497464532,"fw":4780,"cert":["-----BEGIN CERTIFICATE-----\nMIIEsTCCA5mgAwIBAgIQV1CAInv97wvzUjqHD0BbyzANBgkqhkiG9w0BAQsFADBB\nMQswCQYDVQQGEwJVUzEVMBMGA1UEChMMdGhhd3RlLCBJbmMuMRswGQYDVQQDExJ0\naGF3dGUgU1NMIENBIC0gRzIwHhcNMTUxMDIwMDAwMDAwWhcNMTcxMjE4MjM1OTU5\nWjBqMQswCQYDVQQGEwJSVTEPMA0GA1UECBMGTW9zY293MQ8wDQYDVQQHFAZNb3Nj\nb3cxFTATBgNVBAoUDFRpbmtvZmYgQmFuazELMAkGA1UECxQCSVQxFTATBgNVBAMU\nDCoudGlua29mZi5ydTCCASIwDQYJKoZIhvcNAQEBBQADggEPADCCAQoCggEBAN4W\ncKDTHE470BZWvUBpgce4nMWH9lNa2KWCbrcFMUcqtMaFVh4tp53gKvlvaJyecQ9y\noQBrJycdp7Du8R7HFUwgALBMxjVsrSdai3wS6txCpXJCuT+92spwyuVOT3ZGjXip\n5EwVxXuXNMbi3+alSuX1ocM3m9FWas\/fvhreQZYxpx6CH0+eqpinbTOwYc\/7gvh0\nMJdl+ESN9j9FE87aCTC\/VMakxOIRHsyApG0XNegUj3Fs2HO0XrIxMSqSrCuZqs0q\nUXINGTIoVJVgU4fzuJad2jLrzePDkliKZDZ6JZaeSKQsGgB7mNbCFwCW1oUyepHn\nASHG7BrAiP6tBbiwLHMCAwEAAaOCAXowggF2MCMGA1UdEQQcMBqCDCoudGlua29m\nZi5ydYIKdGlua29mZi5ydTAJBgNVHRMEAjAAMG4GA1UdIARnMGUwYwYGZ4EMAQIC\nMFkwJgYIKwYBBQUHAgEWGmh0dHBzOi8vd3d3LnRoYXd0ZS5jb20vY3BzMC8GCCsG\nAQUFBwICMCMMIWh0dHBzOi8vd3d3LnRoYXd0ZS5jb20vcmVwb3NpdG9yeTAOBgNV\nHQ8BAf8EBAMCBaAwHwYDVR0jBBgwFoAUwk9IV\/zRT5rAXTh9DgXb2S61UmAwKwYD\nVR0fBCQwIjAgoB6gHIYaaHR0cDovL3RqLnN5bWNiLmNvbS90ai5jcmwwHQYDVR0l\nBBYwFAYIKwYBBQUHAwEGCCsGAQUFBwMCMFcGCCsGAQUFBwEBBEswSTAfBggrBgEF\nBQcwAYYTaHR0cDovL3RqLnN5bWNkLmNvbTAmBggrBgEFBQcwAoYaaHR0cDovL3Rq\nLnN5bWNiLmNvbS90ai5jcnQwDQYJKoZIhvcNAQELBQADggEBAK1I1sCTFQn86Bhu\n78+TPM\/DNjTP1LhFOfHIYlN4askbNur1KI5i52Sqpq539Q43LWQbWZzIx1YsCsfb\nLevVZPmVGxPMgdaqs70rhAp0B1zsWBZd0ImObPTNxNYlQQwmH5S4IWa\/cxKZ9qj0\n\/vm5Wkd6eTuAfSEzOAmzDWwnTnv+aI0j3CNL4iccICMDoS0RJqoYtIzH+PGY7S21\n7xNHUlADsHa\/AeBEX6\/Ru12GMGtfSkMeYamEcrjUc\/VdX\/tIOFAMQh3iiZtpPvEQ\not8o4U20tZ7bjsRKGw2uKNfZyv9hi6flNMRHk9eS2Hi0KpOU+r462ttY8JXxUetp\nDaymEBk=\n-----END CERTIFICATE-----","-----BEGIN CERTIFICATE-----\nMIIEsjCCA5qgAwIBAgIQFofWiG3iMAaFIz2\/Eb9llzANBgkqhkiG9w0BAQsFADCB\nqTELMAkGA1UEBhMCVVMxFTATBgNVBAoTDHRoYXd0ZSwgSW5jLjEoMCYGA1UECxMf\nQ2VydGlmaWNhdGlvbiBTZXJ2aWNlcyBEaXZpc2lvbjE4MDYGA1UECxMvKGMpIDIw\nMDYgdGhhd3RlLCBJbmMuIC0gRm9yIGF1dGhvcml6ZWQgdXNlIG9ubHkxHzAdBgNV\nBAMTFnRoYXd0ZSBQcmltYXJ5IFJvb3QgQ0EwHhcNMTMxMDMxMDAwMDAwWhcNMjMx\nMDMwMjM1OTU5WjBBMQswCQYDVQQGEwJVUzEVMBMGA1UEChMMdGhhd3RlLCBJbmMu\nMRswGQYDVQQDExJ0aGF3dGUgU1NMIENBIC0gRzIwggEiMA0GCSqGSIb3DQEBAQUA\nA4IBDwAwggEKAoIBAQCy\/Ab7BJPS6lkgO0SFl1I55xDweuCwlEDaRvgMKLu5zmA4\nP9LYEUIbka1J7o\/H3mzeN2\/9iyA8bed009zVJIhBgInuNr7E1b6NUxOq5KW4kwq+\n7NrNPNQyVu\/QTqC4l7s5UB5uZcP9ss7gWalICcb+vq78PjuBIJeLj0bfYGQHdbsb\nhjifR3s0zqHRl6122J+3Jtt5gDZI8sU3+NkyrnykU4HHmaFUOC9PdaC7WqW7zawC\nWxkC1RMYp86sdFUSBYubopVGZHI4zVobOhanvnGZjFQDuJZsAdM+Bpg\/IYE7An4A\nR1MBHg5GQ\/tLLdwLGugvmPh+0ZmrE2ykF95v9hX1AgMBAAGjggE7MIIBNzASBgNV\nHRMBAf8ECDAGAQH\/AgEAMA4GA1UdDwEB\/wQEAwIBBjAyBgNVHR8EKzApMCegJaAj\nhiFodHRwOi8vdDEuc3ltY2IuY29tL1RoYXd0ZVBDQS5jcmwwLwYIKwYBBQUHAQEE\nIzAhMB8GCCsGAQUFBzABhhNodHRwOi8vdDIuc3ltY2IuY29tMEEGA1UdIAQ6MDgw\nNgYKYIZIAYb4RQEHNjAoMCYGCCsGAQUFBwIBFhpodHRwczovL3d3dy50aGF3dGUu\nY29tL2NwczApBgNVHREEIjAgpB4wHDEaMBgGA1UEAxMRU3ltYW50ZWNQS0ktMS01\nMzcwHQYDVR0OBBYEFMJPSFf80U+awF04fQ4F29kutVJgMB8GA1UdIwQYMBaAFHtb\nRc+vzst6\/TGSGmq280brV0hQMA0GCSqGSIb3DQEBCwUAA4IBAQCNBt5DyXYCytkj\nl17zY9d9RMIPawr1B+WLuPrgo\/prgJK1AyzFN+DC5ZW1knAYKEKU7kt3agEPiyPs\nVk30AGnlhMji6t5bPvY8BzqUymwnscyDGmBxJ9K\/AvUeRNNI1abTdiEAnPqYZOsX\nNj\/rGzw+prHZWAYOctlovvGnINdS5KR3H3FwnVU1hTfhHU2UwnB\/lUBuS32ytCkq\nA3nIuUxnYQSgiyf\/WQDrVX\/GtzM1LV5OrLjqEsXo97mrvnSSLLfZTcqELxzC8HJ8\nsjFuz4DliAc2UXu6Ya9tjSNbNKOVvKIxf\/L157fo78S1JzLp955pxyvovrsMqufq\nYBLqJop4\n-----END CERTIFICATE-----","-----BEGIN CERTIFICATE-----\nMIIEIDCCAwigAwIBAgIQNE7VVyDV7exJ9C\/ON9srbTANBgkqhkiG9w0BAQUFADCB\nqTELMAkGA1UEBhMCVVMxFTATBgNVBAoTDHRoYXd0ZSwgSW5jLjEoMCYGA1UECxMf\nQ2VydGlmaWNhdGlvbiBTZXJ2aWNlcyBEaXZpc2lvbjE4MDYGA1UECxMvKGMpIDIw\nMDYgdGhhd3RlLCBJbmMuIC0gRm9yIGF1dGhvcml6ZWQgdXNlIG9ubHkxHzAdBgNV\nBAMTFnRoYXd0ZSBQcmltYXJ5IFJvb3QgQ0EwHhcNMDYxMTE3MDAwMDAwWhcNMzYw\nNzE2MjM1OTU5WjCBqTELMAkGA1UEBhMCVVMxFTATBgNVBAoTDHRoYXd0ZSwgSW5j\nLjEoMCYGA1UECxMfQ2VydGlmaWNhdGlvbiBTZXJ2aWNlcyBEaXZpc2lvbjE4MDYG\nA1UECxMvKGMpIDIwMDYgdGhhd3RlLCBJbmMuIC0gRm9yIGF1dGhvcml6ZWQgdXNl\nIG9ubHkxHzAdBgNVBAMTFnRoYXd0ZSBQcmltYXJ5IFJvb3QgQ0EwggEiMA0GCSqG\nSIb3DQEBAQUAA4IBDwAwggEKAoIBAQCsoPD7gFnUnMekz52hWXMJEEUMDSxuaPFs\nW0hoSVk3\/AszGcJ3f8wQLZU0HObrTQmnHNK4yZc2AreJ1CRfBsDMRJSUjQJib+ta\n3RGNKJpchJAQeg29dGYvajig4tVUROsdB58Hum\/u6f1OCyn1PoSgAfGcq\/gcfomk\n6KHYcWUNo1F77rzSImANuVud37r8UVsLr5iy6S7pBOhih94ryNdOwUxkHt3Ph1i6\nSk\/KaAcdHJ1KxtUvkcx8cXIcxcBn6zL9yZJclNqFwJu\/U30rCfSMnZEfl2pSy94J\nNqR32HuHUETVPm4pafs5SSYeCaWAe0At6+gnhcn+Yf1+5nyXHdWdAgMBAAGjQjBA\nMA8GA1UdEwEB\/wQFMAMBAf8wDgYDVR0PAQH\/BAQDAgEGMB0GA1UdDgQWBBR7W0XP\nr87Lev0xkhpqtvNG61dIUDANBgkqhkiG9w0BAQUFAAOCAQEAeRHAS7ORtvzw6WfU\nDW5FvlXok9LOAz\/t2iWwHVfLHjp2oEzsUHboZHIMpKnxuIvW1oeEuzLlQRHAd9mz\nYJ3rG9XRbkREqaYB7FViHXe4XI5ISXycO1cRrK1zN44veFyQaEfZYGDm\/Ac9IiAX\nxPcW6cTYcvnIc3zfFi8VqT79aie2oetaupgf1eNNZAqdE8hhuvU5HIe6uL17In\/2\n\/qxAeeWsEG89jxt5dovEN7MhGITlNgDrYyCZuen+MwS7QcjBAvlEYyCegc5C09Y\/\nLHbTY5xZ3Y+m4Q6gLkH3LpVHz7z9M\/P2C2F+fpErgUfCJzDupxBdN49cOSvkBPB7\njVaMaA==\n-----END CERTIFICATE-----"],"method":"TLS","prb_id":10096,"dst_port":"443","dst_addr":"178.248.236.31","ttc":33.09869,"src_addr":"185.116.201.100","group_id":8844155,"type":"sslcert","msm_name":"SSLCert","ver":"1.2"}'
+    # In an interpreter of its own, where cryptography can't be imported
+    script = "; ".join((
+        "import sys",
+        "sys.modules['cryptography'] = None",
+        "from ripe.atlas.sagan import Result",
+        "result = Result.get(sys.stdin.read(), light=True, lazy=True, on_error=Result.ACTION_IGNORE)",
+        "certificate = result.certificates[0]",
+        "print(certificate.subject_cn, result.is_error, certificate.is_error)",
+        "certificate.extensions",
+        "print(certificate.is_error, certificate.error_message)",
+    ))
+    output = subprocess.run(
+        [sys.executable, "-c", script], input=raw, capture_output=True,
+        text=True, check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    ).stdout.splitlines()
+    assert(output[0] == "*.tinkoff.ru False False")
+    assert(output[1].startswith("True The cryptography module is needed"))
+
+
+def test_der_times():
+    assert(der.parse_time(b"\x17\x0d491231235959Z", 0) == datetime(2049, 12, 31, 23, 59, 59))
+    assert(der.parse_time(b"\x17\x0d500101000000Z", 0) == datetime(1950, 1, 1))
+    assert(der.parse_time(b"\x18\x0f20500101000000Z", 0) == datetime(2050, 1, 1))
+
+
+def test_reference_time():
+    raw = '{"lts":45,"rt":67.073945,"msm_id":8844155,"from":"185.116.201.100","dst_name":"tinkoff.ru","af":4,"timestamp":1497464532,"fw":4780,"cert":["-----BEGIN CERTIFICATE-----\nMIIEsTCCA5mgAwIBAgIQV1CAInv97wvzUjqHD0BbyzANBgkqhkiG9w0BAQsFADBB\nMQswCQYDVQQGEwJVUzEVMBMGA1UEChMMdGhhd3RlLCBJbmMuMRswGQYDVQQDExJ0\naGF3dGUgU1NMIENBIC0gRzIwHhcNMTUxMDIwMDAwMDAwWhcNMTcxMjE4MjM1OTU5\nWjBqMQswCQYDVQQGEwJSVTEPMA0GA1UECBMGTW9zY293MQ8wDQYDVQQHFAZNb3Nj\nb3cxFTATBgNVBAoUDFRpbmtvZmYgQmFuazELMAkGA1UECxQCSVQxFTATBgNVBAMU\nDCoudGlua29mZi5ydTCCASIwDQYJKoZIhvcNAQEBBQADggEPADCCAQoCggEBAN4W\ncKDTHE470BZWvUBpgce4nMWH9lNa2KWCbrcFMUcqtMaFVh4tp53gKvlvaJyecQ9y\noQBrJycdp7Du8R7HFUwgALBMxjVsrSdai3wS6txCpXJCuT+92spwyuVOT3ZGjXip\n5EwVxXuXNMbi3+alSuX1ocM3m9FWas\/fvhreQZYxpx6CH0+eqpinbTOwYc\/7gvh0\nMJdl+ESN9j9FE87aCTC\/VMakxOIRHsyApG0XNegUj3Fs2HO0XrIxMSqSrCuZqs0q\nUXINGTIoVJVgU4fzuJad2jLrzePDkliKZDZ6JZaeSKQsGgB7mNbCFwCW1oUyepHn\nASHG7BrAiP6tBbiwLHMCAwEAAaOCAXowggF2MCMGA1UdEQQcMBqCDCoudGlua29m\nZi5ydYIKdGlua29mZi5ydTAJBgNVHRMEAjAAMG4GA1UdIARnMGUwYwYGZ4EMAQIC\nMFkwJgYIKwYBBQUHAgEWGmh0dHBzOi8vd3d3LnRoYXd0ZS5jb20vY3BzMC8GCCsG\nAQUFBwICMCMMIWh0dHBzOi8vd3d3LnRoYXd0ZS5jb20vcmVwb3NpdG9yeTAOBgNV\nHQ8BAf8EBAMCBaAwHwYDVR0jBBgwFoAUwk9IV\/zRT5rAXTh9DgXb2S61UmAwKwYD\nVR0fBCQwIjAgoB6gHIYaaHR0cDovL3RqLnN5bWNiLmNvbS90ai5jcmwwHQYDVR0l\nBBYwFAYIKwYBBQUHAwEGCCsGAQUFBwMCMFcGCCsGAQUFBwEBBEswSTAfBggrBgEF\nBQcwAYYTaHR0cDovL3RqLnN5bWNkLmNvbTAmBggrBgEFBQcwAoYaaHR0cDovL3Rq\nLnN5bWNiLmNvbS90ai5jcnQwDQYJKoZIhvcNAQELBQADggEBAK1I1sCTFQn86Bhu\n78+TPM\/DNjTP1LhFOfHIYlN4askbNur1KI5i52Sqpq539Q43LWQbWZzIx1YsCsfb\nLevVZPmVGxPMgdaqs70rhAp0B1zsWBZd0ImObPTNxNYlQQwmH5S4IWa\/cxKZ9qj0\n\/vm5Wkd6eTuAfSEzOAmzDWwnTnv+aI0j3CNL4iccICMDoS0RJqoYtIzH+PGY7S21\n7xNHUlADsHa\/AeBEX6\/Ru12GMGtfSkMeYamEcrjUc\/VdX\/tIOFAMQh3iiZtpPvEQ\not8o4U20tZ7bjsRKGw2uKNfZyv9hi6flNMRHk9eS2Hi0KpOU+r462ttY8JXxUetp\nDaymEBk=\n-----END CERTIFICATE-----","-----BEGIN CERTIFICATE-----\nMIIEsjCCA5qgAwIBAgIQFofWiG3iMAaFIz2\/Eb9llzANBgkqhkiG9w0BAQsFADCB\nqTELMAkGA1UEBhMCVVMxFTATBgNVBAoTDHRoYXd0ZSwgSW5jLjEoMCYGA1UECxMf\nQ2VydGlmaWNhdGlvbiBTZXJ2aWNlcyBEaXZpc2lvbjE4MDYGA1UECxMvKGMpIDIw\nMDYgdGhhd3RlLCBJbmMuIC0gRm9yIGF1dGhvcml6ZWQgdXNlIG9ubHkxHzAdBgNV\nBAMTFnRoYXd0ZSBQcmltYXJ5IFJvb3QgQ0EwHhcNMTMxMDMxMDAwMDAwWhcNMjMx\nMDMwMjM1OTU5WjBBMQswCQYDVQQGEwJVUzEVMBMGA1UEChMMdGhhd3RlLCBJbmMu\nMRswGQYDVQQDExJ0aGF3dGUgU1NMIENBIC0gRzIwggEiMA0GCSqGSIb3DQEBAQUA\nA4IBDwAwggEKAoIBAQCy\/Ab7BJPS6lkgO0SFl1I55xDweuCwlEDaRvgMKLu5zmA4\nP9LYEUIbka1J7o\/H3mzeN2\/9iyA8bed009zVJIhBgInuNr7E1b6NUxOq5KW4kwq+\n7NrNPNQyVu\/QTqC4l7s5UB5uZcP9ss7gWalICcb+vq78PjuBIJeLj0bfYGQHdbsb\nhjifR3s0zqHRl6122J+3Jtt5gDZI8sU3+NkyrnykU4HHmaFUOC9PdaC7WqW7zawC\nWxkC1RMYp86sdFUSBYubopVGZHI4zVobOhanvnGZjFQDuJZsAdM+Bpg\/IYE7An4A\nR1MBHg5GQ\/tLLdwLGugvmPh+0ZmrE2ykF95v9hX1AgMBAAGjggE7MIIBNzASBgNV\nHRMBAf8ECDAGAQH\/AgEAMA4GA1UdDwEB\/wQEAwIBBjAyBgNVHR8EKzApMCegJaAj\nhiFodHRwOi8vdDEuc3ltY2IuY29tL1RoYXd0ZVBDQS5jcmwwLwYIKwYBBQUHAQEE\nIzAhMB8GCCsGAQUFBzABhhNodHRwOi8vdDIuc3ltY2IuY29tMEEGA1UdIAQ6MDgw\nNgYKYIZIAYb4RQEHNjAoMCYGCCsGAQUFBwIBFhpodHRwczovL3d3dy50aGF3dGUu\nY29tL2NwczApBgNVHREEIjAgpB4wHDEaMBgGA1UEAxMRU3ltYW50ZWNQS0ktMS01\nMzcwHQYDVR0OBBYEFMJPSFf80U+awF04fQ4F29kutVJgMB8GA1UdIwQYMBaAFHtb\nRc+vzst6\/TGSGmq280brV0hQMA0GCSqGSIb3DQEBCwUAA4IBAQCNBt5DyXYCytkj\nl17zY9d9RMIPawr1B+WLuPrgo\/prgJK1AyzFN+DC5ZW1knAYKEKU7kt3agEPiyPs\nVk30AGnlhMji6t5bPvY8BzqUymwnscyDGmBxJ9K\/AvUeRNNI1abTdiEAnPqYZOsX\nNj\/rGzw+prHZWAYOctlovvGnINdS5KR3H3FwnVU1hTfhHU2UwnB\/lUBuS32ytCkq\nA3nIuUxnYQSgiyf\/WQDrVX\/GtzM1LV5OrLjqEsXo97mrvnSSLLfZTcqELxzC8HJ8\nsjFuz4DliAc2UXu6Ya9tjSNbNKOVvKIxf\/L157fo78S1JzLp955pxyvovrsMqufq\nYBLqJop4\n-----END CERTIFICATE-----","-----BEGIN CERTIFICATE-----\nMIIEIDCCAwigAwIBAgIQNE7VVyDV7exJ9C\/ON9srbTANBgkqhkiG9w0BAQUFADCB\nqTELMAkGA1UEBhMCVVMxFTATBgNVBAoTDHRoYXd0ZSwgSW5jLjEoMCYGA1UECxMf\nQ2VydGlmaWNhdGlvbiBTZXJ2aWNlcyBEaXZpc2lvbjE4MDYGA1UECxMvKGMpIDIw\nMDYgdGhhd3RlLCBJbmMuIC0gRm9yIGF1dGhvcml6ZWQgdXNlIG9ubHkxHzAdBgNV\nBAMTFnRoYXd0ZSBQcmltYXJ5IFJvb3QgQ0EwHhcNMDYxMTE3MDAwMDAwWhcNMzYw\nNzE2MjM1OTU5WjCBqTELMAkGA1UEBhMCVVMxFTATBgNVBAoTDHRoYXd0ZSwgSW5j\nLjEoMCYGA1UECxMfQ2VydGlmaWNhdGlvbiBTZXJ2aWNlcyBEaXZpc2lvbjE4MDYG\nA1UECxMvKGMpIDIwMDYgdGhhd3RlLCBJbmMuIC0gRm9yIGF1dGhvcml6ZWQgdXNl\nIG9ubHkxHzAdBgNVBAMTFnRoYXd0ZSBQcmltYXJ5IFJvb3QgQ0EwggEiMA0GCSqG\nSIb3DQEBAQUAA4IBDwAwggEKAoIBAQCsoPD7gFnUnMekz52hWXMJEEUMDSxuaPFs\nW0hoSVk3\/AszGcJ3f8wQLZU0HObrTQmnHNK4yZc2AreJ1CRfBsDMRJSUjQJib+ta\n3RGNKJpchJAQeg29dGYvajig4tVUROsdB58Hum\/u6f1OCyn1PoSgAfGcq\/gcfomk\n6KHYcWUNo1F77rzSImANuVud37r8UVsLr5iy6S7pBOhih94ryNdOwUxkHt3Ph1i6\nSk\/KaAcdHJ1KxtUvkcx8cXIcxcBn6zL9yZJclNqFwJu\/U30rCfSMnZEfl2pSy94J\nNqR32HuHUETVPm4pafs5SSYeCaWAe0At6+gnhcn+Yf1+5nyXHdWdAgMBAAGjQjBA\nMA8GA1UdEwEB\/wQFMAMBAf8wDgYDVR0PAQH\/BAQDAgEGMB0GA1UdDgQWBBR7W0XP\nr87Lev0xkhpqtvNG61dIUDANBgkqhkiG9w0BAQUFAAOCAQEAeRHAS7ORtvzw6WfU\nDW5FvlXok9LOAz\/t2iWwHVfLHjp2oEzsUHboZHIMpKnxuIvW1oeEuzLlQRHAd9mz\nYJ3rG9XRbkREqaYB7FViHXe4XI5ISXycO1cRrK1zN44veFyQaEfZYGDm\/Ac9IiAX\nxPcW6cTYcvnIc3zfFi8VqT79aie2oetaupgf1eNNZAqdE8hhuvU5HIe6uL17In\/2\n\/qxAeeWsEG89jxt5dovEN7MhGITlNgDrYyCZuen+MwS7QcjBAvlEYyCegc5C09Y\/\nLHbTY5xZ3Y+m4Q6gLkH3LpVHz7z9M\/P2C2F+fpErgUfCJzDupxBdN49cOSvkBPB7\njVaMaA==\n-----END CERTIFICATE-----"],"method":"TLS","prb_id":10096,"dst_port":"443","dst_addr":"178.248.236.31","ttc":33.09869,"src_addr":"185.116.201.100","group_id":8844155,"type":"sslcert","msm_name":"SSLCert","ver":"1.2"}'
+    now = [c.has_expired for c in Result.get(raw).certificates]
+    assert(now == [False, False, True])
+
+    # All three were valid when the measurement was made, in 2017
+    for reference_time in ("created", 1497464532, datetime(2017, 6, 14, 18, 22, 12)):
+        result = Result.get(raw, reference_time=reference_time, lazy=True)
+        assert(result.certificates[0]._expired is None)
+        assert([c.has_expired for c in result.certificates] == [True, True, True])
+
+    results = [Result.get(raw), Result.get(raw, light=True)]
+    SslResult.check_expiry(results, reference_time=datetime(2020, 1, 1))
+    for result in results:
+        assert([c.has_expired for c in result.certificates] == [False, True, True])
+    SslResult.check_expiry(results, reference_time="created")
+    for result in results:
+        assert([c.has_expired for c in result.certificates] == [True, True, True])
+    SslResult.check_expiry(results)
+    for result in results:
+        assert([c.has_expired for c in result.certificates] == now)
+
+
+def test_chain_change_detector():
+
+    def result(probe, *certificates):
+        return {"fw": 4790, "msm_id": 1, "prb_id": probe, "timestamp": 1500000000, "type": "sslcert", "dst_name": "example.com", "dst_port": "443", "cert": list(certificates)}
+
+    first = "-----BEGIN CERTIFICATE-----\nAAAA\n-----END CERTIFICATE-----"
+    second = "-----BEGIN CERTIFICATE-----\nBBBB\n-----END CERTIFICATE-----"
+    detector = ChainChangeDetector()
+    changes = list(detector.iter_changes([
+        result(1, first),
+        result(2, first, second),
+        result(1, first.replace("\n", "\r\n")),
+        json.dumps(result(2, first, second)),
+        {"fw": 4790, "msm_id": 1, "prb_id": 1, "timestamp": 1500000000, "type": "ping"},
+        result(1),
+        result(1, second),
+        result(1, first),
+    ]))
+    assert(len(detector) == 2)
+    assert((1, "example.com", "443") in detector)
+    assert([change.key[0] for change in changes] == [1, 1])
+    assert(changes[0].current == changes[1].previous)
+    assert(changes[0].previous == changes[1].current)
+    assert(changes[1].data["cert"] == [first])
+
+    detector = ChainChangeDetector(key=lambda data: data["prb_id"], report_new=True)
+    changes = list(detector.iter_changes([result(1, first), result(1, first)]))
+    assert([(change.key, change.previous) for change in changes] == [(1, None)])
+
+    # Chains that can't be PEM strings are skipped, not the end of the stream
+    detector = ChainChangeDetector()
+    changes = list(detector.iter_changes([
+        result(1, first),
+        result(1, {"pem": first}),
+        result(1, None, first),
+        result(1, first.replace("AAAA", "\u00c4AAA")),
+        result(1, second),
+    ]))
+    assert(len(detector) == 1)
+    assert([change.data["cert"] for change in changes] == [[second]])
@@ -432,3 +432,80 @@ def test_missing_dst_addr():
     result = Result.get({"af": 4, "dst_name": "syndication.exoclick.com", "endtime": 1446563590, "from": "89.216.30.6", "fw": 4720, "group_id": 2906346, "lts": 80, "msm_id": 2906346, "msm_name": "Traceroute", "paris_id": 0, "prb_id": 22586, "proto": "ICMP", "result": [{"error": "name resolution failed: non-recoverable failure in name resolution (1)"}], "size": 48, "timestamp": 1446563590, "type": "traceroute"})
     assert(result.destination_address is None)
     assert(result.is_success is False)
+
+
+def test_drop_raw_data():
+    result = Result.get('{"af":4,"dst_addr":"121.244.76.25","dst_name":"121.244.76.25","endtime":1340329208,"from":"107.3.81.49","fw":4460,"msm_id":1000157,"paris_id":2,"prb_id":190,"proto":"UDP","result":[{"hop":1,"result":[{"from":"192.168.1.1","rtt":2.7829999999999999,"size":96,"ttl":64},{"from":"192.168.1.1","rtt":2.4500000000000002,"size":96,"ttl":64},{"from":"192.168.1.1","rtt":2.3210000000000002,"size":96,"ttl":64}]},{"hop":2,"result":[{"x":"*"},{"x":"*"},{"x":"*"}]},{"hop":3,"result":[{"x":"*"},{"x":"*"},{"x":"*"}]},{"hop":4,"result":[{"x":"*"},{"x":"*"},{"x":"*"}]},{"hop":5,"result":[{"x":"*"},{"x":"*"},{"x":"*"}]},{"hop":6,"result":[{"x":"*"},{"x":"*"},{"x":"*"}]},{"hop":255,"result":[{"x":"*"},{"x":"*"},{"x":"*"}]}],"size":40,"src_addr":"192.168.1.107","timestamp":1340329190,"type":"traceroute"}', keep_raw_data=False)
+    assert(result.raw_data is None)
+    assert(result.hops[0].raw_data is None)
+    assert(result.hops[0].packets[0].raw_data is None)
+    assert(not hasattr(result.hops[0], "__dict__"))
+    assert(not hasattr(result.hops[0].packets[0], "__dict__"))
+    assert(result.total_hops == 7)
+    assert(result.hops[0].packets[0].origin == "192.168.1.1")
+
+
+def test_keys_skip_deprecated_properties():
+    result = Result.get('{"af":4,"dst_addr":"121.244.76.25","dst_name":"121.244.76.25","endtime":1340329208,"from":"107.3.81.49","fw":4460,"msm_id":1000157,"paris_id":2,"prb_id":190,"proto":"UDP","result":[{"hop":1,"result":[{"from":"192.168.1.1","rtt":2.7829999999999999,"size":96,"ttl":64},{"from":"192.168.1.1","rtt":2.4500000000000002,"size":96,"ttl":64},{"from":"192.168.1.1","rtt":2.3210000000000002,"size":96,"ttl":64}]},{"hop":2,"result":[{"x":"*"},{"x":"*"},{"x":"*"}]},{"hop":3,"result":[{"x":"*"},{"x":"*"},{"x":"*"}]},{"hop":4,"result":[{"x":"*"},{"x":"*"},{"x":"*"}]},{"hop":5,"result":[{"x":"*"},{"x":"*"},{"x":"*"}]},{"hop":6,"result":[{"x":"*"},{"x":"*"},{"x":"*"}]},{"hop":255,"result":[{"x":"*"},{"x":"*"},{"x":"*"}]}],"size":40,"src_addr":"192.168.1.107","timestamp":1340329190,"type":"traceroute"}')
+    assert("last_median_rtt" in result.keys())
+    assert("last_rtt" not in result.keys())
+    assert("target_responded" not in result.keys())
+    d = result.to_dict()
+    assert(d["hops"][0]["packets"][0]["origin"] == "192.168.1.1")
+    assert(d["ip_path"] == result.ip_path)
+
+
+def test_lazy():
+    data = '{"af":4,"dst_addr":"121.244.76.25","dst_name":"121.244.76.25","endtime":1340329208,"from":"107.3.81.49","fw":4460,"msm_id":1000157,"paris_id":2,"prb_id":190,"proto":"UDP","result":[{"hop":1,"result":[{"from":"192.168.1.1","rtt":2.7829999999999999,"size":96,"ttl":64},{"from":"192.168.1.1","rtt":2.4500000000000002,"size":96,"ttl":64},{"from":"192.168.1.1","rtt":2.3210000000000002,"size":96,"ttl":64}]},{"hop":2,"result":[{"x":"*"},{"x":"*"},{"x":"*"}]},{"hop":3,"result":[{"x":"*"},{"x":"*"},{"x":"*"}]},{"hop":4,"result":[{"x":"*"},{"x":"*"},{"x":"*"}]},{"hop":5,"result":[{"x":"*"},{"x":"*"},{"x":"*"}]},{"hop":6,"result":[{"x":"*"},{"x":"*"},{"x":"*"}]},{"hop":255,"result":[{"x":"*"},{"x":"*"},{"x":"*"}]}],"size":40,"src_addr":"192.168.1.107","timestamp":1340329190,"type":"traceroute"}'
+    result = Result.get(data, lazy=True)
+    assert(result.total_hops == 7)
+    assert(result._hops is None)
+    assert(result.is_success is False)
+    assert(len(result._hops) == 7)
+    assert(result.to_dict() == Result.get(data).to_dict())
+
+    result = Result.get(data, lazy=True, parse_all_hops=False)
+    assert(result.last_median_rtt == 2.45)
+    assert(len(result.hops) == 1)
+
+    result = Result.get(data.replace('"result":[', '"nothing":['), lazy=True)
+    assert(result.is_malformed is True)
+    assert(result.hops == [])
+
+
+def test_first_and_last_hops():
+    data = '{"af":4,"dst_addr":"121.244.76.25","dst_name":"121.244.76.25","endtime":1340329208,"from":"107.3.81.49","fw":4460,"msm_id":1000157,"paris_id":2,"prb_id":190,"proto":"UDP","result":[{"hop":1,"result":[{"from":"192.168.1.1","rtt":2.7829999999999999,"size":96,"ttl":64},{"from":"192.168.1.1","rtt":2.4500000000000002,"size":96,"ttl":64},{"from":"192.168.1.1","rtt":2.3210000000000002,"size":96,"ttl":64}]},{"hop":2,"result":[{"x":"*"},{"x":"*"},{"x":"*"}]},{"hop":3,"result":[{"x":"*"},{"x":"*"},{"x":"*"}]},{"hop":4,"result":[{"x":"*"},{"x":"*"},{"x":"*"}]},{"hop":5,"result":[{"x":"*"},{"x":"*"},{"x":"*"}]},{"hop":6,"result":[{"x":"*"},{"x":"*"},{"x":"*"}]},{"hop":255,"result":[{"x":"*"},{"x":"*"},{"x":"*"}]}],"size":40,"src_addr":"192.168.1.107","timestamp":1340329190,"type":"traceroute"}'
+    expected = Result.get(data)
+    for kwargs, indexes in (
+            ({"first_hops": 2}, [1, 2, 255]),
+            ({"last_hops": 3}, [5, 6, 255]),
+            ({"first_hops": 2, "last_hops": 2}, [1, 2, 6, 255]),
+            ({"first_hops": 0, "last_hops": 0}, [255]),
+            ({"first_hops": 5, "last_hops": 5}, [1, 2, 3, 4, 5, 6, 255])):
+        for lazy in (False, True):
+            result = Result.get(data, lazy=lazy, **kwargs)
+            assert([hop.index for hop in result.hops] == indexes)
+            assert(result.total_hops == 7)
+            assert(result.last_median_rtt == expected.last_median_rtt)
+            assert(result.is_success == expected.is_success)
+            assert(result.destination_ip_responded == expected.destination_ip_responded)
+            assert(result.last_hop_errors == expected.last_hop_errors)
+
+
+def test_assign_hops():
+    data = '{"af":4,"dst_addr":"121.244.76.25","dst_name":"121.244.76.25","endtime":1340329208,"from":"107.3.81.49","fw":4460,"msm_id":1000157,"paris_id":2,"prb_id":190,"proto":"UDP","result":[{"hop":1,"result":[{"from":"192.168.1.1","rtt":2.7829999999999999,"size":96,"ttl":64},{"from":"192.168.1.1","rtt":2.4500000000000002,"size":96,"ttl":64},{"from":"192.168.1.1","rtt":2.3210000000000002,"size":96,"ttl":64}]},{"hop":2,"result":[{"x":"*"},{"x":"*"},{"x":"*"}]},{"hop":3,"result":[{"x":"*"},{"x":"*"},{"x":"*"}]},{"hop":4,"result":[{"x":"*"},{"x":"*"},{"x":"*"}]},{"hop":5,"result":[{"x":"*"},{"x":"*"},{"x":"*"}]},{"hop":6,"result":[{"x":"*"},{"x":"*"},{"x":"*"}]},{"hop":255,"result":[{"x":"*"},{"x":"*"},{"x":"*"}]}],"size":40,"src_addr":"192.168.1.107","timestamp":1340329190,"type":"traceroute"}'
+    # These were plain attributes before they could be parsed lazily
+    for lazy in (False, True):
+        result = Result.get(data, lazy=lazy)
+        result.hops = result.hops[-1:]
+        result.last_median_rtt = 1.5
+        result.destination_ip_responded = True
+        result.last_hop_responded = True
+        result.is_success = True
+        result.last_hop_errors = ["Network unreachable"]
+        assert([hop.index for hop in result.hops] == [255])
+        assert(result.last_median_rtt == 1.5)
+        assert(result.destination_ip_responded is True)
+        assert(result.last_hop_responded is True)
+        assert(result.is_success is True)
+        assert(result.last_hop_errors == ["Network unreachable"])